@@ -5,13 +5,53 @@ Ligma Browser — A modern PyQt5 web browser.
 Single-file implementation with calculator, password tester, and clean UI.
 """
 
+import os
 import re
+import math
 import ast
 import sys
-from urllib.parse import quote_plus
+import json
+import time
+import zlib
+import mmap
+import uuid
+import queue
+import bisect
+import csv
+import heapq
+import multiprocessing
+import shutil
+import hashlib
+import hmac
+import inspect
+import gc
+import html
+import secrets
+import logging
+import argparse
+import getpass
+import socket
+import struct
+import subprocess
+import tempfile
+import http.server
+import tracemalloc
+import functools
+import threading
+import logging.handlers
+from array import array
+from collections import Counter, OrderedDict, deque
+from itertools import accumulate, islice, product
+from urllib.parse import quote_plus, parse_qs, urlsplit
 
-from PyQt5.QtCore import QUrl, Qt, QSize, QThread, pyqtSignal, QTimer
-from PyQt5.QtGui import QIcon, QFont, QKeySequence
+from PyQt5.QtCore import (
+    QUrl, Qt, QSize, QThread, QObject, pyqtSignal, QTimer, QSettings, QStandardPaths, QEvent,
+    QCoreApplication,
+    QBuffer, QIODevice, QEventLoop,
+)
+from PyQt5.QtGui import (
+    QIcon, QFont, QKeySequence, QDesktopServices, QPainter, QColor, QFontMetrics,
+)
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QTabWidget, QWidget, QVBoxLayout,
     QLineEdit, QToolBar, QAction, QToolButton, QSizePolicy,
@@ -19,32 +59,220 @@ from PyQt5.QtWidgets import (
     QDialogButtonBox, QMessageBox, QProgressBar, QFrame,
     QMenu, QShortcut, QListWidget, QListWidgetItem, QHBoxLayout,
     QStatusBar, QInputDialog, QStyle, QCheckBox, QFileDialog,
-    QRadioButton, QButtonGroup,
+    QRadioButton, QButtonGroup, QSpinBox, QAbstractScrollArea, QComboBox, QDockWidget,
 )
+from PyQt5 import sip
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket, QTcpServer, QHostAddress, QNetworkCookie
 from PyQt5.QtPrintSupport import QPrinter, QPrintDialog
-from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEnginePage, QWebEngineProfile
+from PyQt5.QtWebEngineWidgets import (
+    QWebEngineView, QWebEnginePage, QWebEngineProfile, QWebEngineDownloadItem, QWebEngineSettings,
+    QWebEngineScript,
+)
+from PyQt5.QtWebEngineCore import QWebEngineUrlSchemeHandler, QWebEngineUrlRequestJob
+try:
+    from PyQt5.QtWebEngineCore import QWebEngineUrlScheme  # Qt 5.12+
+except ImportError:
+    QWebEngineUrlScheme = None
 
 # -----------------------------------------------------------------------------
 # Constants
 # -----------------------------------------------------------------------------
 LIGMA_HOME_URL = "https://liamliamliam123.github.io/Ligma-Home-Page/"
-HOME_URL = LIGMA_HOME_URL
+LIGMA_SCHEME = "ligma"
+LIGMA_NEWTAB_URL = "ligma://newtab"
+HOME_URL = LIGMA_NEWTAB_URL
 GOOGLE_SEARCH_URL = "https://www.google.com/search?q={}"
 DUCKDUCKGO_SEARCH_URL = "https://duckduckgo.com/?q={}"
 
 # (display name, home URL, search URL template for address bar)
 SEARCH_ENGINES = [
+    ("New tab page (works offline)", LIGMA_NEWTAB_URL, GOOGLE_SEARCH_URL),
     ("Ligma Home Page", LIGMA_HOME_URL, GOOGLE_SEARCH_URL),
     ("Google", "https://www.google.com", GOOGLE_SEARCH_URL),
     ("DuckDuckGo", "https://duckduckgo.com", DUCKDUCKGO_SEARCH_URL),
 ]
 
 MIN_TAB_COUNT = 1
+NEWTAB_TOP_SITES = 8
+NEWTAB_RECENT = 10
+SPARE_POOL_MIN = 1
+SPARE_POOL_MAX = 4
+SPARE_RATE_WINDOW_S = 60        # new-tab opens counted for sizing the pool...
+SPARE_OPENS_PER_SPARE = 3       # ...one spare per this many opens in the window
+SPARE_REFILL_IDLE_MS = 500      # refill this long after the last open, once nothing is loading
+NEWTAB_LATENCY_SAMPLES = 200
+INTERNAL_HISTORY_ROWS = 1000
+FAVICON_SIZE = 32
+FAVICON_MEMORY_ENTRIES = 256
+FAVICON_DISK_BUDGET = 8 * 1024 * 1024
+HISTORY_LIMIT = 10000
+PASSWORD_LOG_MAX_LINES = 500
+BRUTE_FORCE_LIMIT = 1000000
+WORDLIST_CHUNK_BYTES = 64 * 1024  # words mangled per batch; also the abort granularity
+CRACK_PROGRESS_INTERVAL_S = 0.1
+MASK_LIMIT = 100000000  # masks are cheap to enumerate, so they get a larger cap than brute force
+MASK_BATCH = 65536
+MASK_BUILTIN_SETS = {
+    "l": "abcdefghijklmnopqrstuvwxyz",
+    "u": "ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+    "d": "0123456789",
+    "s": " !\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~",
+    "h": "0123456789abcdef",
+    "H": "0123456789ABCDEF",
+}
+MASK_BUILTIN_SETS["a"] = "".join(MASK_BUILTIN_SETS[k] for k in "luds")
+DIST_LEASE_SIZE = 2000000  # candidates per lease
+DIST_LEASE_TIMEOUT_S = 30  # a lease without a heartbeat for this long is reassigned
+DIST_HEARTBEAT_S = 1.0
+DIST_SUFFIX_BLOCK = 4096  # workers enumerate suffixes in product blocks of about this size
+DIST_LOCAL_WORKERS = 2
+BREACH_INDEX_FILE = "breach.bloom"
+BREACH_ERROR_RATE = 0.001  # ~14.4 bits per entry: 500M passwords in about 900 MB
+BREACH_BUILD_CHUNK = 4 * 1024 * 1024
+RAINBOW_ALGORITHMS = ("md5", "sha1", "sha256")
+RAINBOW_CHAIN_LEN = 1000
+RAINBOW_COVERAGE = 2.0  # chains x chain length / keyspace; finds about two thirds of passwords
+RAINBOW_TASK_CHAINS = 2000  # chains per pool task
+RAINBOW_HEADER_BYTES = 4096
+RAINBOW_DEFAULT_MAX_LEN = 5
+MARKOV_POSITIONS = 12  # later positions share the last transition table
+MARKOV_COST_SCALE = 2  # cost units per bit of -log2(probability)
+MARKOV_TRAIN_WORDS = 2000000
+MARKOV_HOLDOUT_EVERY = 10  # every Nth corpus word is held out for the benchmark
+MARKOV_BENCH_PASSWORDS = 500
+MARKOV_BENCH_MAX_LEN = 10
+MARKOV_BENCH_BUDGET = 2000000  # candidates enumerated per order before giving up
+# hashcat rule syntax; ':' keeps the word as is
+DEFAULT_MANGLE_RULES = (
+    [":", "l", "u", "c", "t", "r", "d", "sa@", "se3", "si1", "so0", "ss$", "sa@se3si1so0ss$",
+     "csa@se3si1so0", "$!", "c$!", "$1$2$3", "c$1$2$3", "^1"]
+    + [f"${d}" for d in "0123456789"] + [f"c${d}" for d in "0123456789"]
+)
 ADDRESS_BAR_MIN_HEIGHT = 36
 TOOLBAR_ICON_SIZE = 24
 BUTTON_MIN_SIZE = 44  # Apple HIG: 44pt minimum hit target
 FIND_DEBOUNCE_MS = 250
 
+SETTINGS_ORG = "Ligma"
+SETTINGS_APP = "Ligma Browser"
+
+# (display name, process model); Chromium defaults to process-per-site-instance
+PROCESS_MODELS = [
+    ("Process per site instance (default)", "process-per-site-instance"),
+    ("Process per site", "process-per-site"),
+]
+DEFAULT_PROCESS_MODEL = "process-per-site-instance"
+
+BATCH_FORMATS = ("pdf", "png", "text")
+BATCH_MAX_JOBS = 16
+BATCH_TIMEOUT_S = 60
+BATCH_RETRIES = 2
+HEADLESS_VIEWPORT = QSize(1280, 1024)
+SCREENSHOT_MAX_HEIGHT = 16384
+SCREENSHOT_SETTLE_MS = 250
+
+OFFLINE_COMPRESS_LEVEL = 6
+
+DOWNLOAD_MAX_CONCURRENT = 3
+DOWNLOAD_DISK_RESERVE = 200 * 1024 * 1024  # keep this much free after a download
+DOWNLOAD_AUTO_RESUME = 3                   # automatic resumes of an interrupted download
+DOWNLOAD_RESUME_BACKOFF_MS = 2000
+DOWNLOAD_RATE_WINDOW_S = 0.5
+DOWNLOAD_FIXTURE_FILES = 5       # --download-test against the local fixture server
+DOWNLOAD_FIXTURE_MB = 8
+DOWNLOAD_FIXTURE_KBPS = 2048     # per-connection throttle, KiB/s
+DOWNLOAD_FIXTURE_CHUNK = 16384
+DOWNLOAD_TEST_TIMEOUT_S = 300
+DOWNLOAD_TEST_SAMPLE_MS = 250
+
+PROFILE_ENV = "LIGMA_PROFILE"
+PROFILE_MAX_SAMPLES = 10000        # most recent durations kept per slot
+PROFILE_MAX_TRACE_EVENTS = 200000
+
+WATCHDOG_HEARTBEAT_MS = 100
+WATCHDOG_THRESHOLD_MS = 300        # event-loop latency that counts as a stall
+WATCHDOG_SAMPLE_MS = 20            # stack sampling interval while stalled
+WATCHDOG_STACK_DEPTH = 30
+WATCHDOG_REPORT_FRAMES = 8
+WATCHDOG_LOG_BYTES = 1024 * 1024
+WATCHDOG_LOG_BACKUPS = 3
+
+TRACEMALLOC_FRAMES = 10
+MEMORY_DIFF_TOP = 15
+SOAK_CYCLES = 20
+SOAK_TABS_PER_CYCLE = 5
+SOAK_SETTLE_MS = 500
+SOAK_URL = "about:blank"
+
+CRAWL_MAX_PAGES = 1000
+CRAWL_MAX_DEPTH = 5
+CRAWL_HOST_DELAY_S = 1.0  # politeness: pause between requests to the same host
+CRAWL_BLOOM_CAPACITY = 10000000
+CRAWL_BLOOM_ERROR = 0.001
+CRAWL_FRONTIER_LIMIT = 1000000  # queued URLs kept; later discoveries are dropped
+CRAWL_TEXT_LIMIT = 100000  # characters of page text per JSONL record
+CRAWL_FIXTURE_PAGES = 200
+
+CONTROL_WAIT_TIMEOUT_S = 30
+CONTROL_MAX_LINE = 4 * 1024 * 1024  # drop clients that send a longer request line
+
+PERF_TABS = 50
+PERF_LATENCY_MS = 20  # fixture server delay per response
+PERF_PAGE_KB = 64
+PERF_HISTORY_ENTRIES = 10000
+PERF_BOOKMARKS = 5000
+PERF_NEW_TABS = 20
+PERF_LOAD_TIMEOUT_S = 60
+PERF_BASELINE = "ligma-perf-baseline.json"
+PERF_LATENCY_TOLERANCE = 0.25  # fail when slower than baseline by this fraction...
+PERF_LATENCY_FLOOR_MS = 50     # ...and by at least this much (scheduling noise)
+PERF_MEMORY_TOLERANCE = 0.20
+PERF_MEMORY_FLOOR = 16 * 1024 * 1024
+
+SITE_FEATURES = ("javascript", "images", "plugins", "webgl", "autoplay")
+LITE_RULE = {feature: False for feature in SITE_FEATURES}
+LITE_SETTLE_MS = 1500  # let the renderer settle before sampling its memory
+LITE_REPORTS_KEPT = 20
+
+STORAGE_ORIGIN_BUDGET_MB = 200   # per-origin site data (storage, databases, caches, cookies)
+STORAGE_TOTAL_BUDGET_MB = 2048   # all site data together
+STORAGE_CACHE_BUDGET_MB = 256    # HTTP cache cap; Chromium evicts within it
+STORAGE_SCAN_INTERVAL_MS = 10 * 60 * 1000
+STORAGE_FIRST_SCAN_MS = 30000    # keep the first scan clear of startup I/O
+STORAGE_SCAN_BATCH = 256         # files between progress reports and pauses
+STORAGE_SCAN_PAUSE_MS = 5
+STORAGE_CLEAR_TIMEOUT_MS = 10000
+STORAGE_RESCAN_DELAY_MS = 5000
+STORAGE_EVICTIONS_KEPT = 50
+STORAGE_TOP_ORIGINS = 25
+
+DEVTOOLS_PROFILE_SECONDS = 5
+DEVTOOLS_SAMPLE_MS = 250  # renderer RSS and JS heap sampling interval while recording
+
+VITALS_FILE = "vitals.jsonl"
+VITALS_MAX_SAMPLES = 20000
+VITALS_SETTLE_MS = 1000  # after loadFinished, so late paints and shifts are included
+VITALS_PERIOD_S = 86400  # percentiles are grouped per site and day
+
+SOURCE_TAB_WIDTH = 4
+SOURCE_HIGHLIGHT_MAX_LINE = 4000  # minified lines are only highlighted up to here
+SOURCE_SPAN_CACHE_LINES = 20000
+SOURCE_COLORS = {
+    True: {"background": "#1c1c1e", "text": "#e5e5ea", "gutter": "#8e8e93", "match": "#0a84ff",
+           "tag": "#ff7ab2", "attr": "#d9c97c", "string": "#ff8170", "comment": "#7f8c98",
+           "entity": "#d0a8ff"},
+    False: {"background": "#ffffff", "text": "#1d1d1f", "gutter": "#8e8e93", "match": "#b3d7ff",
+            "tag": "#ad3da4", "attr": "#947100", "string": "#d12f1b", "comment": "#707f8c",
+            "entity": "#7d36c7"},
+}
+
+INSTANCE_CONNECT_TIMEOUT_MS = 200
+INSTANCE_ACK_TIMEOUT_MS = 2000
+# Qt options whose value is the next argument (so it isn't mistaken for a URL)
+QT_VALUE_OPTIONS = {"-platform", "-platformpluginpath", "-platformtheme", "-plugin", "-style",
+                    "-stylesheet", "-session", "-display", "-geometry", "-title", "-qwindowgeometry",
+                    "-qwindowicon", "-qwindowtitle", "-qmljsdebugger"}
+
 # Find flags (for PyQt5 versions that may not have all)
 FindWrapsAroundDocument = getattr(QWebEnginePage, "FindWrapsAroundDocument", 0x10000)
 FindBackward = getattr(QWebEnginePage, "FindBackward", 0x02)
@@ -247,11 +475,226 @@ def parse_url_input(text, home_url=None, search_url_template=None):
     lower = raw.lower()
     if lower.startswith("http://") or lower.startswith("https://"):
         return raw
+    if lower.startswith(LIGMA_SCHEME + "://"):
+        return raw
     if "." in raw and " " not in raw:
         return "https://" + raw
     return search_url_template.format(quote_plus(raw))
 
 
+# -----------------------------------------------------------------------------
+# Slot profiling (opt-in with --profile or LIGMA_PROFILE=1)
+# -----------------------------------------------------------------------------
+_profiler = None  # active SlotProfiler; None unless profiling mode is on
+
+
+def percentile(values, q):
+    """Nearest-rank q-th percentile (0-100) of values, or None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def record_swallowed_exception():
+    """Call from except blocks that deliberately swallow errors (counted when profiling)."""
+    if _profiler is not None:
+        _profiler.swallowed()
+
+
+class SlotProfiler:
+    """Timing spans and swallowed-exception counts for instrumented slots."""
+
+    def __init__(self):
+        self._durations = {}   # name -> deque of recent durations (seconds)
+        self._calls = {}
+        self._total = {}
+        self._swallowed = {}
+        self._stack = []
+        self._events = []
+        self._t0 = time.perf_counter()
+        self._pid = os.getpid()
+
+    def wrap(self, name, fn):
+        params = list(inspect.signature(fn).parameters.values())
+        if any(p.kind == p.VAR_POSITIONAL for p in params):
+            max_args = None
+        else:
+            max_args = sum(1 for p in params
+                           if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD))
+        stack, clock = self._stack, time.perf_counter
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            # PyQt only drops surplus signal arguments for the callable it connected,
+            # so trim them here the way it would have for the plain method
+            if max_args is not None:
+                args = args[:max_args]
+            stack.append(name)
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stack.pop()
+                self._record(name, start, clock())
+        return timed
+
+    def _record(self, name, start, end):
+        duration = end - start
+        samples = self._durations.get(name)
+        if samples is None:
+            samples = self._durations[name] = deque(maxlen=PROFILE_MAX_SAMPLES)
+        samples.append(duration)
+        self._calls[name] = self._calls.get(name, 0) + 1
+        self._total[name] = self._total.get(name, 0.0) + duration
+        if len(self._events) < PROFILE_MAX_TRACE_EVENTS:
+            self._events.append({"name": name, "cat": "slot", "ph": "X", "pid": self._pid,
+                                 "tid": 1, "ts": (start - self._t0) * 1e6,
+                                 "dur": duration * 1e6})
+
+    def swallowed(self):
+        name = self._stack[-1] if self._stack else "(outside slots)"
+        self._swallowed[name] = self._swallowed.get(name, 0) + 1
+        if len(self._events) < PROFILE_MAX_TRACE_EVENTS:
+            self._events.append({"name": "swallowed exception", "cat": "error", "ph": "i",
+                                 "s": "t", "pid": self._pid, "tid": 1,
+                                 "ts": (time.perf_counter() - self._t0) * 1e6,
+                                 "args": {"slot": name}})
+
+    def report(self):
+        """Rows of (slot, calls, p50, p95, p99, max, total) in ms plus swallowed count."""
+        rows = []
+        for name in set(self._calls) | set(self._swallowed):
+            ms = [d * 1000.0 for d in self._durations.get(name, ())]
+            rows.append((name, self._calls.get(name, 0), percentile(ms, 50), percentile(ms, 95),
+                         percentile(ms, 99), max(ms) if ms else None,
+                         self._total.get(name, 0.0) * 1000.0, self._swallowed.get(name, 0)))
+        rows.sort(key=lambda r: r[6], reverse=True)
+        return rows
+
+    def format_report(self):
+        def ms(v):
+            return "-" if v is None else f"{v:.2f}"
+        lines = [f"{'slot':<40} {'calls':>7} {'p50':>8} {'p95':>8} {'p99':>8} "
+                 f"{'max':>8} {'total':>10} {'swallowed':>9}"]
+        for name, calls, p50, p95, p99, mx, total, swallowed in self.report():
+            lines.append(f"{name[:40]:<40} {calls:>7} {ms(p50):>8} {ms(p95):>8} {ms(p99):>8} "
+                         f"{ms(mx):>8} {total:>10.1f} {swallowed:>9}")
+        return "\n".join(lines)
+
+    def export_trace(self, path):
+        """Write Chrome trace-event JSON (open in chrome://tracing or Perfetto)."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self._events, "displayTimeUnit": "ms"}, f)
+
+
+def instrument_class(cls, profiler):
+    """Wrap every private method (_name, not dunder) of cls in a timing span."""
+    for name, attr in list(vars(cls).items()):
+        if name.startswith("_") and not name.startswith("__") and inspect.isfunction(attr):
+            setattr(cls, name, profiler.wrap(f"{cls.__name__}.{name}", attr))
+
+
+# -----------------------------------------------------------------------------
+# Event-loop stall watchdog
+# -----------------------------------------------------------------------------
+def stack_frames(frame, depth=WATCHDOG_STACK_DEPTH):
+    """('file:line in func', ...) for a frame and its callers, innermost first."""
+    frames = []
+    while frame is not None and len(frames) < depth:
+        code = frame.f_code
+        frames.append(f"{os.path.basename(code.co_filename)}:{frame.f_lineno} in {code.co_name}")
+        frame = frame.f_back
+    return tuple(frames)
+
+
+class StallWatchdog(QObject):
+    """A heartbeat timer on the GUI thread plus a watcher thread. When the
+    heartbeat is late by more than the threshold, the watcher samples the main
+    thread's Python stack until the loop recovers, then logs a stall report."""
+    stall = pyqtSignal(float, str)  # duration in ms, innermost hot frame
+
+    def __init__(self, threshold_ms, log_path, parent=None):
+        super().__init__(parent)
+        self.threshold_ms = threshold_ms
+        self.count = 0
+        self.max_ms = 0.0
+        self.latency_ms = 0.0
+        self._main_ident = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop = threading.Event()
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._beat)
+        self._thread = threading.Thread(target=self._watch, name="ligma-watchdog", daemon=True)
+        self._log = logging.getLogger("ligma.stalls")
+        self._log.setLevel(logging.INFO)
+        self._log.propagate = False
+        if not self._log.handlers:
+            handler = logging.handlers.RotatingFileHandler(
+                log_path, maxBytes=WATCHDOG_LOG_BYTES, backupCount=WATCHDOG_LOG_BACKUPS,
+                encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self._log.addHandler(handler)
+
+    def start(self):
+        self._last_beat = time.monotonic()
+        self._timer.start(WATCHDOG_HEARTBEAT_MS)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._timer.stop()
+        if self._thread.is_alive():
+            self._thread.join(1.0)
+
+    def _beat(self):
+        now = time.monotonic()
+        self.latency_ms = max(0.0, (now - self._last_beat) * 1000.0 - WATCHDOG_HEARTBEAT_MS)
+        self._last_beat = now
+
+    def _watch(self):
+        limit = (WATCHDOG_HEARTBEAT_MS + self.threshold_ms) / 1000.0
+        stacks = None
+        while not self._stop.wait(WATCHDOG_SAMPLE_MS / 1000.0):
+            last_beat = self._last_beat
+            if time.monotonic() - last_beat > limit:
+                if stacks is None:
+                    stacks, stalled_since = Counter(), last_beat
+                frame = sys._current_frames().get(self._main_ident)
+                if frame is not None:
+                    stacks[stack_frames(frame)] += 1
+                del frame
+            elif stacks is not None:
+                duration = (last_beat - stalled_since) * 1000.0 - WATCHDOG_HEARTBEAT_MS
+                self._report(duration, stacks)
+                stacks = None
+
+    def _report(self, duration_ms, stacks):
+        self.count += 1
+        self.max_ms = max(self.max_ms, duration_ms)
+        samples = sum(stacks.values())
+        hot = Counter()
+        for frames, n in stacks.items():
+            for f in set(frames):
+                hot[f] += n
+        lines = [f"stall #{self.count}: event loop blocked {duration_ms:.0f} ms "
+                 f"({samples} stack sample(s))"]
+        if stacks:
+            frames, n = stacks.most_common(1)[0]
+            lines.append(f"  most common stack ({n}/{samples} samples):")
+            lines.extend(f"    {f}" for f in frames[:WATCHDOG_REPORT_FRAMES])
+            lines.append("  hottest frames:")
+            lines.extend(f"    {100 * n // samples:3d}%  {f}"
+                         for f, n in hot.most_common(WATCHDOG_REPORT_FRAMES))
+            top = frames[0]
+        else:
+            lines.append("  no Python stack sampled (blocked in native code)")
+            top = "native code"
+        self._log.warning("\n".join(lines))
+        self.stall.emit(duration_ms, top)
+
+
 # -----------------------------------------------------------------------------
 # Safe calculator (no eval of arbitrary code)
 # -----------------------------------------------------------------------------
@@ -279,231 +722,4737 @@ def safe_calculate(expr):
 
 
 # -----------------------------------------------------------------------------
-# Password cracker worker (runs in thread to avoid UI freeze)
+# Dictionary mode: memory-mapped wordlists and hashcat-style mangling rules
 # -----------------------------------------------------------------------------
-class PasswordCrackerWorker(QThread):
-    progress = pyqtSignal(int, int, str)   # current, total, attempt
-    finished_signal = pyqtSignal(bool, str)  # found, result_message
+def _rule_position(ch):
+    """hashcat positions: 0-9 then A-Z for 10-35."""
+    if ch.isdigit():
+        return int(ch)
+    if "A" <= ch <= "Z":
+        return ord(ch) - ord("A") + 10
+    raise ValueError(f"bad rule position {ch!r}")
 
-    def __init__(self, password, charset, parent=None):
-        super().__init__(parent)
-        self._password = password
-        self._charset = charset
-        self._abort = False
 
-    def abort(self):
-        self._abort = True
+def _toggle_at(word, n):
+    if n >= len(word):
+        return word
+    return word[:n] + word[n].swapcase() + word[n + 1:]
 
-    def run(self):
+
+def compile_rule(rule):
+    """Compile one hashcat rule (subset: : l u c C t TN r d [ ] $X ^X sXY @X) to a str -> str function."""
+    ops = []
+    i, rule = 0, rule.strip()
+    while i < len(rule):
+        op = rule[i]
+        if op in " :":
+            i += 1
+            continue
+        simple = {"l": str.lower, "u": str.upper, "c": str.capitalize,
+                  "C": lambda w: w[:1].lower() + w[1:].upper(), "t": str.swapcase,
+                  "r": lambda w: w[::-1], "d": lambda w: w + w,
+                  "[": lambda w: w[1:], "]": lambda w: w[:-1]}
+        if op in simple:
+            ops.append(simple[op])
+            i += 1
+        elif op in "$^@T" and i + 1 < len(rule):
+            arg = rule[i + 1]
+            if op == "$":
+                ops.append(lambda w, a=arg: w + a)
+            elif op == "^":
+                ops.append(lambda w, a=arg: a + w)
+            elif op == "@":
+                ops.append(lambda w, a=arg: w.replace(a, ""))
+            else:
+                ops.append(lambda w, n=_rule_position(arg): _toggle_at(w, n))
+            i += 2
+        elif op == "s" and i + 2 < len(rule):
+            ops.append(lambda w, a=rule[i + 1], b=rule[i + 2]: w.replace(a, b))
+            i += 3
+        else:
+            raise ValueError(f"unsupported rule {rule!r} at {op!r}")
+    if not ops:
+        return lambda w: w
+    if len(ops) == 1:
+        return ops[0]
+    return functools.reduce(lambda f, g: (lambda w: g(f(w))), ops)
+
+
+def load_rules(path=None):
+    """Compiled rules from a hashcat .rule file (comments and bad lines skipped), or the defaults."""
+    if path:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            lines = [ln.rstrip("\n") for ln in f]
+    else:
+        lines = DEFAULT_MANGLE_RULES
+    rules = []
+    for line in lines:
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
         try:
-            total = len(self._charset) ** len(self._password)
-            if total <= 0 or len(self._password) == 0:
-                self.finished_signal.emit(False, "Invalid input.")
-                return
-            total = min(total, 1000000)
-            count = 0
-            from itertools import product
-            for length in range(1, len(self._password) + 1):
-                if self._abort:
-                    self.finished_signal.emit(False, "Cancelled.")
-                    return
-                for attempt in product(self._charset, repeat=length):
-                    if self._abort:
-                        self.finished_signal.emit(False, "Cancelled.")
-                        return
-                    count += 1
-                    attempt_str = "".join(attempt)
-                    self.progress.emit(count, total, attempt_str)
-                    if attempt_str == self._password:
-                        self.finished_signal.emit(True, f"Found: {attempt_str}")
-                        return
-                    if count >= total:
-                        break
-                if count >= total:
-                    break
-            self.finished_signal.emit(False, "Not found (limit reached).")
-        except Exception as e:
-            self.finished_signal.emit(False, f"Error: {e}")
+            rules.append(compile_rule(line))
+        except ValueError:
+            continue
+    return rules or [compile_rule(":")]
+
+
+def iter_wordlist(path, chunk_bytes=WORDLIST_CHUNK_BYTES):
+    """Yield (words, bytes_done, total_bytes) batches from a memory-mapped wordlist.
+
+    Only one chunk is copied out of the mapping at a time, so multi-gigabyte
+    lists stream in constant memory; chunks always end on a line break."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            pos = 0
+            while pos < size:
+                end = mm.find(b"\n", min(pos + chunk_bytes, size - 1))
+                if end == -1:
+                    end = size
+                text = mm[pos:end].decode("utf-8", "replace")
+                pos = end + 1
+                yield [w.rstrip("\r") for w in text.split("\n")], min(pos, size), size
 
 
 # -----------------------------------------------------------------------------
-# Calculator dialog
+# Mask mode: a character set per position (hashcat mask syntax)
 # -----------------------------------------------------------------------------
-class CalculatorDialog(QDialog):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setWindowTitle("Calculator")
-        self.setMinimumWidth(280)
-        self.setMinimumHeight(360)
-        layout = QVBoxLayout(self)
-        layout.setSpacing(12)
+def _expand_mask(mask, sets):
+    """Split mask into one charset per position using the ?x placeholders in sets."""
+    out = []
+    i = 0
+    while i < len(mask):
+        c = mask[i]
+        if c != "?":
+            out.append(c)
+            i += 1
+            continue
+        if i + 1 >= len(mask):
+            raise ValueError("mask ends with a lone '?'")
+        key = mask[i + 1]
+        if key == "?":
+            out.append("?")
+        elif key in sets:
+            out.append(sets[key])
+        else:
+            raise ValueError(f"unknown placeholder ?{key}")
+        i += 2
+    return out
 
-        self.display = QLineEdit()
-        self.display.setPlaceholderText("0")
-        self.display.setReadOnly(True)
-        self.display.setMinimumHeight(52)
-        self.display.setAlignment(Qt.AlignRight)
-        self.display.setStyleSheet("""
-            QLineEdit {
-                font-size: 28px;
-                padding: 12px;
-                border-radius: 10px;
-            }
-        """)
-        layout.addWidget(self.display)
 
-        grid = QGridLayout()
-        buttons = [
-            ("C", 0, 0), ("±", 0, 1), ("%", 0, 2), ("/", 0, 3),
-            ("7", 1, 0), ("8", 1, 1), ("9", 1, 2), ("*", 1, 3),
-            ("4", 2, 0), ("5", 2, 1), ("6", 2, 2), ("-", 2, 3),
-            ("1", 3, 0), ("2", 3, 1), ("3", 3, 2), ("+", 3, 3),
-            ("0", 4, 0), (".", 4, 1), ("=", 4, 2), ("⌫", 4, 3),
-        ]
-        for label, row, col in buttons:
-            btn = QPushButton(label)
-            btn.setMinimumSize(BUTTON_MIN_SIZE, BUTTON_MIN_SIZE)
-            btn.clicked.connect(lambda checked, l=label: self._on_button(l))
-            grid.addWidget(btn, row, col)
-        layout.addLayout(grid)
-        self._expr = ""
+def parse_mask(mask, custom=()):
+    """Per-position charsets for mask: ?l ?u ?d ?s ?a ?h ?H, ?1-?4 from custom, ?? and literals.
+
+    Custom sets may use the built-in placeholders themselves (e.g. "?l?d_")."""
+    sets = dict(MASK_BUILTIN_SETS)
+    for n, spec in enumerate(custom, 1):
+        if spec:
+            sets[str(n)] = "".join(dict.fromkeys("".join(_expand_mask(spec, MASK_BUILTIN_SETS))))
+    positions = _expand_mask(mask, sets)
+    if not positions:
+        raise ValueError("empty mask")
+    return positions
 
-    def _on_button(self, label):
-        if label == "C":
-            self._expr = ""
-        elif label == "=":
-            ok, result = safe_calculate(self._expr)
-            self._expr = str(result) if ok else self._expr
-        elif label == "⌫":
-            self._expr = self._expr[:-1]
-        elif label == "±":
-            if self._expr and self._expr[0] == "-":
-                self._expr = self._expr[1:]
-            elif self._expr:
-                self._expr = "-" + self._expr
-        else:
-            self._expr += label
-        self.display.setText(self._expr or "0")
+
+def mask_keyspace(positions):
+    """Exact number of candidates a parsed mask produces."""
+    return math.prod(len(p) for p in positions)
 
 
 # -----------------------------------------------------------------------------
-# Password tester dialog (cracker runs in QThread)
+# Markov order: candidates in (approximately) descending probability
 # -----------------------------------------------------------------------------
-class PasswordTesterDialog(QDialog):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setWindowTitle("Password Strength Tester")
-        self.setMinimumSize(400, 320)
-        self._worker = None
-        layout = QVBoxLayout(self)
-        layout.setSpacing(16)
+def _quantized_cost(p):
+    return int(round(-math.log2(p) * MARKOV_COST_SCALE))
 
-        layout.addWidget(QLabel("Password to test:"))
-        self.password_edit = QLineEdit()
-        self.password_edit.setPlaceholderText("Enter password")
-        self.password_edit.setEchoMode(QLineEdit.Password)
-        self.password_edit.setMinimumHeight(ADDRESS_BAR_MIN_HEIGHT)
-        layout.addWidget(self.password_edit)
 
-        layout.addWidget(QLabel("Character set (e.g. abc123):"))
-        self.charset_edit = QLineEdit()
-        self.charset_edit.setPlaceholderText("abcdefghijklmnopqrstuvwxyz0123456789")
-        self.charset_edit.setText("abcdefghijklmnopqrstuvwxyz0123456789")
-        layout.addWidget(self.charset_edit)
+class MarkovModel:
+    """Per-position first-order character transitions trained from a corpus.
 
-        self.progress_bar = QProgressBar()
-        self.progress_bar.setVisible(False)
-        layout.addWidget(self.progress_bar)
+    Probabilities become integer costs (quantized -log2 p), and candidates are
+    enumerated level by level: every string of total cost 0, then 1, ... found
+    by a depth-first search pruned with per-position min/max costs. Memory is
+    bounded by the tables and the password length, never the keyspace."""
 
-        self.log_text = QTextEdit()
-        self.log_text.setReadOnly(True)
-        self.log_text.setMaximumHeight(120)
-        layout.addWidget(self.log_text)
+    def __init__(self, charset, positions=MARKOV_POSITIONS):
+        self.charset = "".join(dict.fromkeys(charset))
+        self._index = {c: i for i, c in enumerate(self.charset)}
+        k = len(self.charset)
+        self._positions = max(2, positions)
+        self._first = [0] * k
+        self._trans = [[[0] * k for _ in range(k)] for _ in range(self._positions - 1)]
+        self._lengths = Counter()
+        self.words = 0
+        self._compile()
 
-        self.run_btn = QPushButton("Start test")
-        self.run_btn.setMinimumHeight(BUTTON_MIN_SIZE)
-        self.run_btn.clicked.connect(self._start_test)
-        layout.addWidget(self.run_btn)
+    def train(self, words, limit=MARKOV_TRAIN_WORDS):
+        """Count transitions in words; those with characters outside the charset are skipped."""
+        index = self._index
+        last = self._positions - 2
+        for word in words:
+            if self.words >= limit:
+                break
+            idx = [index.get(c) for c in word]
+            if not idx or None in idx:
+                continue
+            self.words += 1
+            self._lengths[len(idx)] += 1
+            self._first[idx[0]] += 1
+            for pos in range(1, len(idx)):
+                self._trans[min(pos - 1, last)][idx[pos - 1]][idx[pos]] += 1
+        self._compile()
 
-    def _log(self, msg):
-        self.log_text.append(msg)
+    def _compile(self):
+        """Smoothed (add-one) costs, each table sorted cheapest first."""
+        def costs(counts):
+            total = sum(counts) + len(counts)
+            return sorted((_quantized_cost((n + 1) / total), ci) for ci, n in enumerate(counts))
+        self._first_costs = costs(self._first)
+        self._trans_costs = [[costs(row) for row in table] for table in self._trans]
+        self._min_at = [self._first_costs[0][0]] + [
+            min(row[0][0] for row in table) for table in self._trans_costs]
+        self._max_at = [self._first_costs[-1][0]] + [
+            max(row[-1][0] for row in table) for table in self._trans_costs]
 
-    def _start_test(self):
-        password = self.password_edit.text()
-        charset = self.charset_edit.text() or "abc"
-        if not password:
-            QMessageBox.warning(self, "Password Tester", "Enter a password to test.")
-            return
-        if self._worker and self._worker.isRunning():
-            self._worker.abort()
-            return
-        self._log(f"Testing password (length {len(password)}) with charset length {len(charset)}...")
-        self.progress_bar.setVisible(True)
-        self.progress_bar.setRange(0, 0)
-        self.run_btn.setText("Cancel")
-        self._worker = PasswordCrackerWorker(password, charset, self)
-        self._worker.progress.connect(self._on_progress)
-        self._worker.finished_signal.connect(self._on_finished)
-        self._worker.start()
+    def _table(self, pos, prev):
+        if pos == 0:
+            return self._first_costs
+        return self._trans_costs[min(pos - 1, self._positions - 2)][prev]
 
-    def _on_progress(self, current, total, attempt):
-        if total > 0:
-            self.progress_bar.setRange(0, total)
-            self.progress_bar.setValue(min(current, total))
-        if current % 100 == 0 or current <= 3:
-            self._log(f"Trying: {attempt}")
+    def _position_bound(self, bounds, pos):
+        return bounds[min(pos, len(bounds) - 1)]
 
-    def _on_finished(self, found, msg):
-        self.progress_bar.setVisible(False)
-        self.progress_bar.setRange(0, 100)
-        self.run_btn.setText("Start test")
-        self._log(msg)
-        QMessageBox.information(self, "Password Tester", msg)
+    def length_costs(self, max_len):
+        total = sum(self._lengths[n] for n in range(1, max_len + 1)) + max_len
+        return {n: _quantized_cost((self._lengths[n] + 1) / total) for n in range(1, max_len + 1)}
 
+    def candidates(self, max_len):
+        """Every string up to max_len over the charset, cheapest cost level first."""
+        len_cost = self.length_costs(max_len)
+        suffix = {}
+        for n in range(1, max_len + 1):
+            mins = [self._position_bound(self._min_at, i) for i in range(n)]
+            maxs = [self._position_bound(self._max_at, i) for i in range(n)]
+            suffix[n] = (list(accumulate(reversed(mins)))[::-1] + [0],
+                         list(accumulate(reversed(maxs)))[::-1] + [0])
+        top = max(len_cost[n] + suffix[n][1][0] for n in suffix)
+        for level in range(top + 1):
+            for n in range(1, max_len + 1):
+                budget = level - len_cost[n]
+                lo, hi = suffix[n]
+                if lo[0] <= budget <= hi[0]:
+                    yield from self._level(n, budget, lo, hi)
 
-# -----------------------------------------------------------------------------
-# Web profile (shared; modern user agent for better site compatibility)
-# -----------------------------------------------------------------------------
-USER_AGENT = (
-    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-)
+    def _level(self, n, budget, lo, hi):
+        """Strings of length n whose transition costs sum to exactly budget."""
+        chars = self.charset
+        out = [""] * n
 
+        def walk(pos, prev, remaining):
+            rest_lo, rest_hi = lo[pos + 1], hi[pos + 1]
+            for cost, ci in self._table(pos, prev):
+                left = remaining - cost
+                if left < rest_lo:
+                    break  # tables are sorted: every later entry costs more
+                if left > rest_hi:
+                    continue
+                out[pos] = chars[ci]
+                if pos == n - 1:
+                    yield "".join(out)
+                else:
+                    yield from walk(pos + 1, ci, left)
 
-def get_browser_profile():
-    """Shared profile with modern user agent so sites load correctly."""
-    profile = QWebEngineProfile.defaultProfile()
-    profile.setHttpUserAgent(USER_AGENT)
-    return profile
+        return walk(0, None, budget)
 
 
-# -----------------------------------------------------------------------------
-# Browser tab (one QWebEngineView per tab)
-# -----------------------------------------------------------------------------
-class BrowserTab(QWebEngineView):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        page = QWebEnginePage(get_browser_profile(), self)
-        self.setPage(page)
-        self.setUrl(QUrl(HOME_URL))
+def train_markov(charset, corpus, skip=None):
+    """MarkovModel trained on a wordlist file; skip(i) excludes the i-th word (for hold-out)."""
+    model = MarkovModel(charset)
 
+    def words():
+        i = 0
+        for batch, _, _ in iter_wordlist(corpus):
+            for word in batch:
+                if word and not (skip and skip(i)):
+                    yield word
+                i += 1
 
-# -----------------------------------------------------------------------------
-# Main window
-# -----------------------------------------------------------------------------
-class LigmaBrowser(QMainWindow):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("Ligma Browser")
-        self.setMinimumSize(900, 600)
-        self.resize(1200, 800)
-        self._dark_mode = True
-        self._apply_theme()
+    model.train(words())
+    return model
 
-        central = QWidget()
-        self.setCentralWidget(central)
-        layout = QVBoxLayout(central)
-        layout.setContentsMargins(0, 0, 0, 0)
+
+def format_duration(seconds):
+    """Rough human duration for very small to astronomically large times."""
+    for unit, size in (("years", 365 * 86400), ("days", 86400), ("h", 3600), ("min", 60), ("s", 1)):
+        if seconds >= size:
+            value = seconds / size
+            return f"{value:.3g} {unit}" if value < 1e6 else f"{value:.2e} {unit}"
+    return f"{seconds * 1000:.3g} ms"
+
+
+def product_rank(word, charset):
+    """1-based position of word in the original shortest-first product enumeration."""
+    k = len(charset)
+    index = {c: i for i, c in enumerate(charset)}
+    rank = sum(k ** n for n in range(1, len(word)))
+    lex = 0
+    for c in word:
+        lex = lex * k + index[c]
+    return rank + lex + 1
+
+
+def markov_benchmark(corpus, charset, report=None, abort=None):
+    """Expected time-to-find of Markov vs. product order on held-out corpus words.
+
+    Every MARKOV_HOLDOUT_EVERY-th word is held out and the model is trained on
+    the rest. Product ranks are exact (closed form); Markov ranks come from
+    enumerating up to MARKOV_BENCH_BUDGET candidates. Returns a text report."""
+    report = report or (lambda msg: None)
+    charset = "".join(dict.fromkeys(charset))
+    held = []
+    i = 0
+    for batch, _, _ in iter_wordlist(corpus):
+        for word in batch:
+            if (word and i % MARKOV_HOLDOUT_EVERY == 0 and len(word) <= MARKOV_BENCH_MAX_LEN
+                    and all(c in charset for c in word)):
+                held.append(word)
+            i += 1
+        if len(held) >= MARKOV_BENCH_PASSWORDS:
+            break
+    held = list(dict.fromkeys(held))[:MARKOV_BENCH_PASSWORDS]
+    if not held:
+        return "No held-out words fit the character set."
+    report(f"Holding out {len(held)} words; training on the rest of {os.path.basename(corpus)}...")
+    model = train_markov(charset, corpus, skip=lambda n: n % MARKOV_HOLDOUT_EVERY == 0)
+
+    report("Enumerating Markov candidates...")
+    pending = set(held)
+    markov_rank = {}
+    start = time.monotonic()
+    count = 0
+    for count, cand in enumerate(model.candidates(max(map(len, held))), 1):
+        if cand in pending:
+            pending.discard(cand)
+            markov_rank[cand] = count
+            if not pending:
+                break
+        if count >= MARKOV_BENCH_BUDGET or (abort and count % 10000 == 0 and abort()):
+            break
+    markov_rate = count / max(time.monotonic() - start, 1e-6)
+
+    # Product order rate: the same join-and-compare loop the tester runs
+    start = time.monotonic()
+    n = 0
+    for n, attempt in enumerate(product(charset, repeat=6), 1):
+        if "".join(attempt) == held[0] or n >= 200000:
+            break
+    product_rate = n / max(time.monotonic() - start, 1e-6)
+
+    def expected(ranks, rate, total):
+        found = sorted(ranks)
+        if len(found) < (total + 1) // 2:
+            return f"> {format_duration(MARKOV_BENCH_BUDGET / rate)} (median beyond budget)"
+        return format_duration(found[(total - 1) // 2] / rate)
+
+    product_ranks = [product_rank(w, charset) for w in held]
+    wins = sum(1 for w in held if markov_rank.get(w, float("inf")) < product_rank(w, charset))
+    lines = [
+        f"Held-out passwords: {len(held)} (corpus {os.path.basename(corpus)}, charset {len(charset)} chars)",
+        f"Markov:  {len(markov_rank)}/{len(held)} found within {MARKOV_BENCH_BUDGET:,} candidates, "
+        f"{markov_rate:,.0f} candidates/s, median time-to-find {expected(markov_rank.values(), markov_rate, len(held))}",
+        f"Product: {sum(1 for r in product_ranks if r <= MARKOV_BENCH_BUDGET)}/{len(held)} within the same budget, "
+        f"{product_rate:,.0f} candidates/s, median time-to-find {expected(product_ranks, product_rate, len(held))}",
+        f"Markov order finds {wins}/{len(held)} held-out passwords sooner.",
+    ]
+    return "\n".join(lines)
+
+
+class MarkovBenchmarkWorker(QThread):
+    message = pyqtSignal(str)
+    finished_signal = pyqtSignal(str)
+
+    def __init__(self, corpus, charset, parent=None):
+        super().__init__(parent)
+        self._corpus = corpus
+        self._charset = charset
+        self._abort = False
+
+    def abort(self):
+        self._abort = True
+
+    def run(self):
+        try:
+            text = markov_benchmark(self._corpus, self._charset, self.message.emit, lambda: self._abort)
+        except Exception as e:
+            text = f"Benchmark failed: {e}"
+        self.finished_signal.emit(text)
+
+
+# -----------------------------------------------------------------------------
+# Distributed brute force (coordinator in the dialog, --crack-worker nodes)
+# -----------------------------------------------------------------------------
+def keyspace_size(k, max_len):
+    """Candidates in the shortest-first product enumeration of lengths 1..max_len."""
+    return sum(k ** n for n in range(1, max_len + 1))
+
+
+def iter_keyspace(charset, max_len, start, end):
+    """Candidates with global indices [start, end) of the shortest-first product order.
+
+    Jumps straight to start: the prefix is computed from the index and only
+    the short suffix is enumerated with product(), so leases deep into the
+    keyspace cost nothing to reach."""
+    k = len(charset)
+    offset = 0
+    for n in range(1, max_len + 1):
+        size = k ** n
+        lo, hi = max(start - offset, 0), min(end - offset, size)
+        if lo < hi:
+            m = 0  # suffix length enumerated by product()
+            while m < n and k ** (m + 1) <= DIST_SUFFIX_BLOCK:
+                m += 1
+            block = k ** m
+            first, last = lo // block, (hi - 1) // block
+            for b in range(first, last + 1):
+                prefix, rem = "", b
+                for _ in range(n - m):
+                    rem, d = divmod(rem, k)
+                    prefix = charset[d] + prefix
+                suffixes = map("".join, product(charset, repeat=m))
+                skip = lo - b * block if b == first else 0
+                take = (hi - b * block if b == last else block) - skip
+                for suffix in islice(suffixes, skip, skip + take):
+                    yield prefix + suffix
+        offset += size
+        if offset >= end:
+            return
+
+
+def crack_target(password):
+    """What workers receive instead of the password: its SHA-256."""
+    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+
+
+class CrackCoordinator(QObject):
+    """Splits the brute-force keyspace into leases for --crack-worker nodes.
+
+    Protocol: newline-delimited JSON over TCP. A worker sends hello (with the
+    shared token), then claim; it gets a lease [start, end), sends progress
+    heartbeats (answered continue/stop, or abandon once the lease is no longer
+    its own) and a result (answered ack/stop). Leases without a heartbeat for
+    DIST_LEASE_TIMEOUT_S go back to the pool, minus the part the worker
+    reported as done. The job sent after hello carries the password's unsalted
+    SHA-256 in cleartext, so the coordinator binds to localhost unless remote
+    workers are explicitly allowed."""
+    progress = pyqtSignal(float, float, int)  # fraction searched, candidates/s, workers
+    finished_signal = pyqtSignal(bool, str)
+    message = pyqtSignal(str)
+
+    def __init__(self, password, charset, token, port=0, host=QHostAddress.LocalHost,
+                 lease_size=DIST_LEASE_SIZE, lease_timeout=DIST_LEASE_TIMEOUT_S, parent=None):
+        super().__init__(parent)
+        self._charset = "".join(dict.fromkeys(charset))
+        self._max_len = len(password)
+        self._target = crack_target(password)
+        self._token = token
+        self._port = port
+        self._host = QHostAddress(host)
+        self._lease_size = lease_size
+        self._lease_timeout = lease_timeout
+        self.total = keyspace_size(len(self._charset), self._max_len)
+        self._next = 0
+        self._free = deque()   # reassigned [start, end) ranges, served first
+        self._leases = {}      # lease id -> {"start", "end", "done", "worker", "expires"}
+        self._lease_ids = 0
+        self._searched = 0
+        self._workers = {}     # socket -> {"name", "rate"}
+        self._result = None
+        self._server = QTcpServer(self)
+        self._server.newConnection.connect(self._on_new_connection)
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._tick)
+
+    def listen(self):
+        if not self._server.listen(self._host, self._port):
+            return False
+        self._timer.start(int(DIST_HEARTBEAT_S * 1000))
+        return True
+
+    def port(self):
+        return self._server.serverPort()
+
+    def stop(self, message="Cancelled."):
+        if self._result is None:
+            self._finish(False, message)
+
+    def _finish(self, found, message):
+        self._result = (found, message)
+        self._timer.stop()
+        self._server.close()
+        self.finished_signal.emit(found, message)
+
+    # -- network --------------------------------------------------------------
+    def _on_new_connection(self):
+        while self._server.hasPendingConnections():
+            sock = self._server.nextPendingConnection()
+            sock.readyRead.connect(lambda s=sock: self._on_ready_read(s))
+            sock.disconnected.connect(lambda s=sock: self._on_disconnected(s))
+
+    def _on_disconnected(self, sock):
+        if sip.isdeleted(self):
+            return  # sockets outlive a coordinator torn down with the dialog
+        worker = self._workers.pop(sock, None)
+        if worker is not None:
+            self.message.emit(f"Worker {worker['name']} disconnected")
+            for lease_id, lease in list(self._leases.items()):
+                if lease["worker"] is sock:
+                    self._return_lease(lease_id)
+        sock.deleteLater()
+
+    def _send(self, sock, payload):
+        if not sip.isdeleted(sock) and sock.state() == sock.ConnectedState:
+            sock.write(json.dumps(payload).encode("utf-8") + b"\n")
+
+    def _on_ready_read(self, sock):
+        while sock.canReadLine():
+            try:
+                msg = json.loads(bytes(sock.readLine()).decode("utf-8"))
+                self._handle(sock, msg)
+            except (ValueError, KeyError, TypeError):
+                sock.abort()
+                return
+
+    def _handle(self, sock, msg):
+        kind = msg["type"]
+        if kind == "hello":
+            if not hmac.compare_digest(str(msg.get("token", "")).encode(), self._token.encode()):
+                self._send(sock, {"type": "error", "message": "bad token"})
+                sock.disconnectFromHost()
+                return
+            self._workers[sock] = {"name": str(msg.get("worker", "?")), "rate": 0.0}
+            self.message.emit(f"Worker {self._workers[sock]['name']} joined")
+            self._send(sock, {"type": "job", "charset": self._charset, "max_len": self._max_len,
+                              "target": self._target, "algo": "sha256"})
+            return
+        if sock not in self._workers:
+            sock.abort()
+            return
+        if kind == "claim":
+            self._send(sock, self._claim(sock))
+        elif kind == "progress":
+            self._workers[sock]["rate"] = float(msg.get("rate", 0))
+            if self._result is not None:
+                self._send(sock, {"type": "stop"})
+                return
+            lease = self._leases.get(msg["lease"])
+            if lease is None or lease["worker"] is not sock:
+                # Expired and handed to another worker; searching it further is wasted work
+                self._send(sock, {"type": "abandon"})
+                return
+            lease["done"] = int(msg["done"])
+            lease["expires"] = time.monotonic() + self._lease_timeout
+            self._send(sock, {"type": "continue"})
+        elif kind == "result":
+            self._on_result(sock, msg)
+
+    # -- leases ---------------------------------------------------------------
+    def _claim(self, sock):
+        if self._result is not None:
+            return {"type": "done"}
+        if self._free:
+            start, end = self._free.popleft()
+        elif self._next < self.total:
+            start, end = self._next, min(self._next + self._lease_size, self.total)
+            self._next = end
+        else:
+            # Everything is leased; idle workers wait for expired leases
+            return {"type": "wait", "seconds": DIST_HEARTBEAT_S} if self._leases else {"type": "done"}
+        self._lease_ids += 1
+        self._leases[self._lease_ids] = {"start": start, "end": end, "done": 0, "worker": sock,
+                                         "expires": time.monotonic() + self._lease_timeout}
+        return {"type": "lease", "id": self._lease_ids, "start": start, "end": end}
+
+    def _return_lease(self, lease_id):
+        lease = self._leases.pop(lease_id)
+        start = lease["start"] + lease["done"]
+        self._searched += lease["done"]
+        if start < lease["end"]:
+            self._free.append((start, lease["end"]))
+
+    def _on_result(self, sock, msg):
+        lease = self._leases.get(msg["lease"])
+        if lease is not None and lease["worker"] is sock:
+            del self._leases[msg["lease"]]
+            self._searched += lease["end"] - lease["start"]
+        # else the lease expired and was reassigned meanwhile; a find still counts
+        seconds = float(msg.get("seconds") or 0)
+        if seconds > 0:
+            self._workers[sock]["rate"] = int(msg.get("tried", 0)) / seconds
+        found = msg.get("found")
+        if found is not None and crack_target(found) == self._target and self._result is None:
+            self._finish(True, f"Found: {found} (by worker {self._workers[sock]['name']})")
+        # Always answer: the worker blocks on the reply
+        self._send(sock, {"type": "stop" if self._result else "ack"})
+        self._check_exhausted()
+
+    def _check_exhausted(self):
+        if self._result is None and self._searched >= self.total:
+            self._finish(False, f"Not found in {self.total:,} candidates.")
+
+    def _tick(self):
+        now = time.monotonic()
+        for lease_id, lease in list(self._leases.items()):
+            if lease["expires"] < now:
+                worker = self._workers.get(lease["worker"], {"name": "?"})
+                self.message.emit(f"Lease {lease_id} from worker {worker['name']} expired; reassigning")
+                self._return_lease(lease_id)
+        in_flight = sum(lease["done"] for lease in self._leases.values())
+        rate = sum(w["rate"] for w in self._workers.values())
+        self.progress.emit((self._searched + in_flight) / self.total, rate, len(self._workers))
+        self._check_exhausted()
+
+
+def run_crack_worker(address, token, name=None):
+    """--crack-worker HOST:PORT: claim leases from a coordinator until it is done."""
+    host, _, port = address.rpartition(":")
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    try:
+        sock = socket.create_connection((host or "127.0.0.1", int(port)))
+    except (OSError, ValueError) as e:
+        print(f"Could not reach coordinator {address}: {e}", file=sys.stderr)
+        return 1
+    stream = sock.makefile("rwb")
+
+    def call(payload):
+        stream.write(json.dumps(payload).encode("utf-8") + b"\n")
+        stream.flush()
+        line = stream.readline()
+        if not line:
+            raise ConnectionError("coordinator closed the connection")
+        return json.loads(line)
+
+    try:
+        job = call({"type": "hello", "worker": name, "token": token})
+        if job.get("type") != "job":
+            print(f"Coordinator refused: {job.get('message', job)}", file=sys.stderr)
+            return 1
+        charset, max_len = job["charset"], job["max_len"]
+        target = bytes.fromhex(job["target"])
+        sha256 = hashlib.sha256
+        rate = 0.0
+        while True:
+            lease = call({"type": "claim"})
+            if lease["type"] == "done":
+                return 0
+            if lease["type"] == "wait":
+                time.sleep(lease["seconds"])
+                continue
+            start = time.monotonic()
+            last_beat = start
+            done = 0
+            found = None
+            abandoned = False
+            for candidate in iter_keyspace(charset, max_len, lease["start"], lease["end"]):
+                done += 1
+                if sha256(candidate.encode("utf-8")).digest() == target:
+                    found = candidate
+                    break
+                if not done & 0xFFF and time.monotonic() - last_beat >= DIST_HEARTBEAT_S:
+                    last_beat = time.monotonic()
+                    rate = done / (last_beat - start)
+                    reply = call({"type": "progress", "lease": lease["id"], "done": done, "rate": rate})
+                    if reply["type"] == "stop":
+                        return 0
+                    if reply["type"] == "abandon":
+                        abandoned = True  # the lease was reassigned; claim a new one
+                        break
+            if abandoned:
+                continue
+            reply = call({"type": "result", "lease": lease["id"], "found": found,
+                          "tried": done, "seconds": time.monotonic() - start})
+            if reply["type"] == "stop":
+                return 0
+    except (OSError, ValueError, KeyError, ConnectionError) as e:
+        print(f"Worker stopped: {e}", file=sys.stderr)
+        return 1
+    finally:
+        sock.close()
+
+
+# -----------------------------------------------------------------------------
+# Breached-password index (memory-mapped Bloom filter over a password list)
+# -----------------------------------------------------------------------------
+BREACH_HEADER = struct.Struct("<8sIIQQQd16x")  # magic, version, key format, bits, hashes, count, error rate
+BREACH_MAGIC = b"LIGMABLM"
+BREACH_VERSION = 1
+BREACH_KEY_PLAIN = 0
+BREACH_KEY_SHA1 = 1  # Pwned Passwords style "SHA1HEX:count" lines
+SHA1_LINE_RE = re.compile(r"^[0-9A-Fa-f]{40}(:\d+)?$")
+
+
+def breach_list_format(path):
+    """BREACH_KEY_SHA1 when the list's first entry is a SHA-1 hex digest, else BREACH_KEY_PLAIN."""
+    for words, _, _ in iter_wordlist(path, 4096):
+        for word in words:
+            if word:
+                return BREACH_KEY_SHA1 if SHA1_LINE_RE.match(word) else BREACH_KEY_PLAIN
+        break
+    return BREACH_KEY_PLAIN
+
+
+def count_lines(path):
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lines = sum(mm[pos:pos + BREACH_BUILD_CHUNK].count(b"\n")
+                        for pos in range(0, size, BREACH_BUILD_CHUNK))
+            return lines + (mm[size - 1] != ord("\n"))
+
+
+def build_breach_index(list_path, out_path, error_rate=BREACH_ERROR_RATE, capacity=None, report=None):
+    """Write a Bloom filter of every password in list_path to out_path; returns its entry count.
+
+    The filter is written through a writable mapping of the output file, so
+    building needs no more memory than the pages the OS keeps resident."""
+    report = report or (lambda done, total, count, rate: None)
+    key_format = breach_list_format(list_path)
+    capacity = capacity or max(1, count_lines(list_path))
+    num_bytes = BloomFilter.size_for(capacity, error_rate)
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    count = 0
+    start = time.monotonic()
+    try:
+        with open(tmp, "w+b") as f:
+            f.truncate(BREACH_HEADER.size + num_bytes)  # sparse; zero pages cost nothing until set
+            with mmap.mmap(f.fileno(), 0) as mm:
+                view = memoryview(mm)[BREACH_HEADER.size:]
+                try:
+                    bloom = BloomFilter(capacity, error_rate, bits=view, num_bits=num_bytes * 8)
+                    for words, done, total in iter_wordlist(list_path, BREACH_BUILD_CHUNK):
+                        if key_format == BREACH_KEY_SHA1:
+                            keys = [bytes.fromhex(w[:40]) for w in words if SHA1_LINE_RE.match(w)]
+                        else:
+                            keys = [w.encode("utf-8") for w in words if w]
+                        bloom.update(keys)
+                        count += len(keys)
+                        report(done, total, count, count / max(time.monotonic() - start, 1e-6))
+                    mm[:BREACH_HEADER.size] = BREACH_HEADER.pack(
+                        BREACH_MAGIC, BREACH_VERSION, key_format, bloom.num_bits, bloom.num_hashes, count,
+                        error_rate)
+                    mm.flush()
+                finally:
+                    view.release()
+        os.replace(tmp, out_path)
+    except BaseException:
+        # Also on Ctrl+C: the sparse file can be gigabytes
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return count
+
+
+class BreachIndex:
+    """Read-only breach index. Opening maps the file without reading it; each
+    lookup touches num_hashes bytes, so it costs microseconds at any size."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError("empty index file")
+        try:
+            magic, version, self.key_format, num_bits, num_hashes, self.count, self.error_rate = \
+                BREACH_HEADER.unpack_from(self._map)
+            if magic != BREACH_MAGIC or version != BREACH_VERSION:
+                raise ValueError("not a breach index")
+            if len(self._map) < BREACH_HEADER.size + (num_bits + 7) // 8:
+                raise ValueError("truncated breach index")
+        except struct.error:
+            self.close()
+            raise ValueError("truncated breach index")
+        except ValueError:
+            self.close()
+            raise
+        if hasattr(self._map, "madvise") and hasattr(mmap, "MADV_RANDOM"):
+            self._map.madvise(mmap.MADV_RANDOM)  # no read-ahead for scattered probes
+        self._view = memoryview(self._map)[BREACH_HEADER.size:]
+        self._bloom = BloomFilter(max(1, self.count), self.error_rate, bits=self._view,
+                                  num_bits=num_bits, num_hashes=num_hashes)
+
+    def __contains__(self, password):
+        key = password.encode("utf-8")
+        if self.key_format == BREACH_KEY_SHA1:
+            key = hashlib.sha1(key).digest()
+        return key in self._bloom
+
+    def close(self):
+        view = getattr(self, "_view", None)
+        if view is not None:
+            view.release()  # the mapping cannot close while a view is exported
+            self._view = None
+        self._map.close()
+        self._file.close()
+
+
+def run_build_breach_index(args):
+    """--build-breach-index LIST: build the index the password tester checks first."""
+    QCoreApplication.setApplicationName("Ligma Browser")  # same app data directory as the browser
+    if not 0 < args.breach_error_rate < 1:
+        print("--breach-error-rate must be between 0 and 1", file=sys.stderr)
+        return 2
+    out_path = args.breach_index or app_data_path(BREACH_INDEX_FILE)
+    last = [0.0]
+
+    def report(done, total, count, rate):
+        now = time.monotonic()
+        if now - last[0] >= 1 or done >= total:
+            last[0] = now
+            print(f"\r{done / total:6.1%}  {count:,} entries  {rate:,.0f}/s", end="", file=sys.stderr)
+
+    try:
+        count = build_breach_index(args.build_breach_index, out_path, args.breach_error_rate,
+                                   args.breach_capacity, report)
+    except (OSError, ValueError) as e:
+        print(f"\nCould not build breach index: {e}", file=sys.stderr)
+        return 1
+    print(f"\nWrote {count:,} entries to {out_path} ({format_bytes(os.path.getsize(out_path))}, "
+          f"false-positive rate {args.breach_error_rate:g})", file=sys.stderr)
+    return 0
+
+
+# -----------------------------------------------------------------------------
+# Rainbow tables (precomputed hash chains for short passwords)
+# -----------------------------------------------------------------------------
+RAINBOW_MAGIC = b"LIGMARBT"
+
+
+class RainbowSpace:
+    """Candidates of lengths min_len..max_len over charset, indexed in
+    shortest-first product order, and the hash and reduce steps chaining them.
+
+    Reduction is column-dependent, R_j(h) = (first 8 bytes of h + j) mod size,
+    so chains that collide in different columns do not merge."""
+
+    def __init__(self, charset, min_len, max_len, algo):
+        if algo not in RAINBOW_ALGORITHMS:
+            raise ValueError(f"unsupported hash {algo}")
+        if not charset or not 1 <= min_len <= max_len:
+            raise ValueError("need a charset and 1 <= min length <= max length")
+        self.charset, self.min_len, self.max_len, self.algo = charset, min_len, max_len, algo
+        k = len(charset)
+        self.bounds = list(accumulate(k ** n for n in range(min_len, max_len + 1)))
+        self.size = self.bounds[-1]
+        if self.size >= 1 << 64:
+            raise ValueError("keyspace does not fit 64-bit chain indices")
+        self._hash = getattr(hashlib, algo)
+
+    def __getstate__(self):  # pickled to pool workers as its parameters
+        return self.charset, self.min_len, self.max_len, self.algo
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def word(self, index):
+        slot = bisect.bisect_right(self.bounds, index)
+        lex = index - (self.bounds[slot - 1] if slot else 0)
+        k, charset = len(self.charset), self.charset
+        chars = []
+        for _ in range(self.min_len + slot):
+            lex, d = divmod(lex, k)
+            chars.append(charset[d])
+        return "".join(reversed(chars))
+
+    def index(self, word):
+        """Index of word, or None when it is outside the space."""
+        if not self.min_len <= len(word) <= self.max_len or any(c not in self.charset for c in word):
+            return None
+        slot = len(word) - self.min_len
+        lex = 0
+        for c in word:
+            lex = lex * len(self.charset) + self.charset.index(c)
+        return (self.bounds[slot - 1] if slot else 0) + lex
+
+    def digest(self, word):
+        return self._hash(word.encode("utf-8")).digest()
+
+    def reduce(self, digest, column):
+        return (int.from_bytes(digest[:8], "little") + column) % self.size
+
+    def walk(self, index, first, last):
+        """Chain index after applying columns first..last-1 to index."""
+        word, h, size, from_bytes = self.word, self._hash, self.size, int.from_bytes
+        for column in range(first, last):
+            index = (from_bytes(h(word(index).encode("utf-8")).digest()[:8], "little") + column) % size
+        return index
+
+
+def _rainbow_chains(task):
+    """Pool task: chains [first, first + count) as (end, start) uint64 pairs sorted by end."""
+    space, first, count, chains, chain_len = task
+    pairs = []
+    for chain in range(first, first + count):
+        start = chain * space.size // chains  # starts spread evenly over the space
+        pairs.append((space.walk(start, 0, chain_len), start))
+    pairs.sort()
+    out = array("Q")
+    for end, start in pairs:
+        out.append(end)
+        out.append(start)
+    return out.tobytes()
+
+
+def build_rainbow_table(space, path, chain_len=RAINBOW_CHAIN_LEN, chains=None, workers=None,
+                        report=None, abort=None):
+    """Precompute chains on every core and write the table; returns its header dict, or None if aborted.
+
+    Workers return sorted runs which are merged into the file, keeping one
+    chain per endpoint: chains that merged cover nothing the kept one does not."""
+    report = report or (lambda done, total: None)
+    chains = chains or max(1, math.ceil(RAINBOW_COVERAGE * space.size / chain_len))
+    workers = workers or os.cpu_count() or 1
+    tasks = [(space, first, min(RAINBOW_TASK_CHAINS, chains - first), chains, chain_len)
+             for first in range(0, chains, RAINBOW_TASK_CHAINS)]
+    start = time.monotonic()
+    runs = []
+    # spawn, not fork: the GUI process has Qt threads running
+    with multiprocessing.get_context("spawn").Pool(workers) as pool:
+        for done, part in enumerate(pool.imap_unordered(_rainbow_chains, tasks), 1):
+            if abort is not None and abort():
+                pool.terminate()
+                return None
+            run = array("Q")
+            run.frombytes(part)
+            runs.append(run)
+            report(done, len(tasks))
+    seconds = time.monotonic() - start
+    tmp = f"{path}.{os.getpid()}.tmp"
+    kept = 0
+    try:
+        with open(tmp, "wb") as f:
+            f.write(bytes(RAINBOW_HEADER_BYTES))
+            out = array("Q")
+            last = None
+            for end, first in heapq.merge(*(zip(run[0::2], run[1::2]) for run in runs)):
+                if end == last:
+                    continue
+                last = end
+                out.append(end)
+                out.append(first)
+                kept += 1
+                if len(out) >= 1 << 16:
+                    f.write(out.tobytes())
+                    del out[:]
+            f.write(out.tobytes())
+            header = {"algo": space.algo, "charset": space.charset, "min_len": space.min_len,
+                      "max_len": space.max_len, "chain_len": chain_len, "chains": kept, "generated": chains,
+                      "keyspace": space.size, "build_seconds": seconds, "workers": workers,
+                      "hash_rate": chains * chain_len / max(seconds, 1e-6) / workers,
+                      "byteorder": sys.byteorder}
+            blob = RAINBOW_MAGIC + json.dumps(header).encode("utf-8")
+            if len(blob) > RAINBOW_HEADER_BYTES:
+                raise ValueError("charset too long for the table header")
+            f.seek(0)
+            f.write(blob)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return header
+
+
+class RainbowTable:
+    """A built table, memory-mapped; endpoints are found by binary search."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = None
+        self._pairs = None
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            head = self._map[:RAINBOW_HEADER_BYTES]
+            if not head.startswith(RAINBOW_MAGIC):
+                raise ValueError("not a rainbow table")
+            self.header = json.loads(head[len(RAINBOW_MAGIC):].rstrip(b"\0").decode("utf-8"))
+            if self.header.get("byteorder") != sys.byteorder:
+                raise ValueError("table was built on a machine of the other byte order")
+            h = self.header
+            self.space = RainbowSpace(h["charset"], h["min_len"], h["max_len"], h["algo"])
+            body = memoryview(self._map)[RAINBOW_HEADER_BYTES:]
+            try:
+                self._pairs = body.cast("Q")
+            finally:
+                body.release()
+            if len(self._pairs) % 2:
+                raise ValueError("truncated rainbow table")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.close()
+            if isinstance(e, TypeError):  # cast() of a body that is not whole uint64s
+                raise ValueError("truncated rainbow table") from e
+            raise
+        self.count = len(self._pairs) // 2
+
+    def size_bytes(self):
+        return len(self._map)
+
+    def _find(self, end):
+        pairs = self._pairs
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if pairs[2 * mid] < end:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.count and pairs[2 * lo] == end else None
+
+    def lookup(self, digest, abort=None):
+        """(password or None, false alarms) for a digest of the table's hash."""
+        space, t = self.space, self.header["chain_len"]
+        false_alarms = 0
+        for column in range(t - 1, -1, -1):  # cheapest guesses (target near the chain end) first
+            if abort is not None and abort():
+                break
+            end = space.walk(space.reduce(digest, column), column + 1, t)
+            pos = self._find(end)
+            if pos is None:
+                continue
+            candidate = space.word(space.walk(self._pairs[2 * pos + 1], 0, column))
+            if space.digest(candidate) == digest:
+                return candidate, false_alarms
+            false_alarms += 1
+        return None, false_alarms
+
+    def close(self):
+        if self._pairs is not None:
+            self._pairs.release()
+            self._pairs = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+def rainbow_table_path(space, chain_len=RAINBOW_CHAIN_LEN):
+    charset_id = hashlib.sha1(space.charset.encode("utf-8")).hexdigest()[:8]
+    return app_data_path("rainbow", f"{space.algo}-{charset_id}-{space.min_len}-{space.max_len}-{chain_len}.rt")
+
+
+class RainbowBuildWorker(QThread):
+    progress = pyqtSignal(int, int)  # tasks done, tasks
+    finished_signal = pyqtSignal(object, str)  # header dict or None, error
+
+    def __init__(self, space, path, parent=None):
+        super().__init__(parent)
+        self._space = space
+        self._path = path
+        self._abort = False
+
+    def abort(self):
+        self._abort = True
+
+    def run(self):
+        try:
+            header = build_rainbow_table(self._space, self._path, report=self.progress.emit,
+                                         abort=lambda: self._abort)
+        except Exception as e:
+            self.finished_signal.emit(None, f"Table build failed: {e}")
+            return
+        self.finished_signal.emit(header, "" if header else "Table build cancelled.")
+
+
+class RainbowLookupWorker(QThread):
+    finished_signal = pyqtSignal(object, float, int, str)  # password or None, seconds, false alarms, error
+
+    def __init__(self, path, password, parent=None):
+        super().__init__(parent)
+        self._path = path
+        self._password = password
+        self._abort = False
+
+    def abort(self):
+        self._abort = True
+
+    def run(self):
+        try:
+            table = RainbowTable(self._path)
+        except (OSError, ValueError) as e:
+            self.finished_signal.emit(None, 0.0, 0, f"Could not open table: {e}")
+            return
+        try:
+            digest = table.space.digest(self._password)
+            start = time.perf_counter()
+            found, false_alarms = table.lookup(digest, lambda: self._abort)
+            self.finished_signal.emit(found, time.perf_counter() - start, false_alarms,
+                                      "Lookup cancelled." if self._abort else "")
+        finally:
+            table.close()
+
+
+# -----------------------------------------------------------------------------
+# Password cracker worker (runs in thread to avoid UI freeze)
+# -----------------------------------------------------------------------------
+class PasswordCrackerWorker(QThread):
+    """Brute force over charset, or dictionary mode when a wordlist is given."""
+    progress = pyqtSignal(int, int, str)   # current, total, attempt
+    finished_signal = pyqtSignal(bool, str)  # found, result_message
+    stats = pyqtSignal(float, float)  # dictionary mode: words/sec, rule expansion factor
+
+    def __init__(self, password, charset, parent=None, wordlist=None, rules_path=None, markov_corpus=None,
+                 mask=None):
+        super().__init__(parent)
+        self._mask = mask  # parsed per-position charsets
+        self._password = password
+        self._charset = charset
+        self._wordlist = wordlist
+        self._rules_path = rules_path
+        self._markov_corpus = markov_corpus
+        self._abort = False
+
+    def abort(self):
+        self._abort = True
+
+    def run(self):
+        if self._wordlist:
+            self._run_dictionary()
+        elif self._markov_corpus:
+            self._run_markov()
+        elif self._mask:
+            self._run_mask()
+        else:
+            self._run_brute_force()
+
+    def _run_mask(self):
+        """Only the masked keyspace, joined and compared a batch at a time in C."""
+        try:
+            total = min(mask_keyspace(self._mask), MASK_LIMIT)
+            candidates = map("".join, product(*self._mask))
+            count = 0
+            last_emit = 0.0
+            while count < total:
+                batch = list(islice(candidates, min(MASK_BATCH, total - count)))
+                if not batch or self._abort:
+                    break
+                if self._password in batch:
+                    count += batch.index(self._password) + 1
+                    self.progress.emit(count, total, self._password)
+                    self.finished_signal.emit(True, f"Found: {self._password} (candidate {count:,} of {total:,})")
+                    return
+                count += len(batch)
+                now = time.monotonic()
+                if now - last_emit >= CRACK_PROGRESS_INTERVAL_S:
+                    last_emit = now
+                    self.progress.emit(count, total, batch[-1])
+            if self._abort:
+                self.finished_signal.emit(False, "Cancelled.")
+            elif total < mask_keyspace(self._mask):
+                self.finished_signal.emit(False, f"Not found (limit of {MASK_LIMIT:,} reached).")
+            else:
+                self.finished_signal.emit(False, f"Not found in the mask's {total:,} candidates.")
+        except Exception as e:
+            self.finished_signal.emit(False, f"Error: {e}")
+
+    def _run_markov(self):
+        """Same keyspace and limit as brute force, most probable candidates first."""
+        try:
+            if not self._password or not self._charset:
+                self.finished_signal.emit(False, "Invalid input.")
+                return
+            model = train_markov(self._charset, self._markov_corpus)
+            total = min(len(model.charset) ** len(self._password), BRUTE_FORCE_LIMIT)
+            last_emit = 0.0
+            for count, attempt in enumerate(model.candidates(len(self._password)), 1):
+                if self._abort:
+                    self.finished_signal.emit(False, "Cancelled.")
+                    return
+                if attempt == self._password:
+                    self.progress.emit(count, total, attempt)
+                    self.finished_signal.emit(True, f"Found: {attempt} (candidate {count:,}, "
+                                                    f"model trained on {model.words:,} words)")
+                    return
+                if count >= total:
+                    break
+                now = time.monotonic()
+                if now - last_emit >= CRACK_PROGRESS_INTERVAL_S:
+                    last_emit = now
+                    self.progress.emit(count, total, attempt)
+            self.finished_signal.emit(False, "Not found (limit reached).")
+        except Exception as e:
+            self.finished_signal.emit(False, f"Error: {e}")
+
+    def _run_dictionary(self):
+        """Mangle every word with every rule; progress is per-mille of the file read."""
+        try:
+            rules = load_rules(self._rules_path)
+            password = self._password
+            words = candidates = 0
+            start = last_emit = time.monotonic()
+            for batch, done, size in iter_wordlist(self._wordlist):
+                if self._abort:
+                    self.finished_signal.emit(False, "Cancelled.")
+                    return
+                for i, word in enumerate(batch):
+                    if not word:
+                        continue
+                    mangled = {rule(word) for rule in rules}
+                    candidates += len(mangled)
+                    if password in mangled:
+                        words += i + 1
+                        self._emit_stats(words, candidates, start)
+                        self.finished_signal.emit(True, f"Found: {password} (from wordlist entry {word!r})")
+                        return
+                words += len(batch)
+                now = time.monotonic()
+                if now - last_emit >= CRACK_PROGRESS_INTERVAL_S:
+                    last_emit = now
+                    self.progress.emit(done * 1000 // size, 1000, batch[-1] if batch else "")
+                    self._emit_stats(words, candidates, start)
+            self._emit_stats(words, candidates, start)
+            self.finished_signal.emit(False, f"Not found in {words:,} words ({candidates:,} candidates).")
+        except Exception as e:
+            self.finished_signal.emit(False, f"Error: {e}")
+
+    def _emit_stats(self, words, candidates, start):
+        elapsed = max(time.monotonic() - start, 1e-6)
+        self.stats.emit(words / elapsed, candidates / words if words else 0.0)
+
+    def _run_brute_force(self):
+        try:
+            total = len(self._charset) ** len(self._password)
+            if total <= 0 or len(self._password) == 0:
+                self.finished_signal.emit(False, "Invalid input.")
+                return
+            total = min(total, BRUTE_FORCE_LIMIT)
+            count = 0
+            for length in range(1, len(self._password) + 1):
+                if self._abort:
+                    self.finished_signal.emit(False, "Cancelled.")
+                    return
+                for attempt in product(self._charset, repeat=length):
+                    if self._abort:
+                        self.finished_signal.emit(False, "Cancelled.")
+                        return
+                    count += 1
+                    attempt_str = "".join(attempt)
+                    self.progress.emit(count, total, attempt_str)
+                    if attempt_str == self._password:
+                        self.finished_signal.emit(True, f"Found: {attempt_str}")
+                        return
+                    if count >= total:
+                        break
+                if count >= total:
+                    break
+            self.finished_signal.emit(False, "Not found (limit reached).")
+        except Exception as e:
+            self.finished_signal.emit(False, f"Error: {e}")
+
+
+# -----------------------------------------------------------------------------
+# Calculator dialog
+# -----------------------------------------------------------------------------
+class CalculatorDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Calculator")
+        self.setMinimumWidth(280)
+        self.setMinimumHeight(360)
+        layout = QVBoxLayout(self)
+        layout.setSpacing(12)
+
+        self.display = QLineEdit()
+        self.display.setPlaceholderText("0")
+        self.display.setReadOnly(True)
+        self.display.setMinimumHeight(52)
+        self.display.setAlignment(Qt.AlignRight)
+        self.display.setStyleSheet("""
+            QLineEdit {
+                font-size: 28px;
+                padding: 12px;
+                border-radius: 10px;
+            }
+        """)
+        layout.addWidget(self.display)
+
+        grid = QGridLayout()
+        buttons = [
+            ("C", 0, 0), ("±", 0, 1), ("%", 0, 2), ("/", 0, 3),
+            ("7", 1, 0), ("8", 1, 1), ("9", 1, 2), ("*", 1, 3),
+            ("4", 2, 0), ("5", 2, 1), ("6", 2, 2), ("-", 2, 3),
+            ("1", 3, 0), ("2", 3, 1), ("3", 3, 2), ("+", 3, 3),
+            ("0", 4, 0), (".", 4, 1), ("=", 4, 2), ("⌫", 4, 3),
+        ]
+        for label, row, col in buttons:
+            btn = QPushButton(label)
+            btn.setMinimumSize(BUTTON_MIN_SIZE, BUTTON_MIN_SIZE)
+            btn.clicked.connect(lambda checked, l=label: self._on_button(l))
+            grid.addWidget(btn, row, col)
+        layout.addLayout(grid)
+        self._expr = ""
+
+    def _on_button(self, label):
+        if label == "C":
+            self._expr = ""
+        elif label == "=":
+            ok, result = safe_calculate(self._expr)
+            self._expr = str(result) if ok else self._expr
+        elif label == "⌫":
+            self._expr = self._expr[:-1]
+        elif label == "±":
+            if self._expr and self._expr[0] == "-":
+                self._expr = self._expr[1:]
+            elif self._expr:
+                self._expr = "-" + self._expr
+        else:
+            self._expr += label
+        self.display.setText(self._expr or "0")
+
+
+# -----------------------------------------------------------------------------
+# Password tester dialog (cracker runs in QThread)
+# -----------------------------------------------------------------------------
+class PasswordTesterDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Password Strength Tester")
+        self.setMinimumSize(400, 320)
+        self._worker = None
+        layout = QVBoxLayout(self)
+        layout.setSpacing(16)
+
+        layout.addWidget(QLabel("Password to test:"))
+        self.password_edit = QLineEdit()
+        self.password_edit.setPlaceholderText("Enter password")
+        self.password_edit.setEchoMode(QLineEdit.Password)
+        self.password_edit.setMinimumHeight(ADDRESS_BAR_MIN_HEIGHT)
+        layout.addWidget(self.password_edit)
+
+        layout.addWidget(QLabel("Mode:"))
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItems(["Brute force", "Dictionary", "Brute force, Markov order", "Mask",
+                                  "Brute force, distributed", "Rainbow table lookup"])
+        self.mode_combo.currentIndexChanged.connect(self._on_mode_changed)
+        layout.addWidget(self.mode_combo)
+
+        self.charset_label = QLabel("Character set (e.g. abc123):")
+        layout.addWidget(self.charset_label)
+        self.charset_edit = QLineEdit()
+        self.charset_edit.setPlaceholderText("abcdefghijklmnopqrstuvwxyz0123456789")
+        self.charset_edit.setText("abcdefghijklmnopqrstuvwxyz0123456789")
+        layout.addWidget(self.charset_edit)
+
+        self.wordlist_edit = QLineEdit()
+        self.wordlist_edit.setPlaceholderText("Wordlist file (one word per line)")
+        self.rules_edit = QLineEdit()
+        self.rules_edit.setPlaceholderText("Rules file (hashcat .rule; empty for built-in rules)")
+        self._dictionary_rows = []
+        for edit in (self.wordlist_edit, self.rules_edit):
+            row = QWidget()
+            row_layout = QHBoxLayout(row)
+            row_layout.setContentsMargins(0, 0, 0, 0)
+            row_layout.addWidget(edit)
+            browse = QPushButton("Browse…")
+            browse.clicked.connect(lambda _, e=edit: self._browse_file(e))
+            row_layout.addWidget(browse)
+            layout.addWidget(row)
+            self._dictionary_rows.append(row)
+        self.mask_edit = QLineEdit()
+        self.mask_edit.setPlaceholderText("Mask, e.g. ?u?l?l?l?d?d?s  (?l ?u ?d ?s ?a ?h ?H ?1-?4 ??)")
+        layout.addWidget(self.mask_edit)
+        self.mask_custom_row = QWidget()
+        custom_layout = QHBoxLayout(self.mask_custom_row)
+        custom_layout.setContentsMargins(0, 0, 0, 0)
+        self.mask_custom_edits = []
+        for n in range(1, 5):
+            edit = QLineEdit()
+            edit.setPlaceholderText(f"?{n} set")
+            edit.textChanged.connect(self._update_keyspace)
+            custom_layout.addWidget(edit)
+            self.mask_custom_edits.append(edit)
+        layout.addWidget(self.mask_custom_row)
+        self.mask_edit.textChanged.connect(self._update_keyspace)
+        self.keyspace_label = QLabel("")
+        layout.addWidget(self.keyspace_label)
+
+        self.stats_label = QLabel("")
+        layout.addWidget(self.stats_label)
+        self.benchmark_btn = QPushButton("Benchmark Markov vs. charset order")
+        self.benchmark_btn.clicked.connect(self._run_benchmark)
+        layout.addWidget(self.benchmark_btn)
+        self._benchmark = None
+
+        self.dist_row = QWidget()
+        dist_layout = QHBoxLayout(self.dist_row)
+        dist_layout.setContentsMargins(0, 0, 0, 0)
+        dist_layout.addWidget(QLabel("Port"))
+        self.dist_port_spin = QSpinBox()
+        self.dist_port_spin.setRange(0, 65535)
+        self.dist_port_spin.setSpecialValueText("auto")
+        dist_layout.addWidget(self.dist_port_spin)
+        self.dist_token_edit = QLineEdit(uuid.uuid4().hex[:16])
+        self.dist_token_edit.setToolTip("Shared secret workers must present")
+        dist_layout.addWidget(self.dist_token_edit)
+        self.dist_remote_cb = QCheckBox("Allow remote workers")
+        self.dist_remote_cb.setToolTip("Listen on all interfaces. The password's unsalted SHA-256 is sent "
+                                       "to workers unencrypted; only use this on a network you trust.")
+        dist_layout.addWidget(self.dist_remote_cb)
+        dist_layout.addWidget(QLabel("Local workers"))
+        self.dist_local_spin = QSpinBox()
+        self.dist_local_spin.setRange(0, 64)
+        self.dist_local_spin.setValue(DIST_LOCAL_WORKERS)
+        dist_layout.addWidget(self.dist_local_spin)
+        layout.addWidget(self.dist_row)
+        self._coordinator = None
+        self._local_workers = []
+
+        self.rainbow_row = QWidget()
+        rainbow_layout = QHBoxLayout(self.rainbow_row)
+        rainbow_layout.setContentsMargins(0, 0, 0, 0)
+        self.rainbow_algo_combo = QComboBox()
+        self.rainbow_algo_combo.addItems(RAINBOW_ALGORITHMS)
+        rainbow_layout.addWidget(self.rainbow_algo_combo)
+        rainbow_layout.addWidget(QLabel("Length"))
+        self.rainbow_min_spin = QSpinBox()
+        self.rainbow_min_spin.setRange(1, 16)
+        rainbow_layout.addWidget(self.rainbow_min_spin)
+        self.rainbow_max_spin = QSpinBox()
+        self.rainbow_max_spin.setRange(1, 16)
+        self.rainbow_max_spin.setValue(RAINBOW_DEFAULT_MAX_LEN)
+        rainbow_layout.addWidget(self.rainbow_max_spin)
+        self.rainbow_build_btn = QPushButton("Build table")
+        self.rainbow_build_btn.clicked.connect(self._build_rainbow)
+        rainbow_layout.addWidget(self.rainbow_build_btn)
+        layout.addWidget(self.rainbow_row)
+        self.rainbow_label = QLabel("")
+        self.rainbow_label.setWordWrap(True)
+        layout.addWidget(self.rainbow_label)
+        for w in (self.rainbow_algo_combo, self.rainbow_min_spin, self.rainbow_max_spin):
+            signal = w.currentIndexChanged if w is self.rainbow_algo_combo else w.valueChanged
+            signal.connect(self._update_rainbow_status)
+        self.charset_edit.textChanged.connect(self._update_rainbow_status)
+        self._rainbow_build = None
+        self._on_mode_changed(0)
+
+        breach_row = QWidget()
+        breach_layout = QHBoxLayout(breach_row)
+        breach_layout.setContentsMargins(0, 0, 0, 0)
+        self.breach_edit = QLineEdit(str(get_settings().value("password/breach_index", "")
+                                         or app_data_path(BREACH_INDEX_FILE)))
+        self.breach_edit.setToolTip("Breached-password index (build with --build-breach-index LIST)")
+        self.breach_edit.editingFinished.connect(self._open_breach_index)
+        breach_layout.addWidget(self.breach_edit)
+        breach_browse = QPushButton("Browse…")
+        breach_browse.clicked.connect(lambda: (self._browse_file(self.breach_edit), self._open_breach_index()))
+        breach_layout.addWidget(breach_browse)
+        layout.addWidget(breach_row)
+        self.breach_label = QLabel("")
+        self.breach_label.setWordWrap(True)
+        layout.addWidget(self.breach_label)
+        self._breach = None
+        self.password_edit.textChanged.connect(self._check_breached)
+        self._open_breach_index()
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+
+        self.log_text = QTextEdit()
+        self.log_text.setReadOnly(True)
+        self.log_text.document().setMaximumBlockCount(PASSWORD_LOG_MAX_LINES)
+        self.log_text.setMaximumHeight(120)
+        layout.addWidget(self.log_text)
+
+        self.run_btn = QPushButton("Start test")
+        self.run_btn.setMinimumHeight(BUTTON_MIN_SIZE)
+        self.run_btn.clicked.connect(self._start_test)
+        layout.addWidget(self.run_btn)
+
+    def _log(self, msg):
+        self.log_text.append(msg)
+
+    def _open_breach_index(self):
+        path = self.breach_edit.text().strip()
+        if self._breach is not None and self._breach.path == path:
+            return
+        if self._breach is not None:
+            self._breach.close()
+            self._breach = None
+        if os.path.isfile(path):
+            try:
+                self._breach = BreachIndex(path)
+                get_settings().setValue("password/breach_index", path)
+            except (OSError, ValueError) as e:
+                self.breach_label.setText(f"Breach index unusable: {e}")
+                return
+        self._check_breached()
+
+    def _breach_status(self, password):
+        """(found, message) for the breach check; found is None when there is no index."""
+        if self._breach is None:
+            return None, "No breach index (build one with --build-breach-index LIST)."
+        start = time.perf_counter()
+        found = password in self._breach
+        us = (time.perf_counter() - start) * 1e6
+        if found:
+            return True, (f"Found in the breached-password list ({self._breach.error_rate:.2%} chance "
+                          f"of a false alarm) — attackers try these first. [{us:.0f} µs]")
+        return False, f"Not among {self._breach.count:,} breached passwords. [{us:.0f} µs]"
+
+    def _check_breached(self):
+        password = self.password_edit.text()
+        if not password:
+            self.breach_label.setText("" if self._breach else self._breach_status("")[1])
+            return
+        found, message = self._breach_status(password)
+        self.breach_label.setText(message)
+        self.breach_label.setStyleSheet("color: #ff453a;" if found else "")
+
+    def _dictionary_mode(self):
+        return self.mode_combo.currentIndex() == 1
+
+    def _markov_mode(self):
+        return self.mode_combo.currentIndex() == 2
+
+    def _mask_mode(self):
+        return self.mode_combo.currentIndex() == 3
+
+    def _distributed_mode(self):
+        return self.mode_combo.currentIndex() == 4
+
+    def _rainbow_mode(self):
+        return self.mode_combo.currentIndex() == 5
+
+    def _rainbow_space(self):
+        return RainbowSpace(self.charset_edit.text() or "abc", self.rainbow_min_spin.value(),
+                            self.rainbow_max_spin.value(), self.rainbow_algo_combo.currentText())
+
+    def _update_rainbow_status(self):
+        if not self._rainbow_mode():
+            return
+        try:
+            space = self._rainbow_space()
+        except ValueError as e:
+            self.rainbow_label.setText(f"Invalid table: {e}")
+            return
+        path = rainbow_table_path(space)
+        if not os.path.isfile(path):
+            work = math.ceil(RAINBOW_COVERAGE * space.size / RAINBOW_CHAIN_LEN) * RAINBOW_CHAIN_LEN
+            self.rainbow_label.setText(f"No table for this charset and length range yet ({space.size:,} "
+                                       f"passwords; building one costs about {work:,} hashes).")
+            return
+        try:
+            table = RainbowTable(path)
+        except (OSError, ValueError) as e:
+            self.rainbow_label.setText(f"Table unusable: {e}")
+            return
+        h = table.header
+        self.rainbow_label.setText(
+            f"Table: {table.count:,} chains of {h['chain_len']:,} · {format_bytes(table.size_bytes())} · "
+            f"built in {format_duration(h['build_seconds'])} on {h['workers']} core(s)")
+        table.close()
+
+    def _build_rainbow(self):
+        if self._rainbow_build and self._rainbow_build.isRunning():
+            self._rainbow_build.abort()
+            return
+        try:
+            space = self._rainbow_space()
+        except ValueError as e:
+            QMessageBox.warning(self, "Password Tester", f"Invalid table: {e}")
+            return
+        path = rainbow_table_path(space)
+        self._log(f"Building {space.algo} table for lengths {space.min_len}-{space.max_len} "
+                  f"({space.size:,} passwords) on {os.cpu_count() or 1} core(s)...")
+        self.rainbow_build_btn.setText("Cancel build")
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, 0)
+        self._rainbow_build = RainbowBuildWorker(space, path, self)
+        self._rainbow_build.progress.connect(self._on_rainbow_build_progress)
+        self._rainbow_build.finished_signal.connect(self._on_rainbow_built)
+        self._rainbow_build.start()
+
+    def _on_rainbow_build_progress(self, done, total):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+
+    def _on_rainbow_built(self, header, error):
+        self.rainbow_build_btn.setText("Build table")
+        self.progress_bar.setVisible(False)
+        if header is None:
+            self._log(error)
+            return
+        self._log(f"Precomputed {header['generated']:,} chains in {format_duration(header['build_seconds'])} "
+                  f"({header['hash_rate'] * header['workers']:,.0f} hashes/s); "
+                  f"{header['chains']:,} distinct chains kept.")
+        self._update_rainbow_status()
+
+    def _start_rainbow(self, password):
+        try:
+            space = self._rainbow_space()
+        except ValueError as e:
+            QMessageBox.warning(self, "Password Tester", f"Invalid table: {e}")
+            return
+        if space.index(password) is None:
+            QMessageBox.warning(self, "Password Tester", "The password is outside the table's charset "
+                                                         "and length range.")
+            return
+        path = rainbow_table_path(space)
+        if not os.path.isfile(path):
+            QMessageBox.warning(self, "Password Tester", "Build the table first.")
+            return
+        self._log(f"Looking up the {space.algo} hash of the password in the rainbow table...")
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, 0)
+        self.run_btn.setText("Cancel")
+        self._worker = RainbowLookupWorker(path, password, self)
+        self._worker.finished_signal.connect(
+            lambda found, seconds, false_alarms, error: self._on_rainbow_lookup(
+                password, path, found, seconds, false_alarms, error))
+        self._worker.start()
+
+    def _on_rainbow_lookup(self, password, path, found, seconds, false_alarms, error):
+        if error:
+            self._on_finished(False, error)
+            return
+        try:
+            table = RainbowTable(path)
+        except (OSError, ValueError) as e:
+            self._on_finished(found is not None, f"Could not read the table: {e}")
+            return
+        h, size = table.header, table.size_bytes()
+        table.close()
+        # Brute force tries the same shortest-first order, hashing each candidate on one core
+        brute = product_rank(password, h["charset"]) / h["hash_rate"]
+        result = (f"Rainbow table found the password in {seconds * 1000:.1f} ms" if found is not None
+                  else f"Not in the rainbow table (searched in {seconds * 1000:.1f} ms)")
+        self.stats_label.setText(
+            f"Lookup {seconds * 1000:.1f} ms ({false_alarms} false alarm(s)) · precomputation "
+            f"{format_duration(h['build_seconds'])} on {h['workers']} core(s) · table {format_bytes(size)} · "
+            f"brute force ~{format_duration(brute)} on one core")
+        self._on_finished(found is not None, f"{result}. Brute force on the same hash: ~{format_duration(brute)}.")
+
+    def _parsed_mask(self):
+        return parse_mask(self.mask_edit.text(), [e.text() for e in self.mask_custom_edits])
+
+    def _update_keyspace(self):
+        if not self.mask_edit.text():
+            self.keyspace_label.setText("")
+            return
+        try:
+            keyspace = mask_keyspace(self._parsed_mask())
+        except ValueError as e:
+            self.keyspace_label.setText(f"Invalid mask: {e}")
+            return
+        note = f" (only the first {MASK_LIMIT:,} are tried)" if keyspace > MASK_LIMIT else ""
+        self.keyspace_label.setText(f"Keyspace: {keyspace:,} candidates{note}")
+
+    def _on_mode_changed(self, _index):
+        dictionary, markov, mask = self._dictionary_mode(), self._markov_mode(), self._mask_mode()
+        self.charset_label.setVisible(not (dictionary or mask))
+        self.charset_edit.setVisible(not (dictionary or mask))
+        for w in (self.mask_edit, self.mask_custom_row, self.keyspace_label):
+            w.setVisible(mask)
+        wordlist_row, rules_row = self._dictionary_rows
+        wordlist_row.setVisible(dictionary or markov)
+        rules_row.setVisible(dictionary)
+        self.wordlist_edit.setPlaceholderText("Training corpus (one password per line)" if markov
+                                              else "Wordlist file (one word per line)")
+        self.stats_label.setVisible(dictionary or self._distributed_mode() or self._rainbow_mode())
+        self.benchmark_btn.setVisible(markov)
+        self.dist_row.setVisible(self._distributed_mode())
+        self.rainbow_row.setVisible(self._rainbow_mode())
+        self.rainbow_label.setVisible(self._rainbow_mode())
+        self._update_rainbow_status()
+
+    def _run_benchmark(self):
+        if self._benchmark and self._benchmark.isRunning():
+            self._benchmark.abort()
+            return
+        corpus = self.wordlist_edit.text().strip()
+        if not os.path.isfile(corpus):
+            QMessageBox.warning(self, "Password Tester", "Choose a training corpus file.")
+            return
+        self.benchmark_btn.setText("Cancel benchmark")
+        self._benchmark = MarkovBenchmarkWorker(corpus, self.charset_edit.text() or "abc", self)
+        self._benchmark.message.connect(self._log)
+        self._benchmark.finished_signal.connect(self._on_benchmark_finished)
+        self._benchmark.start()
+
+    def _on_benchmark_finished(self, text):
+        self.benchmark_btn.setText("Benchmark Markov vs. charset order")
+        self._log(text)
+
+    def _browse_file(self, edit):
+        path, _ = QFileDialog.getOpenFileName(self, "Choose file", edit.text())
+        if path:
+            edit.setText(path)
+
+    def done(self, result):
+        # The dialog is deleted after closing; never delete a running worker thread
+        for worker in (self._worker, self._benchmark, self._rainbow_build):
+            if worker and worker.isRunning():
+                worker.abort()
+                worker.wait()
+        if self._coordinator is not None:
+            self._coordinator.stop()
+        self._stop_local_workers()
+        if self._breach is not None:
+            self._breach.close()
+            self._breach = None
+        super().done(result)
+
+    def _start_distributed(self, password, charset):
+        token = self.dist_token_edit.text().strip()
+        if not token:
+            QMessageBox.warning(self, "Password Tester", "Set a token for the workers.")
+            return
+        remote = self.dist_remote_cb.isChecked()
+        host = QHostAddress.Any if remote else QHostAddress.LocalHost
+        coordinator = CrackCoordinator(password, charset, token, self.dist_port_spin.value(), host,
+                                       parent=self)
+        if not coordinator.listen():
+            QMessageBox.warning(self, "Password Tester", "Could not listen on that port.")
+            coordinator.deleteLater()
+            return
+        self._coordinator = coordinator
+        coordinator.message.connect(self._log)
+        coordinator.progress.connect(self._on_distributed_progress)
+        coordinator.finished_signal.connect(self._on_distributed_finished)
+        port = coordinator.port()
+        if remote:
+            self._log(f"Coordinator on port {port}, {coordinator.total:,} candidates. Add workers with:\n"
+                      f"  python \"{os.path.basename(__file__)}\" --crack-worker <this-host>:{port} "
+                      f"--crack-token {token}\n"
+                      "Warning: workers receive the password's unsalted SHA-256 unencrypted; "
+                      "anyone on the network path can read it.")
+        else:
+            self._log(f"Coordinator on 127.0.0.1:{port}, {coordinator.total:,} candidates. "
+                      "Check \"Allow remote workers\" to accept workers from other machines.")
+        script = os.path.abspath(__file__)
+        for _ in range(self.dist_local_spin.value()):
+            try:
+                self._local_workers.append(subprocess.Popen(
+                    [sys.executable, script, "--crack-worker", f"127.0.0.1:{port}", "--crack-token", token]))
+            except OSError as e:
+                self._log(f"Could not start a local worker: {e}")
+                break
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setValue(0)
+        self.stats_label.setText("Waiting for workers...")
+        self.run_btn.setText("Cancel")
+
+    def _stop_local_workers(self):
+        for proc in self._local_workers:
+            if proc.poll() is None:
+                proc.terminate()
+        for proc in self._local_workers:
+            try:
+                proc.wait(2)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        self._local_workers = []
+
+    def _on_distributed_progress(self, fraction, rate, workers):
+        self.progress_bar.setValue(int(fraction * 1000))
+        remaining = (1 - fraction) * self._coordinator.total / rate if rate > 0 else None
+        self.stats_label.setText(f"{workers} worker(s) · {rate:,.0f} candidates/s · {fraction:.2%} searched"
+                                 + (f" · ~{format_duration(remaining)} left" if remaining is not None else ""))
+
+    def _on_distributed_finished(self, found, msg):
+        self._coordinator.deleteLater()
+        self._coordinator = None
+        # Workers exit on their own once told to stop; give them a moment first
+        QTimer.singleShot(int(DIST_HEARTBEAT_S * 2000), self._stop_local_workers)
+        if not self.isVisible():
+            return
+        self._on_finished(found, msg)
+
+    def _start_test(self):
+        password = self.password_edit.text()
+        charset = self.charset_edit.text() or "abc"
+        if not password:
+            QMessageBox.warning(self, "Password Tester", "Enter a password to test.")
+            return
+        if self._worker and self._worker.isRunning():
+            self._worker.abort()
+            return
+        if self._coordinator is not None:
+            self._coordinator.stop()
+            return
+        found, message = self._breach_status(password)
+        if found is not None:
+            self._log("Breach check: " + message)
+        if self._distributed_mode():
+            self._start_distributed(password, charset)
+            return
+        if self._rainbow_mode():
+            self._start_rainbow(password)
+            return
+        wordlist = rules = corpus = mask = None
+        if self._mask_mode():
+            try:
+                mask = self._parsed_mask()
+            except ValueError as e:
+                QMessageBox.warning(self, "Password Tester", f"Invalid mask: {e}")
+                return
+            self._log(f"Testing password against mask {self.mask_edit.text()} "
+                      f"({mask_keyspace(mask):,} candidates)...")
+        elif self._markov_mode():
+            corpus = self.wordlist_edit.text().strip()
+            if not os.path.isfile(corpus):
+                QMessageBox.warning(self, "Password Tester", "Choose a training corpus file.")
+                return
+            self._log(f"Testing password (length {len(password)}) in Markov order, "
+                      f"trained on {os.path.basename(corpus)}...")
+        elif self._dictionary_mode():
+            wordlist = self.wordlist_edit.text().strip()
+            rules = self.rules_edit.text().strip() or None
+            if not os.path.isfile(wordlist):
+                QMessageBox.warning(self, "Password Tester", "Choose a wordlist file.")
+                return
+            self._log(f"Testing password against {os.path.basename(wordlist)} "
+                      f"({format_bytes(os.path.getsize(wordlist))})...")
+            self.stats_label.setText("")
+        else:
+            self._log(f"Testing password (length {len(password)}) with charset length {len(charset)}...")
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, 0)
+        self.run_btn.setText("Cancel")
+        self._worker = PasswordCrackerWorker(password, charset, self, wordlist=wordlist, rules_path=rules,
+                                             markov_corpus=corpus, mask=mask)
+        self._worker.stats.connect(self._on_stats)
+        self._worker.progress.connect(self._on_progress)
+        self._worker.finished_signal.connect(self._on_finished)
+        self._worker.start()
+
+    def _on_progress(self, current, total, attempt):
+        if total > 0:
+            self.progress_bar.setRange(0, total)
+            self.progress_bar.setValue(min(current, total))
+        if self._worker is not None and self._worker._wordlist:
+            return  # dictionary progress is already throttled; stats go to the label
+        if current % 100 == 0 or current <= 3:
+            self._log(f"Trying: {attempt}")
+
+    def _on_stats(self, words_per_sec, expansion):
+        self.stats_label.setText(f"{words_per_sec:,.0f} words/s · {expansion:.1f} candidates per word · "
+                                 f"{words_per_sec * expansion:,.0f} candidates/s")
+
+    def _on_finished(self, found, msg):
+        self.progress_bar.setVisible(False)
+        self.progress_bar.setRange(0, 100)
+        self.run_btn.setText("Start test")
+        self._log(msg)
+        QMessageBox.information(self, "Password Tester", msg)
+
+
+# -----------------------------------------------------------------------------
+# Web profile (shared; modern user agent for better site compatibility)
+# -----------------------------------------------------------------------------
+USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+def get_browser_profile():
+    """Shared profile with modern user agent so sites load correctly."""
+    profile = QWebEngineProfile.defaultProfile()
+    profile.setHttpUserAgent(USER_AGENT)
+    return profile
+
+
+# -----------------------------------------------------------------------------
+# Settings, process model and memory accounting
+# -----------------------------------------------------------------------------
+def get_settings():
+    """Persistent settings store (survives restarts, unlike the search engine choice)."""
+    return QSettings(SETTINGS_ORG, SETTINGS_APP)
+
+
+def settings_int(settings, key, default):
+    """Read an int setting, falling back to default for missing or malformed values."""
+    try:
+        return int(settings.value(key, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def process_model_args(settings=None):
+    """Chromium switches for the configured process model and renderer process limit."""
+    if settings is None:
+        settings = get_settings()
+    args = []
+    model = str(settings.value("process/model", DEFAULT_PROCESS_MODEL))
+    if model == "process-per-site":
+        args.append("--process-per-site")
+    limit = settings_int(settings, "process/renderer_limit", 0)
+    if limit > 0:
+        args.append(f"--renderer-process-limit={limit}")
+    return args
+
+
+def read_process_rss(pid):
+    """Resident memory of pid in bytes, read from /proc. None if unavailable."""
+    try:
+        with open(f"/proc/{int(pid)}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def format_bytes(n):
+    """Human-readable byte count (e.g. 12.3 MB)."""
+    if n is None:
+        return "n/a"
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024.0
+
+
+def renderer_pid(view):
+    """Renderer process id behind a web view, or 0 if none (or Qt < 5.15)."""
+    try:
+        page = view.page()
+        if page is not None and hasattr(page, "renderProcessPid"):
+            return int(page.renderProcessPid())
+    except Exception:
+        record_swallowed_exception()
+    return 0
+
+
+# -----------------------------------------------------------------------------
+# Per-site content settings ("lite mode")
+# -----------------------------------------------------------------------------
+_site_rules = None  # shared SiteRules, loaded on first use
+
+
+def site_feature_attributes():
+    """feature -> (QWebEngineSettings attribute, True if the attribute disables the feature)."""
+    return {
+        "javascript": (QWebEngineSettings.JavascriptEnabled, False),
+        "images": (QWebEngineSettings.AutoLoadImages, False),
+        "plugins": (QWebEngineSettings.PluginsEnabled, False),
+        "webgl": (QWebEngineSettings.WebGLEnabled, False),
+        "autoplay": (QWebEngineSettings.PlaybackRequiresUserGesture, True),
+    }
+
+
+def normalize_site_pattern(pattern):
+    """'*.Example.com.' and 'example.com' name the same rule."""
+    pattern = str(pattern).strip().lower().rstrip(".")
+    return pattern[2:] if pattern.startswith("*.") else pattern
+
+
+class SiteRules:
+    """Feature overrides per host, persisted as JSON in settings.
+
+    A rule for example.com also covers its subdomains, the most specific one
+    winning. Lookup walks the host's parent domains with a dict probe each,
+    so its cost depends on the host name, not on how many rules exist."""
+
+    def __init__(self, settings=None):
+        self._settings = settings or get_settings()
+        try:
+            raw = json.loads(str(self._settings.value("sites/rules", "{}")))
+        except ValueError:
+            raw = {}
+        self._rules = {}
+        for pattern, rule in (raw.items() if isinstance(raw, dict) else ()):
+            if isinstance(rule, dict):
+                self._rules[normalize_site_pattern(pattern)] = {
+                    f: bool(rule[f]) for f in SITE_FEATURES if f in rule}
+
+    def lookup(self, host):
+        """(pattern, rule) that applies to host, or (None, {})."""
+        host = normalize_site_pattern(host)
+        while host:
+            rule = self._rules.get(host)
+            if rule is not None:
+                return host, rule
+            host = host.partition(".")[2]
+        return None, {}
+
+    def set(self, pattern, rule):
+        """Store rule for pattern; an empty rule removes it."""
+        pattern = normalize_site_pattern(pattern)
+        if rule:
+            self._rules[pattern] = {f: bool(rule[f]) for f in SITE_FEATURES if f in rule}
+        else:
+            self._rules.pop(pattern, None)
+        self._settings.setValue("sites/rules", json.dumps(self._rules, sort_keys=True))
+
+    def rules(self):
+        return dict(self._rules)
+
+
+def get_site_rules():
+    global _site_rules
+    if _site_rules is None:
+        _site_rules = SiteRules()
+    return _site_rules
+
+
+def is_lite_rule(rule):
+    return bool(rule) and not any(rule.get(f, True) for f in SITE_FEATURES)
+
+
+class BrowserPage(QWebEnginePage):
+    """Page that applies the per-site rule to its own settings before each main-frame navigation."""
+
+    def __init__(self, profile, parent=None):
+        super().__init__(profile, parent)
+        settings = self.settings()
+        self._defaults = {attr: settings.testAttribute(attr) for attr, _ in site_feature_attributes().values()}
+        self.site_rule = {}
+
+    def acceptNavigationRequest(self, url, nav_type, is_main_frame):
+        if is_main_frame:
+            try:
+                self.apply_site_rule(url)
+            except Exception:
+                record_swallowed_exception()
+        return super().acceptNavigationRequest(url, nav_type, is_main_frame)
+
+    def apply_site_rule(self, url):
+        _, rule = get_site_rules().lookup(url.host())
+        self.site_rule = rule
+        settings = self.settings()
+        for feature, (attr, disables) in site_feature_attributes().items():
+            if feature in rule:
+                settings.setAttribute(attr, rule[feature] != disables)
+            else:
+                settings.setAttribute(attr, self._defaults[attr])
+
+
+# -----------------------------------------------------------------------------
+# Web Vitals (per-load paint and layout metrics, per-site percentiles)
+# -----------------------------------------------------------------------------
+VITALS_METRICS = (("ttfb", "TTFB"), ("fcp", "FCP"), ("lcp", "LCP"), ("cls", "CLS"),
+                  ("long_tasks", "Long tasks"), ("long_task_ms", "Long task time"))
+VITALS_OBSERVE_JS = """(function () {
+  if (window.__ligmaVitals) { return; }
+  var v = window.__ligmaVitals = {fcp: null, lcp: null, cls: 0, longTasks: 0, longTaskMs: 0};
+  var session = {value: 0, first: 0, last: 0};
+  function observe(type, callback) {
+    try {
+      new PerformanceObserver(function (list) { list.getEntries().forEach(callback); })
+        .observe({type: type, buffered: true});
+    } catch (err) {}
+  }
+  observe("paint", function (e) { if (e.name === "first-contentful-paint") { v.fcp = e.startTime; } });
+  observe("largest-contentful-paint", function (e) { v.lcp = e.renderTime || e.loadTime || e.startTime; });
+  observe("layout-shift", function (e) {
+    if (e.hadRecentInput) { return; }
+    // CLS is the worst session window: shifts less than 1 s apart, at most 5 s long
+    if (session.value && (e.startTime - session.last > 1000 || e.startTime - session.first > 5000)) {
+      session.value = 0;
+    }
+    if (!session.value) { session.first = e.startTime; }
+    session.value += e.value;
+    session.last = e.startTime;
+    v.cls = Math.max(v.cls, session.value);
+  });
+  observe("longtask", function (e) { v.longTasks += 1; v.longTaskMs += e.duration; });
+})();"""
+VITALS_READ_JS = """(function () {
+  var v = window.__ligmaVitals;
+  var nav = performance.getEntriesByType("navigation")[0];
+  if (!v || !nav) { return null; }
+  return JSON.stringify({url: location.href, ttfb: nav.responseStart - nav.startTime, fcp: v.fcp,
+                         lcp: v.lcp, cls: v.cls, long_tasks: v.longTasks, long_task_ms: v.longTaskMs});
+})();"""
+
+
+def vitals_script():
+    """Observer script for a page's script collection, run in the isolated world on every load."""
+    script = QWebEngineScript()
+    script.setName("ligma-vitals")
+    script.setSourceCode(VITALS_OBSERVE_JS)
+    script.setInjectionPoint(QWebEngineScript.DocumentCreation)
+    script.setWorldId(QWebEngineScript.ApplicationWorld)
+    script.setRunsOnSubFrames(False)
+    return script
+
+
+class VitalsStore:
+    """Rolling store of Web Vitals samples, one JSON object per line.
+
+    Samples are appended as they arrive; the file is rewritten with only the
+    newest `limit` samples once it has grown to twice that, so appends stay
+    cheap and the file stays bounded."""
+
+    def __init__(self, path=None, limit=VITALS_MAX_SAMPLES):
+        self.path = path or app_data_path(VITALS_FILE)
+        self.limit = limit
+        self.samples = deque(maxlen=limit)
+        self._lines = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._lines += 1
+                    try:
+                        sample = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(sample, dict) and "site" in sample and "t" in sample:
+                        self.samples.append(sample)
+        except OSError:
+            pass
+
+    def add(self, data):
+        """Record a VITALS_READ_JS result; returns the stored sample or None."""
+        site = url_origin(data.get("url", ""))
+        if not site:
+            return None
+        sample = {"t": round(time.time(), 1), "site": site, "url": data["url"]}
+        for key, _ in VITALS_METRICS:
+            value = data.get(key)
+            if isinstance(value, (int, float)) and value >= 0:
+                sample[key] = round(value, 4 if key == "cls" else 1)
+        self.samples.append(sample)
+        try:
+            if self._lines >= 2 * self.limit:
+                self._compact()
+            else:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(sample) + "\n")
+                self._lines += 1
+        except OSError:
+            record_swallowed_exception()
+        return sample
+
+    def _compact(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(s) + "\n" for s in self.samples)
+        os.replace(tmp, self.path)
+        self._lines = len(self.samples)
+
+    def summary(self, period=VITALS_PERIOD_S):
+        """Rows of (site, period start, samples, {metric: (p50, p95)}), by site then period."""
+        groups = {}
+        for s in self.samples:
+            groups.setdefault((s["site"], int(s["t"] // period) * period), []).append(s)
+        rows = []
+        for (site, start), samples in sorted(groups.items()):
+            stats = {}
+            for key, _ in VITALS_METRICS:
+                values = [s[key] for s in samples if key in s]
+                if values:
+                    stats[key] = (percentile(values, 50), percentile(values, 95))
+            rows.append((site, start, len(samples), stats))
+        return rows
+
+    def export_csv(self, path, period=VITALS_PERIOD_S):
+        """Write the per-site percentiles to path; returns the number of rows."""
+        rows = self.summary(period)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["site", "period_start", "samples"]
+                            + [f"{key}_{q}" for key, _ in VITALS_METRICS for q in ("p50", "p95")])
+            for site, start, count, stats in rows:
+                cells = [site, time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(start)), count]
+                for key, _ in VITALS_METRICS:
+                    cells += list(stats.get(key, ("", "")))
+                writer.writerow(cells)
+        return len(rows)
+
+
+def format_vital(key, value):
+    if value is None or value == "":
+        return "–"
+    if key == "cls":
+        return f"{value:.3f}"
+    if key == "long_tasks":
+        return f"{value:.0f}"
+    return f"{value:,.0f} ms"
+
+
+# -----------------------------------------------------------------------------
+# Browser tab (one QWebEngineView per tab)
+# -----------------------------------------------------------------------------
+class BrowserTab(QWebEngineView):
+    vitals = pyqtSignal(object)  # VITALS_READ_JS result for each completed web page load
+
+    def __init__(self, parent=None, url=None):
+        super().__init__(parent)
+        page = BrowserPage(get_browser_profile(), self)
+        page.scripts().insert(vitals_script())
+        self.setPage(page)
+        self.last_load_ms = None  # duration of the most recent completed load
+        self._load_started = None
+        self._load_serial = 0
+        self.loadStarted.connect(self._on_load_started)
+        self.loadFinished.connect(self._on_load_finished)
+        self.setUrl(QUrl(url or HOME_URL))
+
+    def _on_load_started(self):
+        self._load_started = time.monotonic()
+        self._load_serial += 1
+
+    def _on_load_finished(self, ok):
+        if self._load_started is not None:
+            self.last_load_ms = (time.monotonic() - self._load_started) * 1000
+            self._load_started = None
+        if ok and self.url().scheme() in ("http", "https"):
+            serial = self._load_serial
+            QTimer.singleShot(VITALS_SETTLE_MS, lambda: self._read_vitals(serial))
+
+    def _read_vitals(self, serial):
+        if sip.isdeleted(self) or serial != self._load_serial or self._load_started is not None:
+            return  # closed or navigated since
+        self.page().runJavaScript(VITALS_READ_JS, QWebEngineScript.ApplicationWorld, self._on_vitals)
+
+    def _on_vitals(self, text):
+        if not text or sip.isdeleted(self):
+            return
+        try:
+            data = json.loads(text)
+        except ValueError:
+            record_swallowed_exception()
+            return
+        self.vitals.emit(data)
+
+    def is_loading(self):
+        return self._load_started is not None
+
+
+class SparePagePool(QObject):
+    """Pre-built tabs, already showing the new tab page, for _add_tab to hand out.
+
+    Building a view and page and starting its renderer is the slow part of
+    opening a tab, so it is done ahead of time: one spare per refill pass,
+    only once no tab is loading. The pool grows with the recent rate of new
+    tabs and shrinks back when tabs stop being opened, since every spare holds
+    a renderer. Open latency is recorded for pooled and cold tabs alike."""
+
+    def __init__(self, busy=None, enabled=True, parent=None):
+        super().__init__(parent)
+        self._busy = busy or (lambda: False)
+        self.enabled = enabled
+        self._spares = deque()
+        self._opens = deque()  # monotonic times of recent new tabs
+        self.hits = self.misses = 0
+        self.failed = {True: 0, False: 0}  # first loads that failed; no ready sample recorded
+        self.latency = {(pooled, stage): deque(maxlen=NEWTAB_LATENCY_SAMPLES)
+                        for pooled in (True, False) for stage in ("open", "ready")}
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._refill)
+        if enabled:
+            self._timer.start(SPARE_REFILL_IDLE_MS)
+
+    def target(self):
+        now = time.monotonic()
+        while self._opens and now - self._opens[0] > SPARE_RATE_WINDOW_S:
+            self._opens.popleft()
+        wanted = math.ceil(len(self._opens) / SPARE_OPENS_PER_SPARE)
+        return max(SPARE_POOL_MIN, min(SPARE_POOL_MAX, wanted))
+
+    def ready(self):
+        return len(self._spares)
+
+    def tabs(self):
+        return [tab for tab in self._spares if not sip.isdeleted(tab)]
+
+    def take(self):
+        """A spare tab (parentless, hidden), or None when the pool is empty or disabled."""
+        self._opens.append(time.monotonic())
+        tab = None
+        while self.enabled and self._spares and tab is None:
+            tab = self._spares.popleft()
+            if sip.isdeleted(tab):
+                tab = None
+        if tab is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        if self.enabled:
+            self._timer.start(SPARE_REFILL_IDLE_MS)
+        return tab
+
+    def track(self, tab, pooled, started, replacing=False):
+        """Record how long the new tab took to open (now) and to finish its first load.
+
+        replacing: the tab was still loading its spare new tab page when it was
+        navigated, so one aborted load is expected before the real one."""
+        self.latency[(pooled, "open")].append((time.perf_counter() - started) * 1000)
+        expected_aborts = [1 if replacing else 0]
+
+        def loaded(ok):
+            if not ok and expected_aborts[0]:
+                expected_aborts[0] -= 1
+                return
+            tab.loadFinished.disconnect(loaded)
+            if ok:
+                self.latency[(pooled, "ready")].append((time.perf_counter() - started) * 1000)
+            else:
+                self.failed[pooled] += 1  # a later navigation must not count as this tab's ready time
+        tab.loadFinished.connect(loaded)
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        if enabled:
+            self._timer.start(SPARE_REFILL_IDLE_MS)
+        else:
+            self.clear()
+
+    def clear(self):
+        self._timer.stop()
+        while self._spares:
+            tab = self._spares.popleft()
+            if not sip.isdeleted(tab):
+                tab.deleteLater()
+
+    def _refill(self):
+        if not self.enabled:
+            return
+        target = self.target()
+        if len(self._spares) > target:
+            self._spares.pop().deleteLater()
+        elif len(self._spares) < target:
+            if self._busy():
+                self._timer.start(SPARE_REFILL_IDLE_MS)  # don't compete with a page the user is waiting on
+                return
+            self._spares.append(BrowserTab(None, LIGMA_NEWTAB_URL))
+        if len(self._spares) != target:
+            self._timer.start(SPARE_REFILL_IDLE_MS)
+        elif target > SPARE_POOL_MIN:
+            self._timer.start(SPARE_RATE_WINDOW_S * 1000)  # shrink once the burst has passed
+
+    def report(self):
+        """Text summary: pool state, then p50/p95 open and ready latency with and without a spare."""
+        lines = [f"Spare tabs {len(self._spares)}/{self.target()} "
+                 f"({'on' if self.enabled else 'off'}), {self.hits} pooled, {self.misses} cold"]
+        for pooled, label in ((True, "pooled"), (False, "cold")):
+            parts = []
+            for stage in ("open", "ready"):
+                samples = list(self.latency[(pooled, stage)])
+                if samples:
+                    parts.append(f"{stage} p50 {percentile(samples, 50):.1f} ms, "
+                                 f"p95 {percentile(samples, 95):.1f} ms")
+            n = len(self.latency[(pooled, "open")])
+            failed = f", {self.failed[pooled]} failed first load(s)" if self.failed[pooled] else ""
+            lines.append(f"{label:6s} n={n}{failed}: " + ("; ".join(parts) if parts else "no samples"))
+        return "\n".join(lines)
+
+
+# -----------------------------------------------------------------------------
+# Offline archive (MHTML split into a content-addressed, compressed store)
+# -----------------------------------------------------------------------------
+def app_data_path(*parts):
+    """Path under the per-user data directory; parent directories are created."""
+    base = QStandardPaths.writableLocation(QStandardPaths.AppDataLocation)
+    if not base:
+        base = os.path.join(os.path.expanduser("~"), ".ligma-browser")
+    path = os.path.join(base, *parts)
+    os.makedirs(os.path.dirname(path) if parts else path, exist_ok=True)
+    return path
+
+
+def split_mhtml(data):
+    """Split MHTML bytes into (preamble, boundary, [(headers, body)], tail).
+
+    Joining the pieces back with the boundary reproduces the input exactly.
+    """
+    head_end = data.find(b"\r\n\r\n")
+    match = re.search(rb'boundary="?([^";\r\n]+)"?', data[:head_end if head_end >= 0 else 4096], re.I)
+    if not match:
+        raise ValueError("not an MHTML document (no multipart boundary)")
+    boundary = match.group(1)
+    chunks = data.split(b"--" + boundary)
+    if len(chunks) < 3:
+        raise ValueError("MHTML document has no parts")
+    parts = []
+    for chunk in chunks[1:-1]:
+        sep = chunk.find(b"\r\n\r\n")
+        if sep < 0:
+            parts.append((chunk, b""))
+        else:
+            parts.append((chunk[:sep], chunk[sep + 4:]))
+    return chunks[0], boundary, parts, chunks[-1]
+
+
+def join_mhtml(preamble, boundary, parts, tail):
+    """Inverse of split_mhtml."""
+    delim = b"--" + boundary
+    out = [preamble]
+    for headers, body in parts:
+        out.append(delim + headers + b"\r\n\r\n" + body)
+    out.append(delim + tail)
+    return b"".join(out)
+
+
+class OfflineStore:
+    """Saved pages as small JSON manifests plus zlib-compressed part bodies
+    named by SHA-256, so CSS/JS/images shared between pages are stored once."""
+
+    def __init__(self, root=None):
+        self.root = root or app_data_path("offline")
+        self._objects = os.path.join(self.root, "objects")
+        self._pages = os.path.join(self.root, "pages")
+        self._cache = os.path.join(self.root, "cache")
+        for d in (self._objects, self._pages, self._cache):
+            os.makedirs(d, exist_ok=True)
+
+    def _object_path(self, digest):
+        return os.path.join(self._objects, digest[:2], digest[2:])
+
+    def _put_object(self, body):
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(zlib.compress(body, OFFLINE_COMPRESS_LEVEL))
+            os.replace(tmp, path)
+        return digest
+
+    def _get_object(self, digest):
+        with open(self._object_path(digest), "rb") as f:
+            return zlib.decompress(f.read())
+
+    def ingest(self, mhtml_path, title, url):
+        """Store an MHTML file; returns the new page id. Runs off the GUI thread."""
+        with open(mhtml_path, "rb") as f:
+            data = f.read()
+        preamble, boundary, parts, tail = split_mhtml(data)
+        manifest = {
+            "title": title,
+            "url": url,
+            "saved": time.time(),
+            "size": len(data),
+            "preamble": preamble.decode("latin-1"),
+            "boundary": boundary.decode("latin-1"),
+            "parts": [{"headers": h.decode("latin-1"), "sha256": self._put_object(b)}
+                      for h, b in parts],
+            "tail": tail.decode("latin-1"),
+        }
+        page_id = f"{int(manifest['saved'])}-{hashlib.sha256(data).hexdigest()[:12]}"
+        tmp = os.path.join(self._pages, page_id + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, os.path.join(self._pages, page_id + ".json"))
+        return page_id
+
+    def _manifest(self, page_id):
+        with open(os.path.join(self._pages, page_id + ".json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def list_pages(self):
+        """(page_id, title, url, saved) for every saved page, newest first."""
+        pages = []
+        for name in os.listdir(self._pages):
+            if not name.endswith(".json"):
+                continue
+            try:
+                m = self._manifest(name[:-5])
+                pages.append((name[:-5], m.get("title", ""), m.get("url", ""), m.get("saved", 0)))
+            except (OSError, ValueError):
+                continue
+        pages.sort(key=lambda p: p[3], reverse=True)
+        return pages
+
+    def materialize(self, page_id):
+        """Path of a reassembled .mhtml for page_id (cached after the first open)."""
+        path = os.path.join(self._cache, page_id + ".mhtml")
+        if not os.path.exists(path):
+            m = self._manifest(page_id)
+            parts = [(p["headers"].encode("latin-1"), self._get_object(p["sha256"]))
+                     for p in m["parts"]]
+            data = join_mhtml(m["preamble"].encode("latin-1"), m["boundary"].encode("latin-1"),
+                              parts, m["tail"].encode("latin-1"))
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return path
+
+    def remove(self, page_id):
+        for path in (os.path.join(self._pages, page_id + ".json"),
+                     os.path.join(self._cache, page_id + ".mhtml")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def collect_garbage(self):
+        """Delete objects no manifest refers to; returns bytes freed."""
+        live = set()
+        for page_id, _, _, _ in self.list_pages():
+            try:
+                live.update(p["sha256"] for p in self._manifest(page_id)["parts"])
+            except (OSError, ValueError, KeyError):
+                return 0  # unreadable manifest: keep everything
+        freed = 0
+        for prefix in os.listdir(self._objects):
+            folder = os.path.join(self._objects, prefix)
+            for name in os.listdir(folder):
+                if prefix + name not in live and not name.endswith(".tmp"):
+                    path = os.path.join(folder, name)
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+        return freed
+
+    def usage(self):
+        """(logical bytes of all saved pages, bytes actually stored)."""
+        logical = 0
+        for page_id, _, _, _ in self.list_pages():
+            try:
+                logical += self._manifest(page_id).get("size", 0)
+            except (OSError, ValueError):
+                pass
+        stored = 0
+        for dirpath, _, files in os.walk(self._objects):
+            stored += sum(os.path.getsize(os.path.join(dirpath, f)) for f in files)
+        return logical, stored
+
+
+class ArchiveWriter(QThread):
+    """Background writer so PDF and archive writes never block the GUI thread."""
+    done = pyqtSignal(str, str)     # kind, message
+    failed = pyqtSignal(str, str)   # kind, error
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self._store = store
+        self._jobs = queue.Queue()
+
+    def write_file(self, path, data):
+        self._jobs.put(("pdf", path, data))
+
+    def archive(self, mhtml_path, title, url):
+        self._jobs.put(("mhtml", mhtml_path, title, url))
+
+    def collect_garbage(self):
+        self._jobs.put(("gc",))
+
+    def stop(self):
+        self._jobs.put(None)
+        self.wait()
+
+    def run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            kind = job[0]
+            try:
+                if kind == "pdf":
+                    _, path, data = job
+                    with open(path, "wb") as f:
+                        f.write(data)
+                    self.done.emit(kind, path)
+                elif kind == "mhtml":
+                    _, path, title, url = job
+                    try:
+                        self._store.ingest(path, title, url)
+                    finally:
+                        os.remove(path)
+                    self.done.emit(kind, title or url)
+                elif kind == "gc":
+                    self.done.emit(kind, format_bytes(self._store.collect_garbage()))
+            except Exception as e:
+                self.failed.emit(kind, str(e))
+
+
+# -----------------------------------------------------------------------------
+# Download manager (queue, concurrency limit, resume, throughput)
+# -----------------------------------------------------------------------------
+def unique_path(directory, filename):
+    """directory/filename, or 'name (n).ext' if that file already exists."""
+    filename = os.path.basename(filename) or "download"
+    base, ext = os.path.splitext(filename)
+    path = os.path.join(directory, filename)
+    n = 1
+    while os.path.exists(path):
+        path = os.path.join(directory, f"{base} ({n}){ext}")
+        n += 1
+    return path
+
+
+def format_eta(seconds):
+    """h:mm:ss / m:ss for an ETA in seconds, or '--' if unknown."""
+    if seconds is None or seconds < 0:
+        return "--"
+    seconds = int(seconds)
+    h, rem = divmod(seconds, 3600)
+    m, sec = divmod(rem, 60)
+    return f"{h}:{m:02d}:{sec:02d}" if h else f"{m}:{sec:02d}"
+
+
+class DownloadRecord:
+    """Book-keeping for one download: state, throughput and resume attempts."""
+
+    def __init__(self, item, path):
+        self.item = item
+        self.path = path
+        self.state = "queued"   # queued, active, paused, interrupted, completed, cancelled
+        self.received = 0
+        self.total = max(int(item.totalBytes()), -1)
+        self.rate = 0.0          # bytes/s, smoothed
+        self.resume_attempts = 0
+        self.started = time.monotonic()
+        self._sample_bytes = 0
+        self._sample_time = self.started
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    def sample(self, received, total):
+        self.received = received
+        if total > 0:
+            self.total = total
+        now = time.monotonic()
+        dt = now - self._sample_time
+        if dt >= DOWNLOAD_RATE_WINDOW_S:
+            inst = max(received - self._sample_bytes, 0) / dt
+            self.rate = inst if self.rate == 0 else 0.7 * self.rate + 0.3 * inst
+            self._sample_bytes = received
+            self._sample_time = now
+
+    def eta(self):
+        if self.total <= 0 or self.rate <= 0:
+            return None
+        return (self.total - self.received) / self.rate
+
+    def describe(self):
+        pct = f"{100 * self.received // self.total}%" if self.total > 0 else format_bytes(self.received)
+        parts = [self.name, pct, self.state]
+        if self.state == "active":
+            parts += [f"{format_bytes(self.rate)}/s", f"ETA {format_eta(self.eta())}"]
+        return " — ".join(parts)
+
+
+class DownloadManager(QObject):
+    """Handles profile downloads: at most max_concurrent transfer at once, the
+    rest wait paused in FIFO order; interrupted downloads resume automatically."""
+    changed = pyqtSignal()
+    message = pyqtSignal(str)
+
+    def __init__(self, settings=None, parent=None):
+        super().__init__(parent)
+        self._settings = settings or get_settings()
+        self.records = []
+        self._queue = deque()
+
+    @property
+    def max_concurrent(self):
+        return max(1, settings_int(self._settings, "downloads/max_concurrent", DOWNLOAD_MAX_CONCURRENT))
+
+    def set_max_concurrent(self, n):
+        self._settings.setValue("downloads/max_concurrent", max(1, int(n)))
+        self._start_queued()
+
+    def directory(self):
+        d = self._settings.value("downloads/directory", "")
+        d = str(d) if d else QStandardPaths.writableLocation(QStandardPaths.DownloadLocation)
+        d = d or os.path.expanduser("~")
+        os.makedirs(d, exist_ok=True)
+        return d
+
+    def active(self):
+        return [r for r in self.records if r.state == "active"]
+
+    def _has_space(self, directory, total, exclude=None):
+        # Bytes still to arrive for every other unfinished download count against free space
+        pending = sum(max(r.total - r.received, 0) for r in self.records
+                      if r is not exclude and r.state in ("active", "queued", "paused", "interrupted"))
+        try:
+            free = shutil.disk_usage(directory).free
+        except OSError:
+            return True
+        return free - pending - max(total, 0) >= DOWNLOAD_DISK_RESERVE
+
+    def handle(self, item):
+        """Slot for QWebEngineProfile.downloadRequested (non-archive downloads)."""
+        directory = self.directory()
+        if hasattr(item, "downloadFileName"):
+            filename = item.downloadFileName()
+        else:
+            filename = os.path.basename(item.path())
+        path = unique_path(directory, filename)
+        if not self._has_space(directory, item.totalBytes()):
+            self.message.emit(f"Not enough disk space for {os.path.basename(path)}")
+            return  # not accepted: Qt cancels it
+        if hasattr(item, "setDownloadDirectory"):
+            item.setDownloadDirectory(directory)
+            item.setDownloadFileName(os.path.basename(path))
+        else:
+            item.setPath(path)
+        record = DownloadRecord(item, path)
+        self.records.append(record)
+        item.downloadProgress.connect(lambda rec, tot, r=record: self._on_progress(r, rec, tot))
+        item.stateChanged.connect(lambda state, r=record: self._on_state(r, state))
+        item.accept()
+        if len(self.active()) < self.max_concurrent:
+            record.state = "active"
+            self.message.emit(f"Downloading {record.name}")
+        else:
+            item.pause()
+            self._queue.append(record)
+            self.message.emit(f"Queued {record.name}")
+        self.changed.emit()
+
+    def _on_progress(self, record, received, total):
+        record.sample(received, total)
+        self.changed.emit()
+
+    def _on_state(self, record, state):
+        if state == QWebEngineDownloadItem.DownloadCompleted:
+            record.state = "completed"
+            record.rate = 0.0
+            self.message.emit(f"Downloaded {record.name}")
+        elif state == QWebEngineDownloadItem.DownloadCancelled:
+            record.state = "cancelled"
+        elif state == QWebEngineDownloadItem.DownloadInterrupted:
+            record.state = "interrupted"
+            record.rate = 0.0
+            if record.resume_attempts < DOWNLOAD_AUTO_RESUME:
+                record.resume_attempts += 1
+                delay = DOWNLOAD_RESUME_BACKOFF_MS * record.resume_attempts
+                QTimer.singleShot(delay, lambda r=record: self._auto_resume(r))
+            else:
+                self.message.emit(f"Download failed: {record.name} ({record.item.interruptReasonString()})")
+        self._start_queued()
+        self.changed.emit()
+
+    def _auto_resume(self, record):
+        if record.state == "interrupted":
+            record.state = "queued"
+            self._queue.appendleft(record)
+            self._start_queued()
+
+    def _start_queued(self):
+        while self._queue and len(self.active()) < self.max_concurrent:
+            record = self._queue.popleft()
+            if record.state != "queued":
+                continue
+            if not self._has_space(os.path.dirname(record.path), record.total - record.received, record):
+                record.state = "paused"
+                self.message.emit(f"Paused {record.name}: not enough disk space")
+                continue
+            record.state = "active"
+            record.item.resume()
+        self.changed.emit()
+
+    def pause(self, record):
+        if record.state in ("active", "queued"):
+            if record in self._queue:
+                self._queue.remove(record)
+            record.item.pause()
+            record.state = "paused"
+            record.rate = 0.0
+            self._start_queued()
+
+    def resume(self, record):
+        if record.state in ("paused", "interrupted"):
+            record.resume_attempts = 0
+            record.state = "queued"
+            self._queue.append(record)
+            self._start_queued()
+
+    def cancel(self, record):
+        if record.state not in ("completed", "cancelled"):
+            if record in self._queue:
+                self._queue.remove(record)
+            record.item.cancel()
+            record.state = "cancelled"
+            self._start_queued()
+
+    def aggregate(self):
+        """(total bytes/s, ETA in seconds or None) over active downloads."""
+        active = self.active()
+        rate = sum(r.rate for r in active)
+        remaining = sum(r.total - r.received for r in active if r.total > 0)
+        return rate, (remaining / rate if rate > 0 else None)
+
+
+# -----------------------------------------------------------------------------
+# Source viewer (virtualized lines, lazy highlighting on a worker thread)
+# -----------------------------------------------------------------------------
+SOURCE_TEXT_RE = re.compile(
+    r"(?P<comment><!--.*?(?:-->|$))|(?P<tag></?[A-Za-z!?][\w:.-]*)|(?P<entity>&#?\w+;)")
+SOURCE_IN_TAG_RE = re.compile(
+    r"(?P<close>/?>)|(?P<string>\"[^\"]*\"|'[^']*')|(?P<attr>[A-Za-z_:@][\w:.-]*)")
+
+
+def highlight_source_line(line):
+    """Syntax spans (start, length, kind) for one line of HTML source."""
+    spans = []
+    pos, end = 0, min(len(line), SOURCE_HIGHLIGHT_MAX_LINE)
+    in_tag = False
+    while pos < end:
+        m = (SOURCE_IN_TAG_RE if in_tag else SOURCE_TEXT_RE).search(line, pos, end)
+        if not m:
+            break
+        kind = m.lastgroup
+        if kind == "tag":
+            in_tag = True
+        elif kind == "close":
+            in_tag, kind = False, "tag"
+        spans.append((m.start(), m.end() - m.start(), kind))
+        pos = max(m.end(), pos + 1)
+    return spans
+
+
+class SourceHighlightWorker(QThread):
+    """Highlights the most recently requested line range; older requests are dropped."""
+    highlighted = pyqtSignal(int, object)  # first line, [spans per line]
+
+    def __init__(self, lines, parent=None):
+        super().__init__(parent)
+        self._lines = lines
+        self._wanted = None
+        self._stop = False
+        self._cond = threading.Condition()
+
+    def request(self, first, last):
+        with self._cond:
+            self._wanted = (first, last)
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._wanted is None and not self._stop:
+                    self._cond.wait()
+                if self._stop:
+                    return
+                first, last = self._wanted
+                self._wanted = None
+            last = min(last, len(self._lines))
+            self.highlighted.emit(first, [highlight_source_line(self._lines[i])
+                                          for i in range(first, last)])
+
+
+class SourceView(QAbstractScrollArea):
+    """Read-only source view that only lays out and paints the visible lines."""
+
+    def __init__(self, text, dark=True, parent=None):
+        super().__init__(parent)
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        if "\t" in text:
+            text = text.expandtabs(SOURCE_TAB_WIDTH)
+        self._text = text
+        self._lines = text.split("\n")
+        self._line_starts = list(accumulate((len(line) + 1 for line in self._lines), initial=0))
+        self._max_cols = max(map(len, self._lines))
+        self._colors = {k: QColor(v) for k, v in SOURCE_COLORS[bool(dark)].items()}
+        font = QFont("monospace")
+        font.setStyleHint(QFont.Monospace)
+        font.setPointSize(11)
+        self.setFont(font)
+        fm = QFontMetrics(font)
+        self._line_h = max(fm.height(), 1)
+        self._ascent = fm.ascent()
+        self._char_w = max(fm.horizontalAdvance("M") if hasattr(fm, "horizontalAdvance")
+                           else fm.width("M"), 1)
+        self._gutter_w = self._char_w * (len(str(len(self._lines))) + 2)
+        self._spans = {}
+        self._requested = None
+        self._match = None       # (line, col, length)
+        self._offsets_key = None  # (term, case_sensitive) the offsets below belong to
+        self._offsets = array("q")
+        self._lower = None        # lower-cased text, built on the first case-insensitive search
+        self._worker = SourceHighlightWorker(self._lines, self)
+        self._worker.highlighted.connect(self._on_highlighted)
+        self._worker.start()
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.shutdown)
+        self.verticalScrollBar().valueChanged.connect(self._on_scrolled)
+        self.horizontalScrollBar().valueChanged.connect(self.viewport().update)
+        self._update_scrollbars()
+
+    @property
+    def line_count(self):
+        return len(self._lines)
+
+    def shutdown(self):
+        if self._worker is not None:
+            self._worker.stop()
+            self._worker = None
+
+    def _visible_rows(self):
+        return self.viewport().height() // self._line_h + 1
+
+    def _visible_cols(self):
+        return max((self.viewport().width() - self._gutter_w) // self._char_w, 1)
+
+    def _update_scrollbars(self):
+        rows, cols = self._visible_rows(), self._visible_cols()
+        vsb, hsb = self.verticalScrollBar(), self.horizontalScrollBar()
+        vsb.setRange(0, max(0, len(self._lines) - rows + 1))
+        vsb.setPageStep(rows)
+        hsb.setRange(0, max(0, self._max_cols - cols + 1))
+        hsb.setPageStep(cols)
+        self._request_highlight()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scrollbars()
+
+    def _on_scrolled(self):
+        self._request_highlight()
+        self.viewport().update()
+
+    def _request_highlight(self):
+        if self._worker is None:
+            return
+        rows = self._visible_rows()
+        first = self.verticalScrollBar().value()
+        # Prefetch a screen above and below so scrolling rarely shows plain text
+        lo, hi = max(0, first - rows), min(len(self._lines), first + 2 * rows)
+        if all(i in self._spans for i in range(first, min(hi, first + rows))):
+            return
+        if self._requested == (lo, hi):
+            return
+        if len(self._spans) > SOURCE_SPAN_CACHE_LINES:
+            self._spans = {i: sp for i, sp in self._spans.items() if lo - rows <= i < hi + rows}
+        self._requested = (lo, hi)
+        self._worker.request(lo, hi)
+
+    def _on_highlighted(self, first, spans):
+        for i, line_spans in enumerate(spans):
+            self._spans[first + i] = line_spans
+        self._requested = None
+        self.viewport().update()
+
+    def keyPressEvent(self, event):
+        vsb = self.verticalScrollBar()
+        steps = {Qt.Key_Up: -1, Qt.Key_Down: 1,
+                 Qt.Key_PageUp: -vsb.pageStep(), Qt.Key_PageDown: vsb.pageStep()}
+        if event.key() in steps:
+            vsb.setValue(vsb.value() + steps[event.key()])
+        elif event.key() == Qt.Key_Home:
+            vsb.setValue(0)
+        elif event.key() == Qt.Key_End:
+            vsb.setValue(vsb.maximum())
+        else:
+            super().keyPressEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        c = self._colors
+        rect = self.viewport().rect()
+        painter.fillRect(rect, c["background"])
+        first = self.verticalScrollBar().value()
+        col0 = self.horizontalScrollBar().value()
+        cols = self._visible_cols() + 1
+        cw, lh = self._char_w, self._line_h
+        for row in range(self._visible_rows()):
+            i = first + row
+            if i >= len(self._lines):
+                break
+            y = row * lh
+            painter.setClipping(False)
+            painter.setPen(c["gutter"])
+            painter.drawText(0, y, self._gutter_w - cw, lh, Qt.AlignRight, str(i + 1))
+            painter.setClipRect(self._gutter_w, 0, rect.width(), rect.height())
+            if self._match and self._match[0] == i:
+                _, col, length = self._match
+                painter.fillRect(self._gutter_w + (col - col0) * cw, y, length * cw, lh, c["match"])
+            line = self._lines[i]
+            end = min(len(line), col0 + cols)
+            pos, baseline = col0, y + self._ascent
+            for start, length, kind in self._spans.get(i, ()):
+                s, e = max(start, col0), min(start + length, end)
+                if e <= s:
+                    continue
+                if s > pos:
+                    painter.setPen(c["text"])
+                    painter.drawText(self._gutter_w + (pos - col0) * cw, baseline, line[pos:s])
+                painter.setPen(c[kind])
+                painter.drawText(self._gutter_w + (s - col0) * cw, baseline, line[s:e])
+                pos = e
+            if pos < end:
+                painter.setPen(c["text"])
+                painter.drawText(self._gutter_w + (pos - col0) * cw, baseline, line[pos:end])
+        painter.end()
+
+    def find(self, term, backward=False, case_sensitive=False):
+        """Move to the next (or previous) match, wrapping. Returns (index, total) or None."""
+        if not term:
+            self._match = None
+            self.viewport().update()
+            return None
+        if self._offsets_key != (term, case_sensitive):
+            # One scan per new term; stepping between matches is then a bisect
+            self._offsets = self._match_offsets(term, case_sensitive)
+            self._offsets_key = (term, case_sensitive)
+            self._match = None
+        offsets = self._offsets
+        if not offsets:
+            self._match = None
+            self.viewport().update()
+            return None
+        if self._match:
+            line, col, _ = self._match
+            here = self._line_starts[line] + col
+            i = bisect.bisect_left(offsets, here) + (-1 if backward else 1)
+        else:
+            here = self._line_starts[self.verticalScrollBar().value()]
+            i = bisect.bisect_left(offsets, here) - (1 if backward else 0)
+        i %= len(offsets)
+        start = offsets[i]
+        line = bisect.bisect_right(self._line_starts, start) - 1
+        col = start - self._line_starts[line]
+        self._match = (line, col, len(term))
+        self._scroll_to(line, col)
+        self.viewport().update()
+        return i + 1, len(offsets)
+
+    def _match_offsets(self, term, case_sensitive):
+        haystack, needle = self._text, term
+        if not case_sensitive:
+            if self._lower is None:
+                self._lower = self._text.lower()
+            if len(self._lower) != len(self._text):
+                # Lower-casing changed offsets (rare Unicode); fall back to a regex scan
+                rx = re.compile(re.escape(term), re.I)
+                return array("q", (m.start() for m in rx.finditer(self._text)))
+            haystack, needle = self._lower, term.lower()
+        offsets = array("q")
+        find = haystack.find
+        i = find(needle)
+        while i >= 0:
+            offsets.append(i)
+            i = find(needle, i + 1)
+        return offsets
+
+    def _scroll_to(self, line, col):
+        vsb, hsb = self.verticalScrollBar(), self.horizontalScrollBar()
+        rows, cols = self._visible_rows(), self._visible_cols()
+        if not vsb.value() <= line < vsb.value() + rows - 1:
+            vsb.setValue(line - rows // 2)
+        if not hsb.value() <= col < hsb.value() + cols - 1:
+            hsb.setValue(max(0, col - cols // 4))
+
+
+class SourceViewerDialog(QDialog):
+    def __init__(self, url, html, dark=True, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Source — {url}")
+        self.resize(1000, 700)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(8, 8, 8, 8)
+
+        find_layout = QHBoxLayout()
+        self._find_edit = QLineEdit()
+        self._find_edit.setPlaceholderText("Find in source...")
+        self._find_edit.returnPressed.connect(lambda: self._find(False))
+        find_layout.addWidget(self._find_edit)
+        self._case_cb = QCheckBox("Match case")
+        find_layout.addWidget(self._case_cb)
+        prev_btn = QPushButton("Previous")
+        prev_btn.clicked.connect(lambda: self._find(True))
+        find_layout.addWidget(prev_btn)
+        next_btn = QPushButton("Next")
+        next_btn.clicked.connect(lambda: self._find(False))
+        find_layout.addWidget(next_btn)
+        self._result_label = QLabel("")
+        self._result_label.setMinimumWidth(120)
+        self._result_label.setStyleSheet("color: gray; font-size: 12px;")
+        find_layout.addWidget(self._result_label)
+        layout.addLayout(find_layout)
+
+        self._view = SourceView(html, dark, self)
+        layout.addWidget(self._view)
+        self._result_label.setText(f"{self._view.line_count:,} lines")
+        self.finished.connect(self._view.shutdown)
+        QShortcut(QKeySequence.Find, self, self._find_edit.setFocus)
+        QShortcut(QKeySequence.FindPrevious, self, lambda: self._find(True))
+
+    def _find(self, backward):
+        result = self._view.find(self._find_edit.text(), backward, self._case_cb.isChecked())
+        if result:
+            self._result_label.setText(f"{result[0]:,} of {result[1]:,}")
+        elif self._find_edit.text():
+            self._result_label.setText("No matches")
+        else:
+            self._result_label.setText(f"{self._view.line_count:,} lines")
+
+
+# -----------------------------------------------------------------------------
+# Headless rendering (bounded pool of offscreen pages, batch export)
+# -----------------------------------------------------------------------------
+def default_job_count():
+    """Pool size tuned to the machine: one offscreen page per core, capped."""
+    return max(1, min(os.cpu_count() or 1, BATCH_MAX_JOBS))
+
+
+def read_url_list(stream):
+    """URLs from a text stream, one per line (blank lines and # comments skipped)."""
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield parse_url_input(line)
+
+
+def url_to_filename(url, index, ext):
+    """Stable, filesystem-safe output name for the index-th URL of a batch."""
+    slug = re.sub(r"^[a-z]+://", "", url, flags=re.I)
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", slug).strip("._")[:80]
+    return f"{index:06d}-{slug or 'page'}.{ext}"
+
+
+class _PoolSlot:
+    """One offscreen view of a HeadlessPool and the job it is working on."""
+
+    def __init__(self, view):
+        self.view = view
+        self.job = None
+        self.exporting = False
+        self.token = 0
+        self.started = 0.0
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+
+
+class HeadlessPool(QObject):
+    """Bounded pool of offscreen pages.
+
+    Jobs are loaded concurrently (one per slot) with a per-job timeout and
+    retries; each loaded page is handed to export(), which must end by calling
+    complete(). Results are emitted as they finish.
+    """
+    result = pyqtSignal(dict)
+    finished = pyqtSignal()
+
+    def __init__(self, size, timeout_s=BATCH_TIMEOUT_S, retries=BATCH_RETRIES, parent=None):
+        super().__init__(parent)
+        self._queue = deque()
+        self._timeout_ms = int(timeout_s * 1000)
+        self._retries = max(0, retries)
+        self._running = False
+        self._done = False
+        self._slots = []
+        self.stats = {"ok": 0, "failed": 0, "retried": 0}
+        self.started_at = 0.0
+        for _ in range(max(1, size)):
+            view = QWebEngineView()
+            view.setAttribute(Qt.WA_DontShowOnScreen, True)
+            view.resize(HEADLESS_VIEWPORT)
+            view.show()
+            slot = _PoolSlot(view)
+            slot.timer.timeout.connect(lambda s=slot: self._fail(s, "timeout"))
+            self._attach_page(slot)
+            self._slots.append(slot)
+
+    def _attach_page(self, slot):
+        # A fresh page after a failure so late signals from an aborted load are ignored
+        old = slot.view.page()
+        page = QWebEnginePage(get_browser_profile(), slot.view)
+        page.loadFinished.connect(lambda ok, s=slot, p=page: self._on_loaded(s, p, ok))
+        self.page_created(slot, page)
+        slot.view.setPage(page)
+        if old is not None and old.parent() is slot.view:
+            old.deleteLater()
+
+    def page_created(self, slot, page):
+        """Hook for subclasses to connect per-page signals."""
+
+    def add(self, url, **extra):
+        self._queue.append(dict(extra, url=url, attempts=0))
+        self.wake()
+
+    def start(self):
+        self._running = True
+        self.started_at = time.monotonic()
+        self.wake()
+        if not self._has_pending():
+            self._check_done()
+
+    def wake(self):
+        """Give queued work to idle slots."""
+        if not self._running:
+            return
+        for slot in self._slots:
+            if slot.job is None:
+                self._dispatch(slot)
+
+    def _next_job(self):
+        return self._queue.popleft() if self._queue else None
+
+    def _has_pending(self):
+        return bool(self._queue)
+
+    def _requeue(self, job):
+        self._queue.append(job)
+
+    def _dispatch(self, slot):
+        job = self._next_job()
+        if job is None:
+            slot.job = None
+            self._check_done()
+            return
+        job["attempts"] += 1
+        slot.job = job
+        slot.exporting = False
+        slot.token += 1
+        slot.started = time.monotonic()
+        slot.timer.start(self._timeout_ms)
+        slot.view.load(QUrl(job["url"]))
+
+    def _check_done(self):
+        if self._done or self._has_pending():
+            return
+        if all(s.job is None for s in self._slots):
+            self._done = True
+            self.finished.emit()
+
+    def _on_loaded(self, slot, page, ok):
+        if slot.job is None or slot.exporting or slot.view.page() is not page:
+            return
+        if not ok:
+            self._fail(slot, "load failed")
+            return
+        slot.exporting = True
+        self.export(slot, slot.job, slot.token)
+
+    def export(self, slot, job, token):
+        """Export the loaded page; subclasses override and call complete()."""
+        self.complete(slot, token, True)
+
+    def complete(self, slot, token, ok, **info):
+        if slot.job is None or token != slot.token:
+            return  # job already timed out or was retried
+        if not ok:
+            self._fail(slot, info.get("error", "export failed"))
+            return
+        slot.timer.stop()
+        job = slot.job
+        self.stats["ok"] += 1
+        self.result.emit(dict(info, url=job["url"], ok=True, attempts=job["attempts"],
+                              seconds=round(time.monotonic() - slot.started, 3)))
+        self._release(slot)
+
+    def _fail(self, slot, reason):
+        if slot.job is None:
+            return
+        slot.timer.stop()
+        job = slot.job
+        slot.view.stop()
+        self._attach_page(slot)
+        if job["attempts"] <= self._retries:
+            self.stats["retried"] += 1
+            self._requeue(job)
+        else:
+            self.stats["failed"] += 1
+            self.result.emit({"url": job["url"], "ok": False, "attempts": job["attempts"],
+                              "error": reason,
+                              "seconds": round(time.monotonic() - slot.started, 3)})
+        self._release(slot)
+
+    def _release(self, slot):
+        slot.job = None
+        slot.exporting = False
+        slot.token += 1
+        # Next job from the event loop, not from inside a page callback
+        QTimer.singleShot(0, lambda s=slot: self._dispatch(s) if s.job is None else None)
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        done = self.stats["ok"] + self.stats["failed"]
+        return (f"{done} page(s): {self.stats['ok']} ok, {self.stats['failed']} failed, "
+                f"{self.stats['retried']} retried in {elapsed:.1f}s "
+                f"({done / elapsed:.2f} pages/s, {len(self._slots)} workers)")
+
+
+class BatchRenderer(HeadlessPool):
+    """Exports each URL as PDF, full-page PNG screenshot or plain text."""
+
+    def __init__(self, urls, fmt, out_dir, size, timeout_s, retries, parent=None):
+        super().__init__(size, timeout_s, retries, parent)
+        self._fmt = fmt
+        self._out_dir = out_dir
+        ext = "txt" if fmt == "text" else fmt
+        for i, url in enumerate(urls, 1):
+            self.add(url, path=os.path.join(out_dir, url_to_filename(url, i, ext)))
+
+    def page_created(self, slot, page):
+        if hasattr(page, "pdfPrintingFinished"):
+            page.pdfPrintingFinished.connect(
+                lambda path, ok, s=slot, p=page: self._on_pdf_done(s, p, path, ok))
+
+    def export(self, slot, job, token):
+        page = slot.view.page()
+        if self._fmt == "pdf":
+            slot.pdf_token = token
+            page.printToPdf(job["path"])
+        elif self._fmt == "text":
+            page.toPlainText(lambda text, t=token: self._write_text(slot, t, text))
+        else:
+            page.runJavaScript(
+                "[document.documentElement.scrollWidth, document.documentElement.scrollHeight]",
+                lambda size, t=token: self._resize_for_screenshot(slot, t, size))
+
+    def _on_pdf_done(self, slot, page, path, ok):
+        if slot.view.page() is not page or slot.job is None or path != slot.job.get("path"):
+            return
+        self.complete(slot, getattr(slot, "pdf_token", -1), ok, path=path)
+
+    def _write_text(self, slot, token, text):
+        if slot.job is None or token != slot.token:
+            return
+        try:
+            with open(slot.job["path"], "w", encoding="utf-8") as f:
+                f.write(text or "")
+            self.complete(slot, token, True, path=slot.job["path"])
+        except OSError as e:
+            self.complete(slot, token, False, error=str(e))
+
+    def _resize_for_screenshot(self, slot, token, size):
+        if slot.job is None or token != slot.token:
+            return
+        try:
+            width = max(HEADLESS_VIEWPORT.width(), int(size[0]))
+            height = min(max(HEADLESS_VIEWPORT.height(), int(size[1])), SCREENSHOT_MAX_HEIGHT)
+        except (TypeError, ValueError, IndexError):
+            width, height = HEADLESS_VIEWPORT.width(), HEADLESS_VIEWPORT.height()
+        slot.view.resize(width, height)
+        QTimer.singleShot(SCREENSHOT_SETTLE_MS, lambda: self._grab(slot, token))
+
+    def _grab(self, slot, token):
+        if slot.job is None or token != slot.token:
+            return
+        path = slot.job["path"]
+        ok = slot.view.grab().save(path, "PNG")
+        slot.view.resize(HEADLESS_VIEWPORT)
+        if ok:
+            self.complete(slot, token, True, path=path)
+        else:
+            self.complete(slot, token, False, error="could not write image")
+
+
+def run_batch(args, qt_argv):
+    """Headless batch export; streams one JSON line per finished URL to stdout."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication(qt_argv + process_model_args())
+    app.setApplicationName("Ligma Browser")
+    if args.batch == "-":
+        urls = list(read_url_list(sys.stdin))
+    else:
+        with open(args.batch, "r", encoding="utf-8") as f:
+            urls = list(read_url_list(f))
+    os.makedirs(args.out, exist_ok=True)
+    renderer = BatchRenderer(urls, args.format, args.out, args.jobs, args.timeout, args.retries)
+
+    def on_result(res):
+        print(json.dumps(res), flush=True)
+
+    renderer.result.connect(on_result)
+    renderer.finished.connect(app.quit)
+    renderer.start()
+    if urls:
+        app.exec_()
+    print(renderer.summary(), file=sys.stderr, flush=True)
+    return 0 if renderer.stats["failed"] == 0 else 1
+
+
+# -----------------------------------------------------------------------------
+# Site crawler (--crawl; headless pool + per-host frontier + Bloom filter)
+# -----------------------------------------------------------------------------
+class BloomFilter:
+    """Fixed-size set membership with false positives but no false negatives.
+
+    Sized for capacity keys at error_rate, so memory stays flat however many
+    keys are added. bits may be any writable buffer (bytearray, mmap) of at
+    least size_for(capacity, error_rate) bytes."""
+
+    def __init__(self, capacity, error_rate=CRAWL_BLOOM_ERROR, bits=None, num_bits=None, num_hashes=None):
+        capacity = max(1, int(capacity))
+        self.num_bits = num_bits or max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = num_hashes or max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    @staticmethod
+    def size_for(capacity, error_rate=CRAWL_BLOOM_ERROR):
+        return (max(8, int(-max(1, capacity) * math.log(error_rate) / (math.log(2) ** 2))) + 7) // 8
+
+    def _positions(self, key):
+        if isinstance(key, str):
+            key = key.encode("utf-8")
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key):
+        """Add key; True if it was (probably) not present before."""
+        bits = self.bits
+        new = False
+        for p in self._positions(key):
+            byte, mask = p >> 3, 1 << (p & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def update(self, keys):
+        """Add many keys (bytes); cheaper than add() per key when novelty is not needed."""
+        bits, m, k = self.bits, self.num_bits, self.num_hashes
+        blake2b = hashlib.blake2b
+        for key in keys:
+            digest = blake2b(key, digest_size=16).digest()
+            h1 = int.from_bytes(digest[:8], "little")
+            h2 = int.from_bytes(digest[8:], "little") | 1
+            for i in range(k):
+                p = (h1 + i * h2) % m
+                bits[p >> 3] |= 1 << (p & 7)
+        self.count += len(keys)
+
+    def false_positive_rate(self):
+        """Expected false-positive rate at the current fill."""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+
+def remove_dot_segments(path):
+    """RFC 3986 dot-segment removal (QUrl.NormalizePathSegments mishandles './' in Qt 5.15)."""
+    out = []
+    for segment in path.split("/"):
+        if segment == "..":
+            if len(out) > 1:
+                out.pop()
+        elif segment != ".":
+            out.append(segment)
+    return "/".join(out) + ("/" if path.endswith(("/.", "/..")) else "")
+
+
+def normalize_crawl_url(text, base=None):
+    """Absolute, canonical http(s) URL for a link or seed, or None.
+
+    Seeds go through parse_url_input (so 'example.com' works as in the
+    address bar); links are resolved against the page. Fragments, default
+    ports and dot segments are dropped and the host is lower-cased."""
+    url = QUrl(base).resolved(QUrl(text)) if base else QUrl(parse_url_input(text))
+    if url.scheme() not in ("http", "https") or not url.host():
+        return None
+    url = url.adjusted(QUrl.RemoveFragment)
+    url.setPath(remove_dot_segments(url.path(QUrl.FullyEncoded)), QUrl.TolerantMode)
+    url.setHost(url.host().lower())
+    if url.port() == (80 if url.scheme() == "http" else 443):
+        url.setPort(-1)
+    if not url.path():
+        url.setPath("/")
+    return url.toString(QUrl.FullyEncoded)
+
+
+class HostFrontier:
+    """URL queue that serves each host at most once per delay and one request at a time."""
+
+    def __init__(self, delay_s=CRAWL_HOST_DELAY_S, limit=CRAWL_FRONTIER_LIMIT):
+        self._delay = delay_s
+        self._limit = limit
+        self._queues = {}    # host -> deque of jobs
+        self._ready = []     # heap of (ready_at, host) for idle hosts with queued jobs
+        self._busy = set()
+        self.size = 0
+        self.dropped = 0
+
+    def push(self, host, job, front=False):
+        if self.size >= self._limit:
+            self.dropped += 1
+            return False
+        queue = self._queues.get(host)
+        if queue is None:
+            queue = self._queues[host] = deque()
+            if host not in self._busy:
+                heapq.heappush(self._ready, (0.0, host))
+        queue.appendleft(job) if front else queue.append(job)
+        self.size += 1
+        return True
+
+    def pop(self, now):
+        """Next job whose host is idle and past its delay, or None."""
+        if self._ready and self._ready[0][0] <= now:
+            _, host = heapq.heappop(self._ready)
+            queue = self._queues[host]
+            job = queue.popleft()
+            if not queue:
+                del self._queues[host]
+            self._busy.add(host)
+            self.size -= 1
+            return job
+        return None
+
+    def release(self, host, now):
+        """The request to host finished; it may be served again after the delay."""
+        self._busy.discard(host)
+        if host in self._queues:
+            heapq.heappush(self._ready, (now + self._delay, host))
+
+    def next_ready_in(self, now):
+        """Seconds until some host can be served, or None if none is waiting."""
+        return max(0.0, self._ready[0][0] - now) if self._ready else None
+
+    def __bool__(self):
+        return self.size > 0
+
+
+CRAWL_EXTRACT_JS = """(function () {
+    var meta = document.querySelector('meta[name="description"]');
+    var canonical = document.querySelector('link[rel="canonical"]');
+    return {
+        title: document.title,
+        description: meta ? meta.content : "",
+        canonical: canonical ? canonical.href : "",
+        lang: document.documentElement.lang || "",
+        text: document.body ? document.body.innerText.slice(0, %d) : "",
+        links: Array.prototype.map.call(document.querySelectorAll("a[href]"), function (a) { return a.href; })
+    };
+})()""" % CRAWL_TEXT_LIMIT
+
+
+class SiteCrawler(HeadlessPool):
+    """Renders pages (so script-built links count), follows links breadth-first
+    through a polite per-host frontier and dedups URLs with a Bloom filter."""
+
+    def __init__(self, seeds, size, timeout_s, retries, max_pages=CRAWL_MAX_PAGES, max_depth=CRAWL_MAX_DEPTH,
+                 delay_s=CRAWL_HOST_DELAY_S, same_host=True, capacity=CRAWL_BLOOM_CAPACITY, parent=None):
+        super().__init__(size, timeout_s, retries, parent)
+        self._frontier = HostFrontier(delay_s)
+        self._seen = BloomFilter(capacity)
+        self._max_pages = max_pages
+        self._max_depth = max_depth
+        self._dispatched = 0
+        self._hosts = set()
+        self._same_host = same_host
+        self._wake_timer = QTimer(self)
+        self._wake_timer.setSingleShot(True)
+        self._wake_timer.timeout.connect(self.wake)
+        for seed in seeds:
+            url = normalize_crawl_url(seed)
+            if url:
+                self._hosts.add(QUrl(url).host())
+                self._enqueue(url, 0)
+
+    def _enqueue(self, url, depth):
+        if self._seen.add(url):
+            self._frontier.push(QUrl(url).host(), {"url": url, "depth": depth, "attempts": 0})
+
+    def _next_job(self):
+        if self._dispatched >= self._max_pages:
+            return None
+        job = self._frontier.pop(time.monotonic())
+        if job is None:
+            wait = self._frontier.next_ready_in(time.monotonic())
+            if wait is not None and not self._wake_timer.isActive():
+                self._wake_timer.start(int(wait * 1000) + 1)
+            return None
+        if job["attempts"] == 0:
+            self._dispatched += 1
+        return job
+
+    def _has_pending(self):
+        return bool(self._frontier) and self._dispatched < self._max_pages
+
+    def _requeue(self, job):
+        # Front of its host's queue; the host itself is freed by _release
+        self._frontier.push(QUrl(job["url"]).host(), job, front=True)
+
+    def _release(self, slot):
+        if slot.job is not None:
+            self._frontier.release(QUrl(slot.job["url"]).host(), time.monotonic())
+        super()._release(slot)
+
+    def export(self, slot, job, token):
+        slot.view.page().runJavaScript(CRAWL_EXTRACT_JS, lambda data, t=token: self._extracted(slot, t, data))
+
+    def _extracted(self, slot, token, data):
+        if slot.job is None or token != slot.token:
+            return
+        if not isinstance(data, dict):
+            self.complete(slot, token, False, error="could not read page")
+            return
+        job = slot.job
+        final = slot.view.url().toString()
+        links = data.get("links") or []
+        if job["depth"] < self._max_depth:
+            for link in links:
+                url = normalize_crawl_url(str(link), final)
+                if url and (not self._same_host or QUrl(url).host() in self._hosts):
+                    self._enqueue(url, job["depth"] + 1)
+        self.complete(slot, token, True, final_url=final, depth=job["depth"], title=data.get("title", ""),
+                      description=data.get("description", ""), canonical=data.get("canonical", ""),
+                      lang=data.get("lang", ""), links=len(links), text=data.get("text", ""))
+
+    def summary(self):
+        return (super().summary() + f"; {self._seen.count} unique URLs seen "
+                f"(Bloom {format_bytes(len(self._seen.bits))}, ~{self._seen.false_positive_rate():.2%} false positives), "
+                f"{self._frontier.size} left in frontier, {self._frontier.dropped} dropped")
+
+
+def run_crawl(args, qt_argv):
+    """--crawl: stream one JSON line per rendered page to stdout."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication(qt_argv + process_model_args())
+    app.setApplicationName("Ligma Browser")
+    fixture = None
+    delay = args.crawl_delay
+    seeds = list(args.urls)
+    if args.crawl == "-":
+        seeds.extend(read_url_list(sys.stdin))
+    elif args.crawl == "fixture":
+        # Generated local site with script-built links; no network needed
+        fixture = PerfFixtureServer(0, 4).start()
+        seeds.append(fixture.site_url(args.crawl_fixture_pages))
+        delay = 0 if delay is None else delay
+    elif os.path.isfile(args.crawl):
+        with open(args.crawl, "r", encoding="utf-8") as f:
+            seeds.extend(read_url_list(f))
+    else:
+        seeds.append(args.crawl)
+    crawler = SiteCrawler(seeds, args.jobs, args.timeout, args.retries, args.crawl_max_pages, args.crawl_depth,
+                          CRAWL_HOST_DELAY_S if delay is None else delay, not args.crawl_all_hosts)
+    crawler.result.connect(lambda res: print(json.dumps(res), flush=True))
+    crawler.finished.connect(app.quit)
+    crawler.start()
+    if not crawler._done:
+        app.exec_()
+    if fixture is not None:
+        fixture.stop()
+    print(crawler.summary(), file=sys.stderr, flush=True)
+    return 0 if crawler.stats["ok"] else 1
+
+
+# -----------------------------------------------------------------------------
+# Python memory diagnostics (tracemalloc snapshots, live objects, tab soak test)
+# -----------------------------------------------------------------------------
+def count_live(cls):
+    """Python wrappers of cls whose C++ object still exists (after a gc pass)."""
+    gc.collect()
+    return sum(1 for obj in gc.get_objects()
+               if isinstance(obj, cls) and not sip.isdeleted(obj))
+
+
+class MemoryDiagnostics:
+    """On-demand tracemalloc snapshots and diffs, plus live-object counts."""
+
+    def __init__(self):
+        self._last = None
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._last = None
+
+    def stop(self):
+        tracemalloc.stop()
+        self._last = None
+
+    def snapshot_diff(self, top=MEMORY_DIFF_TOP):
+        """Take a snapshot; report growth since the previous one (or the largest sites)."""
+        if not tracemalloc.is_tracing():
+            return "Tracing is off; start it first."
+        snap = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced: {format_bytes(current)} (peak {format_bytes(peak)})"]
+        if self._last is None:
+            lines.append("Largest allocation sites:")
+            stats = snap.statistics("lineno")[:top]
+            lines.extend(f"  {format_bytes(st.size):>10}  {st.count:>7}  {st.traceback}" for st in stats)
+        else:
+            lines.append("Growth since previous snapshot:")
+            stats = snap.compare_to(self._last, "lineno")[:top]
+            lines.extend(f"  {format_bytes(st.size_diff):>10}  {st.count_diff:>+7}  {st.traceback}"
+                         for st in stats)
+        self._last = snap
+        return "\n".join(lines)
+
+    def object_counts(self, browser):
+        """Live tab/page objects next to the number of open tabs; extras are leaks."""
+        return [
+            ("Open tabs", browser._tabs.count()),
+            ("BrowserTab (Qt children)", len(browser.findChildren(BrowserTab))),
+            ("BrowserTab (Python)", count_live(BrowserTab)),
+            ("QWebEnginePage (Python)", count_live(QWebEnginePage)),
+            ("History entries", len(browser._history)),
+        ]
+
+
+class TabSoakTest(QObject):
+    """Opens and closes tabs in a loop and flags a leak when tabs outlive
+    their close (live BrowserTabs exceed open tabs and keep growing)."""
+    progress = pyqtSignal(str)
+    finished = pyqtSignal(bool, str)  # leak detected, report
+
+    def __init__(self, browser, cycles=SOAK_CYCLES, tabs_per_cycle=SOAK_TABS_PER_CYCLE,
+                 url=SOAK_URL, parent=None):
+        super().__init__(parent)
+        self._browser = browser
+        self._cycles = max(1, cycles)
+        self._tabs_per_cycle = max(1, tabs_per_cycle)
+        self._url = url
+        self._cycle = 0
+        self._opened = []
+        self._excess = []
+        self._traced = []
+
+    def start(self):
+        QTimer.singleShot(0, self._open)
+
+    def _open(self):
+        self._cycle += 1
+        for _ in range(self._tabs_per_cycle):
+            self._opened.append(self._browser._add_tab(self._url))
+        QTimer.singleShot(SOAK_SETTLE_MS, self._close)
+
+    def _close(self):
+        for tab in self._opened:
+            idx = self._browser._tabs.indexOf(tab)
+            if idx >= 0:
+                self._browser._close_tab_at(idx)
+        self._opened = []
+        QTimer.singleShot(SOAK_SETTLE_MS, self._measure)
+
+    def _measure(self):
+        QApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+        gc.collect()
+        open_tabs = self._browser._tabs.count()
+        qt_tabs = len(self._browser.findChildren(BrowserTab))
+        py_tabs = count_live(BrowserTab)
+        excess = max(qt_tabs, py_tabs) - open_tabs
+        self._excess.append(excess)
+        msg = f"cycle {self._cycle}/{self._cycles}: {open_tabs} open, {qt_tabs} alive, {excess} leaked"
+        if tracemalloc.is_tracing():
+            self._traced.append(tracemalloc.get_traced_memory()[0])
+            msg += f", traced {format_bytes(self._traced[-1])}"
+        self.progress.emit(msg)
+        if self._cycle < self._cycles:
+            QTimer.singleShot(0, self._open)
+        else:
+            self._finish()
+
+    def _finish(self):
+        first, last = self._excess[0], self._excess[-1]
+        leak = last > 0 and (len(self._excess) == 1 or last > first)
+        lines = [f"Soak test: {self._cycles} cycle(s) of {self._tabs_per_cycle} tab(s)",
+                 f"Tabs alive after close: {first} after cycle 1, {last} at the end"]
+        if len(self._traced) > 1:
+            growth = (self._traced[-1] - self._traced[0]) / (len(self._traced) - 1)
+            lines.append(f"Python heap growth: {format_bytes(growth)} per cycle")
+        lines.append("LEAK: closed tabs are not being freed" if leak else "No tab leak detected")
+        self.finished.emit(leak, "\n".join(lines))
+
+
+# -----------------------------------------------------------------------------
+# Favicon cache (PNG files on disk behind an in-memory LRU)
+# -----------------------------------------------------------------------------
+def favicon_keys(url):
+    """Cache keys for a page URL, most specific first: the page itself, then its host."""
+    qurl = QUrl(url)
+    if not qurl.isValid() or not qurl.host():
+        return []
+    page = qurl.adjusted(QUrl.RemoveFragment).toString()
+    return [f"page:{page}", f"host:{qurl.host().lower()}"]
+
+
+class FaviconCache:
+    """Favicons keyed by page URL and host, so restored tabs, history and
+    bookmarks get icons without a network request. The disk copy is kept
+    under a byte budget by evicting the least recently used files."""
+
+    def __init__(self, root=None, budget=FAVICON_DISK_BUDGET, capacity=FAVICON_MEMORY_ENTRIES):
+        self._root = root or app_data_path("favicons")
+        os.makedirs(self._root, exist_ok=True)
+        self._budget = budget
+        self._capacity = capacity
+        self._lru = OrderedDict()  # key -> QIcon
+        self._digests = {}         # key -> sha1 of the PNG written this session
+        self._disk_bytes = None    # computed on first write
+
+    def _path(self, key):
+        return os.path.join(self._root, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".png")
+
+    def _remember(self, key, icon):
+        self._lru[key] = icon
+        self._lru.move_to_end(key)
+        while len(self._lru) > self._capacity:
+            self._lru.popitem(last=False)
+
+    def _find(self, url):
+        """(key, on-disk path or None) of the first cached key for url."""
+        for key in favicon_keys(url):
+            if key in self._lru:
+                return key, None
+            path = self._path(key)
+            if os.path.exists(path):
+                return key, path
+        return None, None
+
+    def get(self, url):
+        """Cached QIcon for url (page first, then host), or None."""
+        key, path = self._find(url)
+        if key is None:
+            return None
+        if path is None:
+            self._lru.move_to_end(key)
+            return self._lru[key]
+        try:
+            os.utime(path)  # disk LRU order is by mtime
+        except OSError:
+            pass
+        icon = QIcon(path)
+        self._remember(key, icon)
+        return icon
+
+    def has(self, url):
+        return self._find(url)[0] is not None
+
+    def png_bytes(self, url):
+        """PNG data of the cached icon for url, or None (used by ligma:// pages)."""
+        for key in favicon_keys(url):
+            try:
+                with open(self._path(key), "rb") as f:
+                    return f.read()
+            except OSError:
+                continue
+        return None
+
+    def put(self, url, icon):
+        if icon is None or icon.isNull():
+            return
+        keys = favicon_keys(url)
+        if not keys:
+            return
+        buf = QBuffer()
+        buf.open(QIODevice.WriteOnly)
+        icon.pixmap(FAVICON_SIZE, FAVICON_SIZE).save(buf, "PNG")
+        data = bytes(buf.data())
+        digest = hashlib.sha1(data).hexdigest()
+        for key in keys:
+            self._remember(key, icon)
+            if self._digests.get(key) == digest:
+                continue
+            path = self._path(key)
+            try:
+                old_size = os.path.getsize(path) if os.path.exists(path) else 0
+                with open(path, "wb") as f:
+                    f.write(data)
+                self._digests[key] = digest
+                if self._disk_bytes is not None:
+                    self._disk_bytes += len(data) - old_size
+            except OSError:
+                continue
+        self._enforce_budget()
+
+    def _enforce_budget(self):
+        if self._disk_bytes is None:
+            self._disk_bytes = sum(e.stat().st_size for e in os.scandir(self._root) if e.is_file())
+        if self._disk_bytes <= self._budget:
+            return
+        entries = sorted((e.stat().st_mtime, e.stat().st_size, e.path)
+                         for e in os.scandir(self._root) if e.is_file())
+        target = self._budget * 0.9
+        for _, size, path in entries:
+            if self._disk_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self._disk_bytes -= size
+            except OSError:
+                pass
+        self._digests.clear()
+
+
+# -----------------------------------------------------------------------------
+# Profile storage accounting (per-origin usage, budgets, LRU eviction)
+# -----------------------------------------------------------------------------
+STORAGE_KINDS = (("cache", "cache"), ("local_storage", "local storage"), ("indexeddb", "IndexedDB"),
+                 ("cache_storage", "CacheStorage"), ("cookies", "cookies"))
+STORAGE_EVICTABLE = ("local_storage", "indexeddb", "cache_storage", "cookies")
+INDEXEDDB_DIR_RE = re.compile(r"^([a-z][a-z0-9+.-]*)_(.+)_(\d+)\.indexeddb\.(?:leveldb|blob)$")
+LEVELDB_META_RE = re.compile(rb"META:([a-z][a-z0-9+.-]*://[A-Za-z0-9.\-:\[\]_]+)")
+CACHE_STORAGE_ORIGIN_RE = re.compile(rb"([a-z][a-z0-9+.-]*://[A-Za-z0-9.\-:\[\]_]+)")
+SIMPLE_CACHE_NAME_RE = re.compile(r"^[0-9a-f]{16}_[0-9s]$")
+SIMPLE_CACHE_MAGIC = 0xfcfb6d1ba7725c30
+SIMPLE_CACHE_HEADER_BYTES = 24  # magic, version, key length, key hash (padded)
+WINDOWS_EPOCH_OFFSET_S = 11644473600  # base::Time counts microseconds from 1601
+DEFAULT_PORTS = {"http": 80, "https": 443, "ws": 80, "wss": 443}
+STORAGE_CLEARED_TITLE = "ligma-storage-cleared"
+STORAGE_CLEAR_JS = """(function () {
+  var jobs = [];
+  try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}
+  if (window.indexedDB && indexedDB.databases) {
+    jobs.push(indexedDB.databases().then(function (dbs) {
+      return Promise.all(dbs.map(function (db) {
+        return new Promise(function (done) {
+          var req = indexedDB.deleteDatabase(db.name);
+          req.onsuccess = req.onerror = req.onblocked = function () { done(); };
+        });
+      }));
+    }));
+  }
+  if (window.caches) {
+    jobs.push(caches.keys().then(function (keys) {
+      return Promise.all(keys.map(function (k) { return caches.delete(k); }));
+    }));
+  }
+  if (navigator.serviceWorker) {
+    jobs.push(navigator.serviceWorker.getRegistrations().then(function (regs) {
+      return Promise.all(regs.map(function (r) { return r.unregister(); }));
+    }));
+  }
+  Promise.all(jobs.map(function (j) { return j.catch(function () {}); }))
+    .then(function () { document.title = "%s"; });
+})();""" % STORAGE_CLEARED_TITLE
+
+
+def url_origin(text):
+    """'https://Example.com:443/a' -> 'https://example.com'; None without a scheme and host."""
+    try:
+        parts = urlsplit(str(text).strip())
+        host, port = parts.hostname, parts.port
+    except ValueError:
+        return None
+    if not parts.scheme or not host:
+        return None
+    scheme = parts.scheme.lower()
+    if port and DEFAULT_PORTS.get(scheme) != port:
+        host = f"{host}:{port}"
+    return f"{scheme}://{host}"
+
+
+def indexeddb_origin(dirname):
+    """Origin of an IndexedDB directory such as 'https_example.com_0.indexeddb.leveldb'."""
+    m = INDEXEDDB_DIR_RE.match(dirname)
+    if m is None:
+        return None
+    scheme, host, port = m.group(1), m.group(2), int(m.group(3))
+    return url_origin(f"{scheme}://{host}:{port}" if port else f"{scheme}://{host}")
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while pos < len(data) and shift < 64:
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+    raise ValueError("truncated varint")
+
+
+def leveldb_local_storage_meta(data):
+    """{origin: (size_bytes, last_modified)} from the META records of a raw Local Storage
+    LevelDB log or table file. Records inside compressed blocks are not seen."""
+    found = {}
+    now = time.time() + 86400
+    for m in LEVELDB_META_RE.finditer(data):
+        window = data[m.end():m.end() + 32]
+        i = window.find(b"\x08")
+        while i >= 0:
+            # LocalStorageOriginMetaData: 1: last_modified (int64), 2: size_bytes (uint64)
+            try:
+                modified, pos = _read_varint(window, i + 1)
+                if window[pos] == 0x10:
+                    size, _ = _read_varint(window, pos + 1)
+                    modified = modified / 1e6 - WINDOWS_EPOCH_OFFSET_S
+                    if 946684800 < modified < now and size < 1 << 40:
+                        origin = url_origin(m.group(1).decode("ascii"))
+                        if origin and modified >= found.get(origin, (0, 0))[1]:
+                            found[origin] = (size, modified)
+                        break
+            except (ValueError, IndexError):
+                pass
+            i = window.find(b"\x08", i + 1)
+    return found
+
+
+def local_storage_file_meta(path):
+    with open(path, "rb") as f:
+        return leveldb_local_storage_meta(f.read())
+
+
+def simple_cache_key(path):
+    """Key (normally the request URL) stored at the head of an HTTP cache entry file."""
+    with open(path, "rb") as f:
+        header = f.read(SIMPLE_CACHE_HEADER_BYTES)
+        if len(header) < SIMPLE_CACHE_HEADER_BYTES:
+            return None
+        magic, _, key_length, _ = struct.unpack_from("<QIII", header)
+        if magic != SIMPLE_CACHE_MAGIC or key_length > 64 * 1024:
+            return None
+        return f.read(key_length).decode("utf-8", "replace")
+
+
+def cache_key_origin(key):
+    """Origin a cache entry is charged to. Split-cache keys ('1/0/_dk_<site> <site> <url>')
+    name the top-level site first, which is the origin the user visited."""
+    if not key:
+        return None
+    m = re.search(r"[a-z][a-z0-9+.-]*://\S+", key)
+    return url_origin(m.group(0)) if m else None
+
+
+def cache_storage_origin(path):
+    """Origin recorded in a service worker CacheStorage index.txt."""
+    with open(path, "rb") as f:
+        m = CACHE_STORAGE_ORIGIN_RE.search(f.read(64 * 1024))
+    return url_origin(m.group(1).decode("ascii")) if m else None
+
+
+def _scan_files(root):
+    """(path, path parts relative to root, stat) for every regular file under root."""
+    stack = [(root, ())]
+    while stack:
+        folder, rel = stack.pop()
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, rel + (entry.name,)))
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry.path, rel + (entry.name,), entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+
+
+class StorageScanner(QThread):
+    """Walks the profile and HTTP cache directories off the GUI thread and charges bytes to origins.
+
+    Origins come from Chromium's on-disk layout: IndexedDB directory names, the
+    index of each CacheStorage directory, the META records of the Local Storage
+    database and the key at the head of each HTTP cache entry. Parsed results are
+    kept per (size, mtime) and handed back, so a rescan only reads changed files."""
+    progress = pyqtSignal(int)            # files seen so far
+    finished_signal = pyqtSignal(object)  # report dict (see run)
+
+    def __init__(self, profile_path, cache_path, known=None, parent=None):
+        super().__init__(parent)
+        self._roots = [p for p in (profile_path, cache_path) if p]
+        self._cache_root = cache_path
+        if len(self._roots) == 2 and os.path.abspath(cache_path).startswith(
+                os.path.join(os.path.abspath(profile_path), "")):
+            self._roots = self._roots[:1]  # cache inside the profile is walked once
+        self._known = known or {}
+        self._seen = {}
+        self._abort = False
+
+    def abort(self):
+        self._abort = True
+
+    def _parsed(self, path, st, parse):
+        stamp = (st.st_size, st.st_mtime_ns)
+        hit = self._known.get(path)
+        if hit is None or hit[0] != stamp:
+            try:
+                hit = (stamp, parse(path))
+            except (OSError, ValueError, struct.error):
+                hit = (stamp, None)
+        self._seen[path] = hit
+        return hit[1]
+
+    def _classify(self, root, rel, path, st):
+        """(origin or None, kind) for one file."""
+        if SIMPLE_CACHE_NAME_RE.match(rel[-1]):
+            return self._parsed(path, st, lambda p: cache_key_origin(simple_cache_key(p))), "cache"
+        if rel[0] == "IndexedDB" and len(rel) > 2:
+            return indexeddb_origin(rel[1]), "indexeddb"
+        if rel[:2] == ("Service Worker", "CacheStorage") and len(rel) > 3:
+            index = os.path.join(root, *rel[:3], "index.txt")
+            try:
+                return self._parsed(index, os.stat(index), cache_storage_origin), "cache_storage"
+            except OSError:
+                return None, "cache_storage"
+        return None, None
+
+    def run(self):
+        start = time.monotonic()
+        origins = {}
+        total = files = cache_total = 0
+        local_storage = {}
+        for root in self._roots:
+            for path, rel, st in _scan_files(root):
+                if self._abort:
+                    return
+                files += 1
+                total += st.st_size
+                if not files % STORAGE_SCAN_BATCH:
+                    self.progress.emit(files)
+                    self.msleep(STORAGE_SCAN_PAUSE_MS)  # leave the disk to the browser
+                if rel[0] == "Local Storage" and rel[-1].endswith((".log", ".ldb")):
+                    for origin, (size, modified) in (
+                            self._parsed(path, st, local_storage_file_meta) or {}).items():
+                        if modified >= local_storage.get(origin, (0, 0))[1]:
+                            local_storage[origin] = (size, modified)
+                    continue
+                origin, kind = self._classify(root, rel, path, st)
+                if kind == "cache" or root == self._cache_root:
+                    cache_total += st.st_size
+                if origin is None:
+                    continue
+                usage = origins.setdefault(origin, {"modified": 0})
+                usage[kind] = usage.get(kind, 0) + st.st_size
+                usage["modified"] = max(usage["modified"], st.st_mtime)
+        for origin, (size, modified) in local_storage.items():
+            usage = origins.setdefault(origin, {"modified": 0})
+            usage["local_storage"] = size
+            usage["modified"] = max(usage["modified"], modified)
+        attributed = sum(v for u in origins.values() for k, v in u.items() if k != "modified")
+        self.finished_signal.emit({
+            "origins": origins, "total": total, "cache_total": cache_total,
+            "shared": max(0, total - attributed),
+            "files": files, "seconds": time.monotonic() - start, "scanned_at": time.time(),
+            "known": self._seen,
+        })
+
+
+class StorageManager(QObject):
+    """Keeps the profile within per-origin and total disk budgets.
+
+    Usage comes from periodic StorageScanner runs plus the live cookie store.
+    Over budget, origins are cleared least recently used first; origins open in
+    a tab are never touched. Site data is cleared through the web platform
+    itself (a blank page given the origin runs STORAGE_CLEAR_JS), so nothing is
+    deleted underneath a running Chromium. The HTTP cache cannot be cleared per
+    origin and is instead capped with setHttpCacheMaximumSize."""
+    updated = pyqtSignal()
+    scan_progress = pyqtSignal(int)  # files seen by the running scan
+    message = pyqtSignal(str)
+
+    def __init__(self, profile, protected=None, settings=None, parent=None):
+        super().__init__(parent)
+        self._profile = profile
+        self._protected = protected or (lambda: set())
+        self._settings = settings or get_settings()
+        try:
+            raw = json.loads(str(self._settings.value("storage/last_used", "{}")))
+        except ValueError:
+            raw = {}
+        self._last_used = {str(k): float(v) for k, v in raw.items()} if isinstance(raw, dict) else {}
+        self._last_used_dirty = False
+        self.report = None
+        self._known = {}
+        self._scanner = None
+        self._cookies = {}  # (domain, name, path) -> QNetworkCookie
+        self._evicted_at = {}  # origin -> time its data was last cleared
+        self._evict_queue = deque()
+        self._clearing = None  # (page, origin) being cleared
+        self.evicted = deque(maxlen=STORAGE_EVICTIONS_KEPT)  # (time, origin, bytes, reason)
+        self.apply_cache_budget()
+        try:
+            store = profile.cookieStore()
+            store.cookieAdded.connect(self._on_cookie_added)
+            store.cookieRemoved.connect(self._on_cookie_removed)
+            store.loadAllCookies()
+        except Exception:
+            record_swallowed_exception()
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.scan)
+        self._timer.start(STORAGE_SCAN_INTERVAL_MS)
+        QTimer.singleShot(STORAGE_FIRST_SCAN_MS, self.scan)
+
+    # -- budgets ---------------------------------------------------------------
+    def budget(self, name):
+        """Budget in bytes from settings ('origin', 'total' or 'cache'); 0 means unlimited."""
+        default = {"origin": STORAGE_ORIGIN_BUDGET_MB, "total": STORAGE_TOTAL_BUDGET_MB,
+                   "cache": STORAGE_CACHE_BUDGET_MB}[name]
+        return max(0, settings_int(self._settings, f"storage/{name}_budget_mb", default)) * 1024 * 1024
+
+    def set_budget(self, name, megabytes):
+        self._settings.setValue(f"storage/{name}_budget_mb", int(megabytes))
+        if name == "cache":
+            self.apply_cache_budget()
+
+    def apply_cache_budget(self):
+        try:
+            self._profile.setHttpCacheMaximumSize(self.budget("cache"))  # 0: Chromium decides
+        except Exception:
+            record_swallowed_exception()
+
+    # -- usage -----------------------------------------------------------------
+    def touch(self, url):
+        """Record a visit; eviction order is by the latest visit or disk write."""
+        origin = url_origin(url)
+        if origin:
+            self._last_used[origin] = time.time()
+            self._last_used_dirty = True
+
+    def _on_cookie_added(self, cookie):
+        self._cookies[(cookie.domain(), bytes(cookie.name()), cookie.path())] = QNetworkCookie(cookie)
+
+    def _on_cookie_removed(self, cookie):
+        self._cookies.pop((cookie.domain(), bytes(cookie.name()), cookie.path()), None)
+
+    def _cookie_usage(self):
+        """{host: bytes} of the cookies set for each domain."""
+        usage = {}
+        for (domain, name, path), cookie in self._cookies.items():
+            host = domain.lstrip(".").lower()
+            usage[host] = usage.get(host, 0) + len(domain) + len(name) + len(path) + len(cookie.value())
+        return usage
+
+    def usage(self):
+        """[(origin, {kind: bytes}, total, last used)], heaviest first."""
+        origins = {o: dict(u) for o, u in ((self.report or {}).get("origins") or {}).items()}
+        hosts = {}
+        for origin in sorted(origins, key=lambda o: not o.startswith("https:")):
+            hosts.setdefault(urlsplit(origin).hostname, origin)
+        for host, size in self._cookie_usage().items():
+            origin = hosts.get(host) or f"https://{host}"
+            origins.setdefault(origin, {"modified": 0})["cookies"] = size
+        rows = []
+        for origin, kinds in origins.items():
+            last = max(self._last_used.get(origin, 0), kinds.pop("modified", 0))
+            rows.append((origin, kinds, sum(kinds.values()), last))
+        rows.sort(key=lambda r: r[2], reverse=True)
+        return rows
+
+    def total(self):
+        """Bytes on disk at the last scan, profile and HTTP cache together."""
+        return (self.report or {}).get("total", 0)
+
+    # -- scanning --------------------------------------------------------------
+    def scanning(self):
+        return self._scanner is not None
+
+    def scan(self):
+        if self._scanner is not None:
+            return
+        try:
+            profile_path = self._profile.persistentStoragePath()
+            cache_path = self._profile.cachePath()
+        except Exception:
+            record_swallowed_exception()
+            return
+        self._scanner = StorageScanner(profile_path, cache_path, self._known, self)
+        self._scanner.progress.connect(self.scan_progress)
+        self._scanner.finished_signal.connect(self._on_scan_finished)
+        self._scanner.start(QThread.LowestPriority)
+
+    def _on_scan_finished(self, report):
+        scanner, self._scanner = self._scanner, None
+        if scanner is not None:
+            scanner.wait()
+            scanner.deleteLater()
+        self._known = report.pop("known")
+        self.report = report
+        self.save()
+        self.enforce()
+        self.updated.emit()
+
+    def stop(self):
+        self._timer.stop()
+        if self._scanner is not None:
+            self._scanner.abort()
+            self._scanner.wait()
+            self._scanner = None
+        self.save()
+
+    def save(self):
+        if self._last_used_dirty:
+            self._settings.setValue("storage/last_used", json.dumps(self._last_used, sort_keys=True))
+            self._last_used_dirty = False
+
+    # -- eviction --------------------------------------------------------------
+    def enforce(self):
+        """Queue evictions for origins over their budget, then LRU origins until the total fits."""
+        if self.report is None:
+            return []
+        protected = set(self._protected())
+        # Recently cleared origins wait for the next regular scan; Chromium frees space lazily
+        cutoff = time.time() - STORAGE_SCAN_INTERVAL_MS / 1000
+        protected.update(o for o, t in self._evicted_at.items() if t > cutoff)
+        origin_budget, total_budget = self.budget("origin"), self.budget("total")
+        candidates = []
+        evictable = 0
+        for origin, kinds, _, last in self.usage():
+            size = sum(kinds.get(k, 0) for k in STORAGE_EVICTABLE)
+            evictable += size
+            if size and origin not in protected:
+                candidates.append((last, origin, size))
+        evict = []
+        if origin_budget:
+            evict = [(o, size, "over origin budget") for _, o, size in candidates if size > origin_budget]
+        if total_budget:
+            # Only what clearing site data can free counts: the HTTP cache has its own cap,
+            # and unattributed profile files stay whatever is evicted
+            total = evictable - sum(size for _, size, _ in evict)
+            chosen = {o for o, _, _ in evict}
+            for _, origin, size in sorted(candidates):
+                if total <= total_budget:
+                    break
+                if origin not in chosen:
+                    evict.append((origin, size, "least recently used"))
+                    total -= size
+        for origin, size, reason in evict:
+            self.evict(origin, size, reason)
+        return evict
+
+    def evict(self, origin, size=0, reason="cleared by user"):
+        if origin in (o for o, _, _ in self._evict_queue) or (self._clearing and self._clearing[1] == origin):
+            return
+        self._evict_queue.append((origin, size, reason))
+        self._clear_next()
+
+    def _delete_cookies(self, host):
+        store = self._profile.cookieStore()
+        for key, cookie in list(self._cookies.items()):
+            if key[0].lstrip(".").lower() == host:
+                store.deleteCookie(cookie)
+                self._cookies.pop(key, None)
+
+    def _clear_next(self):
+        if self._clearing is not None or not self._evict_queue:
+            return
+        origin, size, reason = self._evict_queue.popleft()
+        self.evicted.append((time.time(), origin, size, reason))
+        self._evicted_at[origin] = time.time()
+        self.message.emit(f"Clearing {format_bytes(size)} of site data for {origin} ({reason})")
+        try:
+            self._delete_cookies(urlsplit(origin).hostname or "")
+        except Exception:
+            record_swallowed_exception()
+        self._last_used.pop(origin, None)
+        self._last_used_dirty = True
+        if urlsplit(origin).scheme not in ("http", "https"):
+            self._clear_next()
+            return
+        page = QWebEnginePage(self._profile, self)
+        self._clearing = (page, origin)
+        page.titleChanged.connect(lambda title: title == STORAGE_CLEARED_TITLE and self._clear_done(page))
+        page.loadFinished.connect(lambda ok: page.runJavaScript(STORAGE_CLEAR_JS))
+        QTimer.singleShot(STORAGE_CLEAR_TIMEOUT_MS, lambda: self._clear_done(page))
+        # A document with the origin as its base URL gets that origin's storage, without a request
+        page.setHtml("<!doctype html><title></title>", QUrl(origin + "/"))
+
+    def _clear_done(self, page):
+        if self._clearing is None or self._clearing[0] is not page:
+            return
+        self._clearing = None
+        page.deleteLater()
+        if self._evict_queue:
+            self._clear_next()
+        else:
+            QTimer.singleShot(STORAGE_RESCAN_DELAY_MS, self.scan)  # let Chromium compact first
+
+
+# -----------------------------------------------------------------------------
+# Internal ligma:// pages (served locally by a URL scheme handler)
+# -----------------------------------------------------------------------------
+INTERNAL_PAGE_CSS = """
+    :root { --bg: #f5f5f7; --fg: #1d1d1f; --card: #ffffff; --muted: #6e6e73; --accent: #007aff; }
+    .dark { --bg: #1c1c1e; --fg: #e5e5ea; --card: #2c2c2e; --muted: #8e8e93; --accent: #0a84ff; }
+    body { margin: 0; background: var(--bg); color: var(--fg);
+           font: 14px -apple-system, "Segoe UI", Helvetica, Arial, sans-serif; }
+    main { max-width: 860px; margin: 0 auto; padding: 24px; }
+    nav a { margin-right: 16px; color: var(--muted); text-decoration: none; }
+    nav a:hover, a { color: var(--accent); }
+    h1 { font-size: 22px; font-weight: 600; }
+    form input { width: 100%; box-sizing: border-box; padding: 12px 16px; font-size: 16px;
+                 border: none; border-radius: 10px; background: var(--card); color: var(--fg); }
+    .sites { display: grid; grid-template-columns: repeat(4, 1fr); gap: 12px; margin: 24px 0; }
+    .site { background: var(--card); border-radius: 12px; padding: 14px; text-decoration: none;
+            overflow: hidden; white-space: nowrap; text-overflow: ellipsis; }
+    .site img { width: 16px; height: 16px; vertical-align: middle; margin-right: 6px; }
+    ul { list-style: none; padding: 0; }
+    li { padding: 6px 0; overflow: hidden; white-space: nowrap; text-overflow: ellipsis; }
+    .muted { color: var(--muted); }
+    pre { background: var(--card); padding: 12px; border-radius: 10px; overflow-x: auto; }
+    table { border-collapse: collapse; width: 100%; margin-bottom: 24px; }
+    th, td { padding: 4px 8px; text-align: right; white-space: nowrap; }
+    th:first-child, td:first-child { text-align: left; }
+"""
+
+INTERNAL_PAGES = (("newtab", "New tab"), ("history", "History"), ("bookmarks", "Bookmarks"),
+                  ("downloads", "Downloads"), ("vitals", "Web Vitals"), ("diagnostics", "Diagnostics"))
+
+
+def render_internal_page(title, body, dark=True):
+    """Full HTML document for an internal page, with the shared nav bar."""
+    nav = "".join(f'<a href="{LIGMA_SCHEME}://{name}">{label}</a>' for name, label in INTERNAL_PAGES)
+    return (f'<!DOCTYPE html><html class="{"dark" if dark else "light"}"><head>'
+            f'<meta charset="utf-8"><title>{html.escape(title)}</title>'
+            f'<style>{INTERNAL_PAGE_CSS}</style></head>'
+            f'<body><main><nav>{nav}</nav>{body}</main></body></html>')
+
+
+def favicon_src(url):
+    """ligma:// URL of the cached favicon for a page."""
+    return f"{LIGMA_SCHEME}://favicon?u={quote_plus(url)}"
+
+
+def link_list(entries, empty="Nothing here yet.", has_icon=None):
+    """<ul> of (title, url) links, or a muted placeholder. Icons for urls where has_icon(url)."""
+    if not entries:
+        return f'<p class="muted">{empty}</p>'
+    items = []
+    for title, url in entries:
+        icon = ""
+        if has_icon is not None and has_icon(url):
+            icon = f'<img src="{html.escape(favicon_src(url), quote=True)}" width="16" height="16"> '
+        items.append(f'<li>{icon}<a href="{html.escape(url, quote=True)}">{html.escape(title or url)}</a>'
+                     f' <span class="muted">{html.escape(url)}</span></li>')
+    return f"<ul>{''.join(items)}</ul>"
+
+
+def top_sites(history, limit=NEWTAB_TOP_SITES):
+    """Most visited hosts as (title, url) of their latest visit."""
+    counts = Counter()
+    latest = {}
+    for title, url in history:
+        host = QUrl(url).host()
+        if host:
+            counts[host] += 1
+            latest[host] = (title, url)
+    return [latest[host] for host, _ in counts.most_common(limit)]
+
+
+class LigmaSchemeHandler(QWebEngineUrlSchemeHandler):
+    """Serves ligma://<page> from browser state; nothing touches the network."""
+
+    def __init__(self, browser):
+        super().__init__(browser)
+        self._browser = browser
+
+    def requestStarted(self, job):
+        url = job.requestUrl()
+        page = url.host() or url.path().strip("/")
+        try:
+            if page == "favicon":
+                data = self._browser._favicons.png_bytes(parse_qs(url.query()).get("u", [""])[0])
+                if data is None:
+                    job.fail(QWebEngineUrlRequestJob.UrlNotFound)
+                    return
+                self._reply(job, b"image/png", data)
+                return
+            if page == "search":
+                query = parse_qs(url.query()).get("q", [""])[0]
+                b = self._browser
+                job.redirect(QUrl(parse_url_input(query, b._home_url, b._search_url_template)))
+                return
+            render = getattr(self, f"_page_{page}", None)
+            if render is None:
+                job.fail(QWebEngineUrlRequestJob.UrlNotFound)
+                return
+            title, body = render()
+            data = render_internal_page(title, body, self._browser._dark_mode).encode("utf-8")
+        except Exception:
+            record_swallowed_exception()
+            job.fail(QWebEngineUrlRequestJob.RequestFailed)
+            return
+        self._reply(job, b"text/html", data)
+
+    def _reply(self, job, content_type, data):
+        buf = QBuffer(job)  # owned by the job, freed with it
+        buf.setData(data)
+        buf.open(QIODevice.ReadOnly)
+        job.reply(content_type, buf)
+
+    def _page_newtab(self):
+        b = self._browser
+        recent = list(reversed(b._history[-NEWTAB_RECENT:]))
+        sites = "".join(
+            f'<a class="site" href="{html.escape(url, quote=True)}" title="{html.escape(url, quote=True)}">'
+            + (f'<img src="{html.escape(favicon_src(url), quote=True)}">' if b._favicons.has(url) else "")
+            + f'{html.escape(title or QUrl(url).host())}</a>'
+            for title, url in top_sites(b._history))
+        body = (f'<h1>New tab</h1><form action="{LIGMA_SCHEME}://search">'
+                f'<input name="q" placeholder="Search or enter URL" autofocus></form>'
+                + (f'<div class="sites">{sites}</div>' if sites else "")
+                + "<h2>Recently visited</h2>" + link_list(recent, "No history yet.", b._favicons.has))
+        return "New tab", body
+
+    def _page_history(self):
+        entries = list(reversed(self._browser._history[-INTERNAL_HISTORY_ROWS:]))
+        return "History", "<h1>History</h1>" + link_list(entries, "No history yet.",
+                                                         self._browser._favicons.has)
+
+    def _page_bookmarks(self):
+        return "Bookmarks", "<h1>Bookmarks</h1>" + link_list(
+            self._browser._bookmarks, "No bookmarks yet.", self._browser._favicons.has)
+
+    def _page_downloads(self):
+        records = self._browser._downloads.records
+        rate, eta = self._browser._downloads.aggregate()
+        rows = "".join(f"<li>{html.escape(r.describe())}"
+                       f' <span class="muted">{html.escape(r.path)}</span></li>' for r in records)
+        body = (f"<h1>Downloads</h1><p class=\"muted\">{len(self._browser._downloads.active())} active"
+                f" — {format_bytes(rate)}/s — ETA {format_eta(eta)}</p>"
+                + (f"<ul>{rows}</ul>" if rows else '<p class="muted">No downloads yet.</p>'))
+        return "Downloads", body
+
+    def _page_vitals(self):
+        rows = self._browser._vitals.summary()
+        if not rows:
+            return "Web Vitals", ('<h1>Web Vitals</h1><p class="muted">No samples yet; they are recorded '
+                                  'as web pages finish loading.</p>')
+        head = "".join(f"<th>{label} p50</th><th>p95</th>" for _, label in VITALS_METRICS)
+        sections = []
+        for site in dict.fromkeys(site for site, _, _, _ in rows):
+            body = "".join(
+                f"<tr><td>{time.strftime('%Y-%m-%d', time.localtime(start))}</td><td>{count}</td>"
+                + "".join(f"<td>{format_vital(key, q)}</td>"
+                          for key, _ in VITALS_METRICS for q in stats.get(key, (None, None)))
+                + "</tr>"
+                for row_site, start, count, stats in reversed(rows) if row_site == site)
+            sections.append(f"<h2>{html.escape(site)}</h2><table><tr><th>Day</th><th>Loads</th>{head}</tr>"
+                            f"{body}</table>")
+        total = len(self._browser._vitals.samples)
+        return "Web Vitals", (f'<h1>Web Vitals</h1><p class="muted">{total:,} page loads, newest day first. '
+                              f'Export to CSV from the ⋮ menu.</p>' + "".join(sections))
+
+    def _page_diagnostics(self):
+        b = self._browser
+        sections = [("Memory", "\n".join(b._memory_report())),
+                    ("New tabs", b._spares.report()),
+                    ("Renderer process model", " ".join(process_model_args()) or "Chromium default")]
+        if b._watchdog is not None:
+            wd = b._watchdog
+            sections.append(("Event loop", f"{wd.count} stall(s), longest {wd.max_ms:.0f} ms, "
+                                           f"last heartbeat latency {wd.latency_ms:.0f} ms"))
+        site_rules = get_site_rules().rules()
+        if site_rules or b._lite_reports:
+            lines = [f"{pattern}: " + ", ".join(f"{f} {'on' if v else 'off'}" for f, v in rule.items())
+                     for pattern, rule in sorted(site_rules.items())]
+            lines += list(b._lite_reports)
+            sections.append(("Site rules", "\n".join(lines)))
+        head, lines = b._storage_lines()
+        evictions = [f"{time.strftime('%H:%M:%S', time.localtime(t))} cleared {origin} "
+                     f"({format_bytes(size)}, {reason})" for t, origin, size, reason in b._storage.evicted]
+        sections.append(("Storage", "\n".join(head + lines + evictions)))
+        if _profiler is not None:
+            sections.append(("Slot timings (ms)", _profiler.format_report()))
+        body = "<h1>Diagnostics</h1>" + "".join(
+            f"<h2>{html.escape(name)}</h2><pre>{html.escape(text)}</pre>" for name, text in sections)
+        return "Diagnostics", body
+
+
+def register_ligma_scheme():
+    """Register ligma:// with Chromium; must run before QApplication is created."""
+    if QWebEngineUrlScheme is None:
+        return
+    scheme = QWebEngineUrlScheme(LIGMA_SCHEME.encode())
+    scheme.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+    # Local: web pages cannot link into internal pages
+    scheme.setFlags(QWebEngineUrlScheme.SecureScheme | QWebEngineUrlScheme.LocalScheme
+                    | QWebEngineUrlScheme.LocalAccessAllowed)
+    QWebEngineUrlScheme.registerScheme(scheme)
+
+
+# -----------------------------------------------------------------------------
+# Performance profiles (PerformanceObserver capture saved as a Chrome trace)
+# -----------------------------------------------------------------------------
+PROFILE_ENTRY_TYPES = ("navigation", "resource", "longtask", "paint", "largest-contentful-paint",
+                       "layout-shift", "event", "first-input", "mark", "measure")
+PROFILE_START_JS = """(function () {
+  if (window.__ligmaProfile) { return false; }
+  var rec = window.__ligmaProfile = {entries: [], frames: [], memory: [], observers: [], running: true,
+                                     start: performance.now()};
+  var supported = PerformanceObserver.supportedEntryTypes || [];
+  %s.forEach(function (type) {
+    if (supported.indexOf(type) < 0) { return; }
+    try {
+      var observer = new PerformanceObserver(function (list) {
+        list.getEntries().forEach(function (e) { rec.entries.push(e.toJSON()); });
+      });
+      var options = {type: type, buffered: true};
+      if (type === "event") { options.durationThreshold = 16; }
+      observer.observe(options);
+      rec.observers.push(observer);
+    } catch (err) {}
+  });
+  var last = performance.now(), lastMemory = 0;
+  function frame(now) {
+    if (!rec.running) { return; }
+    rec.frames.push([last, now - last]);
+    last = now;
+    if (performance.memory && now - lastMemory >= %d) {
+      rec.memory.push([now, performance.memory.usedJSHeapSize, performance.memory.totalJSHeapSize]);
+      lastMemory = now;
+    }
+    requestAnimationFrame(frame);
+  }
+  requestAnimationFrame(frame);
+  return true;
+})();"""
+PROFILE_STOP_JS = """(function () {
+  var rec = window.__ligmaProfile;
+  if (!rec) { return null; }
+  rec.running = false;
+  rec.observers.forEach(function (observer) {
+    observer.takeRecords().forEach(function (e) { rec.entries.push(e.toJSON()); });
+    observer.disconnect();
+  });
+  delete window.__ligmaProfile;
+  return JSON.stringify({timeOrigin: performance.timeOrigin, start: rec.start, end: performance.now(),
+                         url: location.href, entries: rec.entries, frames: rec.frames, memory: rec.memory});
+})();"""
+PROFILE_TIDS = {"page": 1, "network": 2, "frames": 3, "browser": 4}
+
+
+def profile_trace(data, pid, rss_samples=()):
+    """Trace Event Format dict (chrome://tracing, Perfetto, the DevTools Performance panel)
+    from a PROFILE_STOP_JS result; rss_samples are (unix time, bytes) taken by the browser."""
+    origin = data["timeOrigin"]
+
+    def ts(ms):
+        return round((origin + ms) * 1000, 1)  # page milliseconds -> unix microseconds
+
+    events = [{"ph": "M", "name": "process_name", "pid": pid, "tid": 0,
+               "args": {"name": f"Renderer {data.get('url', '')}"}}]
+    events += [{"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": name}}
+               for name, tid in PROFILE_TIDS.items()]
+    for e in data.get("entries", []):
+        kind = e.get("entryType", "")
+        args = {k: v for k, v in e.items() if k not in ("name", "entryType", "startTime", "duration")}
+        tid = PROFILE_TIDS["network"] if kind in ("resource", "navigation") else PROFILE_TIDS["page"]
+        event = {"name": e.get("name") or kind, "cat": kind, "pid": pid, "tid": tid,
+                 "ts": ts(e.get("startTime", 0)), "args": args}
+        if e.get("duration"):
+            event.update(ph="X", dur=round(e["duration"] * 1000, 1))
+        else:
+            event.update(ph="i", s="t")
+        events.append(event)
+    for start, duration in data.get("frames", []):
+        events.append({"name": "Frame", "cat": "frame", "ph": "X", "pid": pid, "tid": PROFILE_TIDS["frames"],
+                       "ts": ts(start), "dur": round(duration * 1000, 1)})
+    for at, used, total in data.get("memory", []):
+        events.append({"name": "JS heap", "cat": "memory", "ph": "C", "pid": pid, "ts": ts(at),
+                       "args": {"used": used, "total": total}})
+    for at, rss in rss_samples:
+        events.append({"name": "Renderer RSS", "cat": "memory", "ph": "C", "pid": pid,
+                       "tid": PROFILE_TIDS["browser"], "ts": round(at * 1e6, 1), "args": {"bytes": rss}})
+    return {"traceEvents": events, "displayTimeUnit": "ms",
+            "metadata": {"url": data.get("url", ""), "recorded_ms": round(data["end"] - data["start"], 1),
+                         "source": "Ligma Browser PerformanceObserver capture"}}
+
+
+class PerformanceRecorder(QObject):
+    """Records one tab for a few seconds and writes the trace to path.
+
+    The observers run in the application's isolated script world, so the page
+    cannot see or disturb them; the entry buffers are read with buffered: true,
+    so the profile also covers the page load that preceded the recording."""
+    finished = pyqtSignal(str, str)  # path, error ("" on success)
+
+    def __init__(self, tab, path, seconds=DEVTOOLS_PROFILE_SECONDS, parent=None):
+        super().__init__(parent)
+        self._tab = tab
+        self.path = path
+        self._seconds = seconds
+        self._rss = []
+        self._sampler = QTimer(self)
+        self._sampler.timeout.connect(self._sample)
+        self._done = False
+
+    def start(self):
+        js = PROFILE_START_JS % (json.dumps(list(PROFILE_ENTRY_TYPES)), DEVTOOLS_SAMPLE_MS)
+        self._tab.page().runJavaScript(js, QWebEngineScript.ApplicationWorld, self._started)
+
+    def _started(self, ok):
+        if not ok:
+            self._finish("A recording is already running in this tab." if ok is False
+                         else "Could not start recording (page not scriptable).")
+            return
+        self._sample()
+        self._sampler.start(DEVTOOLS_SAMPLE_MS)
+        QTimer.singleShot(int(self._seconds * 1000), self.stop)
+
+    def _sample(self):
+        if sip.isdeleted(self._tab):
+            return
+        rss = read_process_rss(renderer_pid(self._tab))
+        if rss is not None:
+            self._rss.append((time.time(), rss))
+
+    def stop(self):
+        self._sampler.stop()
+        if self._done:
+            return
+        if sip.isdeleted(self._tab):
+            self._finish("The tab was closed during recording.")
+            return
+        self._tab.page().runJavaScript(PROFILE_STOP_JS, QWebEngineScript.ApplicationWorld, self._stopped)
+
+    def _stopped(self, text):
+        if not text:
+            self._finish("The page navigated away during recording.")
+            return
+        try:
+            trace = profile_trace(json.loads(text), renderer_pid(self._tab) or os.getpid(), self._rss)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(trace, f)
+            os.replace(tmp, self.path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self._finish(f"Could not save the profile: {e}")
+            return
+        self._finish("")
+
+    def _finish(self, error):
+        if not self._done:
+            self._done = True
+            self._sampler.stop()
+            self.finished.emit(self.path, error)
+
+
+# -----------------------------------------------------------------------------
+# Main window
+# -----------------------------------------------------------------------------
+class LigmaBrowser(QMainWindow):
+    def __init__(self, urls=None):
+        super().__init__()
+        self.setWindowTitle("Ligma Browser")
+        self.setMinimumSize(900, 600)
+        self.resize(1200, 800)
+        self._dark_mode = True
+        self._apply_theme()
+
+        central = QWidget()
+        self.setCentralWidget(central)
+        layout = QVBoxLayout(central)
+        layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(0)
 
         toolbar = QToolBar()
@@ -568,9 +5517,20 @@ class LigmaBrowser(QMainWindow):
         pwd_act.triggered.connect(self._open_password_tester)
         more_menu.addAction(pwd_act)
         more_menu.addSeparator()
+        self._lite_act = QAction("Lite mode for this site", self)
+        self._lite_act.setCheckable(True)
+        self._lite_act.triggered.connect(self._toggle_lite_mode)
+        more_menu.addAction(self._lite_act)
+        more_menu.aboutToShow.connect(self._sync_lite_action)
         view_src_act = QAction("View page source", self)
         view_src_act.triggered.connect(self._view_source)
         more_menu.addAction(view_src_act)
+        devtools_act = QAction("Developer tools", self)
+        devtools_act.triggered.connect(self._toggle_devtools)
+        more_menu.addAction(devtools_act)
+        record_act = QAction("Record performance profile", self)
+        record_act.triggered.connect(lambda: self._record_profile(self._tabs.currentIndex()))
+        more_menu.addAction(record_act)
         print_act = QAction("Print...", self)
         print_act.setShortcut(QKeySequence.Print)
         print_act.triggered.connect(self._print_page)
@@ -578,6 +5538,12 @@ class LigmaBrowser(QMainWindow):
         print_pdf_act = QAction("Save as PDF...", self)
         print_pdf_act.triggered.connect(self._print_to_pdf)
         more_menu.addAction(print_pdf_act)
+        save_offline_act = QAction("Save for offline", self)
+        save_offline_act.triggered.connect(self._save_offline)
+        more_menu.addAction(save_offline_act)
+        offline_pages_act = QAction("Offline pages", self)
+        offline_pages_act.triggered.connect(self._open_offline_pages)
+        more_menu.addAction(offline_pages_act)
         more_menu.addSeparator()
         search_engine_act = QAction("Choose search engine", self)
         search_engine_act.triggered.connect(self._choose_search_engine)
@@ -586,10 +5552,40 @@ class LigmaBrowser(QMainWindow):
         history_act = QAction("History", self)
         history_act.triggered.connect(self._open_history)
         more_menu.addAction(history_act)
+        downloads_act = QAction("Downloads", self)
+        downloads_act.triggered.connect(self._open_downloads)
+        more_menu.addAction(downloads_act)
+        more_menu.addSeparator()
+        memory_act = QAction("Memory", self)
+        memory_act.triggered.connect(self._open_memory)
+        more_menu.addAction(memory_act)
+        storage_act = QAction("Storage", self)
+        storage_act.triggered.connect(self._open_storage)
+        more_menu.addAction(storage_act)
+        vitals_act = QAction("Web Vitals", self)
+        vitals_act.triggered.connect(lambda: self._add_tab(f"{LIGMA_SCHEME}://vitals"))
+        more_menu.addAction(vitals_act)
+        vitals_export_act = QAction("Export Web Vitals...", self)
+        vitals_export_act.triggered.connect(self._export_vitals)
+        more_menu.addAction(vitals_export_act)
+        diagnostics_act = QAction("Diagnostics page", self)
+        diagnostics_act.triggered.connect(lambda: self._add_tab(f"{LIGMA_SCHEME}://diagnostics"))
+        more_menu.addAction(diagnostics_act)
+        memdiag_act = QAction("Memory diagnostics", self)
+        memdiag_act.triggered.connect(self._open_memory_diagnostics)
+        more_menu.addAction(memdiag_act)
+        process_model_act = QAction("Process model", self)
+        process_model_act.triggered.connect(self._choose_process_model)
+        more_menu.addAction(process_model_act)
         more_menu.addSeparator()
         theme_act = QAction("Dark/Light", self)
         theme_act.triggered.connect(self._toggle_theme)
         more_menu.addAction(theme_act)
+        if _profiler is not None:
+            more_menu.addSeparator()
+            timings_act = QAction("Slot timings", self)
+            timings_act.triggered.connect(self._open_slot_timings)
+            more_menu.addAction(timings_act)
 
         more_btn = QToolButton()
         more_btn.setToolTip("More tools")
@@ -646,12 +5642,52 @@ class LigmaBrowser(QMainWindow):
         self._status = QStatusBar()
         self._status.setStyleSheet("padding: 4px; font-size: 12px;")
         self.setStatusBar(self._status)
+        self._stall_label = QLabel("")
+        self._stall_label.setStyleSheet("color: gray; font-size: 12px;")
+        self._status.addPermanentWidget(self._stall_label)
+        self._watchdog = None
+        settings = get_settings()
+        if str(settings.value("watchdog/enabled", "true")).lower() not in ("false", "0"):
+            self._watchdog = StallWatchdog(
+                settings_int(settings, "watchdog/threshold_ms", WATCHDOG_THRESHOLD_MS),
+                app_data_path("logs", "stalls.log"), self)
+            self._watchdog.stall.connect(self._on_stall)
+            self._watchdog.start()
 
         self._bookmarks = []
         self._history = []
-        self._home_url = LIGMA_HOME_URL
+        self._home_url = HOME_URL
         self._search_url_template = GOOGLE_SEARCH_URL
-        self._add_tab()
+        self._favicons = FaviconCache()
+        self._lite_reports = deque(maxlen=LITE_REPORTS_KEPT)
+        self._scheme_handler = LigmaSchemeHandler(self)
+        profile = get_browser_profile()
+        if profile.urlSchemeHandler(LIGMA_SCHEME.encode()) is None:
+            profile.installUrlSchemeHandler(LIGMA_SCHEME.encode(), self._scheme_handler)
+        self._offline_store = OfflineStore()
+        self._archive_writer = ArchiveWriter(self._offline_store, self)
+        self._archive_writer.done.connect(self._on_archive_done)
+        self._archive_writer.failed.connect(self._on_archive_failed)
+        self._archive_writer.start()
+        self._pending_archives = {}
+        self._memdiag = MemoryDiagnostics()
+        self._soak = None
+        self._downloads = DownloadManager(parent=self)
+        self._downloads.message.connect(lambda msg: self._status.showMessage(msg, 4000))
+        self._downloads_dialog = None
+        get_browser_profile().downloadRequested.connect(self._on_download_requested)
+        self._storage = StorageManager(get_browser_profile(), self._open_origins, parent=self)
+        self._storage.message.connect(lambda msg: self._status.showMessage(msg, 4000))
+        self._devtools = None  # dock, built the first time developer tools are opened
+        self._devtools_page = None
+        self._recorders = {}  # tab -> PerformanceRecorder
+        self._vitals = VitalsStore()
+        self._spares = SparePagePool(
+            self._any_tab_loading,
+            str(settings.value("tabs/spare_pool", "true")).lower() not in ("false", "0"), self)
+        # Launch URLs take the place of the initial new tab page
+        for text in urls or [None]:
+            self._add_tab(parse_url_input(text, self._home_url, self._search_url_template) if text else None)
         self._update_url_bar()
         self._setup_shortcuts()
 
@@ -669,22 +5705,35 @@ class LigmaBrowser(QMainWindow):
         return self._tabs.currentWidget()
 
     def _add_tab(self, url=None):
-        tab = BrowserTab(self)
-        url_to_load = url if url else self._home_url
-        if isinstance(url_to_load, str):
-            tab.setUrl(QUrl(url_to_load))
+        # New tabs open the local ligma://newtab page; no network round trip
+        started = time.perf_counter()
+        url = url if isinstance(url, str) and url else LIGMA_NEWTAB_URL
+        tab = self._spares.take()
+        pooled = tab is not None
+        replacing = pooled and tab.is_loading()
+        if pooled:
+            tab.setUrl(QUrl(url))  # also refreshes a spare's new tab page
         else:
-            tab.setUrl(QUrl(self._home_url))
+            tab = BrowserTab(self, url)
+        self._spares.track(tab, pooled, started, replacing)
         idx = self._tabs.addTab(tab, "New tab")
+        icon = self._favicons.get(tab.url().toString())
+        if icon is not None:
+            self._tabs.setTabIcon(idx, icon)
         self._tabs.setCurrentIndex(idx)
         tab.titleChanged.connect(lambda t: self._on_tab_title_changed(tab, t))
         tab.iconChanged.connect(lambda ic: self._on_tab_icon_changed(tab, ic))
         tab.urlChanged.connect(lambda u: self._on_tab_url_changed(tab, u))
         tab.loadStarted.connect(self._on_load_started)
         tab.loadFinished.connect(self._on_load_finished)
+        tab.vitals.connect(self._vitals.add)
         self._update_url_bar()
         return tab
 
+    def _any_tab_loading(self):
+        return any(isinstance(self._tabs.widget(i), BrowserTab) and self._tabs.widget(i).is_loading()
+                   for i in range(self._tabs.count()))
+
     def _on_tab_title_changed(self, tab, title):
         idx = self._tabs.indexOf(tab)
         if idx >= 0:
@@ -694,23 +5743,29 @@ class LigmaBrowser(QMainWindow):
         idx = self._tabs.indexOf(tab)
         if idx >= 0 and not icon.isNull():
             self._tabs.setTabIcon(idx, icon)
+            self._favicons.put(tab.url().toString(), icon)
 
     def _on_tab_url_changed(self, tab, url):
         try:
+            icon = self._favicons.get(url.toString())
+            idx = self._tabs.indexOf(tab)
+            if icon is not None and idx >= 0:
+                self._tabs.setTabIcon(idx, icon)
             if tab == self._current_tab():
                 self._update_url_bar(url)
         except Exception:
-            pass
+            record_swallowed_exception()
 
     def _on_tab_changed(self, index):
         try:
+            self._attach_devtools()
             self._update_url_bar()
             self._update_status()
             if self._find_bar.isVisible():
                 self._connect_find_result()
                 self._find_run_now()
         except Exception:
-            pass
+            record_swallowed_exception()
 
     def _on_load_started(self):
         self._status.showMessage("Loading...")
@@ -725,8 +5780,11 @@ class LigmaBrowser(QMainWindow):
                     if url.isValid() and url.scheme() in ("http", "https"):
                         title = tab.title() or url.toString()
                         self._history.append((title, url.toString()))
+                        self._storage.touch(url.toString())
+                        if len(self._history) > HISTORY_LIMIT:
+                            del self._history[:len(self._history) - HISTORY_LIMIT]
         except Exception:
-            pass
+            record_swallowed_exception()
 
     def _update_status(self):
         try:
@@ -740,7 +5798,7 @@ class LigmaBrowser(QMainWindow):
             else:
                 self._status.clearMessage()
         except Exception:
-            pass
+            record_swallowed_exception()
 
     def _update_url_bar(self, url=None):
         try:
@@ -750,17 +5808,27 @@ class LigmaBrowser(QMainWindow):
                     url = tab.url()
                 else:
                     url = QUrl()
+            text = url.toString() if url.isValid() else ""
+            if text == LIGMA_NEWTAB_URL:
+                text = ""  # leave the bar empty (placeholder shown) on the new tab page
             self._url_edit.blockSignals(True)
-            self._url_edit.setText(url.toString() if url.isValid() else "")
+            self._url_edit.setText(text)
             self._url_edit.blockSignals(False)
         except Exception:
-            pass
+            record_swallowed_exception()
 
     def _close_tab_at(self, index):
         if self._tabs.count() <= MIN_TAB_COUNT:
             self._add_tab()
             return
+        self._remove_tab(index)
+
+    def _remove_tab(self, index):
+        # removeTab() only detaches the page; without deleteLater the view and its renderer live on
+        tab = self._tabs.widget(index)
         self._tabs.removeTab(index)
+        if tab is not None:
+            tab.deleteLater()
 
     def _close_current_tab(self):
         idx = self._tabs.currentIndex()
@@ -782,7 +5850,7 @@ class LigmaBrowser(QMainWindow):
             if tab and isinstance(tab, BrowserTab):
                 tab.findText("", FindWrapsAroundDocument)
         except Exception:
-            pass
+            record_swallowed_exception()
 
     def _connect_find_result(self):
         try:
@@ -797,7 +5865,7 @@ class LigmaBrowser(QMainWindow):
                     pass
                 page.findTextFinished.connect(self._on_find_result)
         except Exception:
-            pass
+            record_swallowed_exception()
 
     def _on_find_result(self, result):
         try:
@@ -811,6 +5879,7 @@ class LigmaBrowser(QMainWindow):
             else:
                 self._find_result_label.setText("")
         except Exception:
+            record_swallowed_exception()
             self._find_result_label.setText("")
 
     def _find_schedule(self):
@@ -822,19 +5891,19 @@ class LigmaBrowser(QMainWindow):
         try:
             self._do_find(self._find_edit.text(), 0)
         except Exception:
-            pass
+            record_swallowed_exception()
 
     def _find_prev(self):
         try:
             self._do_find(self._find_edit.text(), FindBackward)
         except Exception:
-            pass
+            record_swallowed_exception()
 
     def _find_next(self):
         try:
             self._do_find(self._find_edit.text(), 0)
         except Exception:
-            pass
+            record_swallowed_exception()
 
     def _do_find(self, text, options=0):
         try:
@@ -849,6 +5918,7 @@ class LigmaBrowser(QMainWindow):
             if not search_str:
                 self._find_result_label.setText("")
         except Exception:
+            record_swallowed_exception()
             self._find_result_label.setText("")
 
     def _show_tab_context_menu(self, pos):
@@ -865,12 +5935,18 @@ class LigmaBrowser(QMainWindow):
         dup_act.triggered.connect(lambda: self._duplicate_tab_at(idx))
         new_act = menu.addAction("New tab")
         new_act.triggered.connect(self._add_tab)
+        menu.addSeparator()
+        tab = self._tabs.widget(idx)
+        record_act = menu.addAction("Recording performance…" if tab in self._recorders
+                                    else "Record performance profile")
+        record_act.setEnabled(tab not in self._recorders)
+        record_act.triggered.connect(lambda: self._record_profile(idx))
         menu.exec_(self._tabs.mapToGlobal(pos))
 
     def _close_other_tabs(self, keep_index):
         for i in range(self._tabs.count() - 1, -1, -1):
             if i != keep_index:
-                self._tabs.removeTab(i)
+                self._remove_tab(i)
 
     def _duplicate_tab_at(self, index):
         tab = self._tabs.widget(index)
@@ -885,7 +5961,11 @@ class LigmaBrowser(QMainWindow):
         layout = QVBoxLayout(d)
         list_w = QListWidget()
         for title, url in self._bookmarks:
-            list_w.addItem(f"{title} — {url}")
+            item = QListWidgetItem(f"{title} — {url}")
+            icon = self._favicons.get(url)
+            if icon is not None:
+                item.setIcon(icon)
+            list_w.addItem(item)
         layout.addWidget(list_w)
 
         def open_selected():
@@ -913,6 +5993,7 @@ class LigmaBrowser(QMainWindow):
         layout.addLayout(btn_layout)
         list_w.itemDoubleClicked.connect(open_selected)
         d.exec_()
+        d.deleteLater()
 
     def _add_current_bookmark(self):
         tab = self._current_tab()
@@ -930,6 +6011,8 @@ class LigmaBrowser(QMainWindow):
         QShortcut(QKeySequence.ZoomIn, self, self._zoom_in)
         QShortcut(QKeySequence.ZoomOut, self, self._zoom_out)
         QShortcut(QKeySequence("Ctrl+0"), self, self._zoom_reset)
+        QShortcut(QKeySequence("F12"), self, self._toggle_devtools)
+        QShortcut(QKeySequence("Ctrl+Shift+I"), self, self._toggle_devtools)
         esc_shortcut = QShortcut(QKeySequence(Qt.Key_Escape), self)
         esc_shortcut.activated.connect(self._escape_pressed)
 
@@ -968,7 +6051,7 @@ class LigmaBrowser(QMainWindow):
             else:
                 self._add_tab(url_str)
         except Exception:
-            pass
+            record_swallowed_exception()
 
     def _go_back(self):
         tab = self._current_tab()
@@ -989,7 +6072,7 @@ class LigmaBrowser(QMainWindow):
         tab = self._current_tab()
         if tab:
             tab.setUrl(QUrl(self._home_url))
-        self._url_edit.setText(self._home_url)
+        self._url_edit.setText("" if self._home_url == LIGMA_NEWTAB_URL else self._home_url)
 
     def _choose_search_engine(self):
         d = QDialog(self)
@@ -1010,7 +6093,9 @@ class LigmaBrowser(QMainWindow):
         btn_box.accepted.connect(d.accept)
         btn_box.rejected.connect(d.reject)
         layout.addWidget(btn_box)
-        if d.exec_() != QDialog.Accepted:
+        accepted = d.exec_() == QDialog.Accepted
+        d.deleteLater()
+        if not accepted:
             return
         for rb, home_url, search_tpl in self._search_engine_radios:
             if rb.isChecked():
@@ -1028,10 +6113,17 @@ class LigmaBrowser(QMainWindow):
             url = tab.url()
             if not url.isValid():
                 return
-            src_url = "view-source:" + url.toString()
-            self._add_tab(src_url)
+            # The loaded document, not a network re-fetch of view-source:<url>
+            tab.page().toHtml(lambda html, u=url.toString(): self._show_source(u, html))
         except Exception:
-            pass
+            record_swallowed_exception()
+
+    def _show_source(self, url, html):
+        try:
+            viewer = SourceViewerDialog(url, html or "", self._dark_mode, self)
+            viewer.show()
+        except Exception:
+            record_swallowed_exception()
 
     def _print_page(self):
         try:
@@ -1066,20 +6158,280 @@ class LigmaBrowser(QMainWindow):
                 )
                 return
 
-            def on_pdf_ready(data):
+            def on_pdf_ready(data):
+                # Copy out of the QByteArray; the disk write happens on the writer thread
+                self._archive_writer.write_file(
+                    path, data.data() if hasattr(data, "data") else bytes(data))
+
+            page.printToPdf(on_pdf_ready)
+        except Exception as e:
+            QMessageBox.warning(
+                self, "Save as PDF",
+                f"Could not save PDF: {e}"
+            )
+
+    def _save_offline(self):
+        try:
+            tab = self._current_tab()
+            if not tab or not isinstance(tab, BrowserTab):
+                return
+            url = tab.url()
+            if not url.isValid() or url.scheme() not in ("http", "https"):
+                self._status.showMessage("Only web pages can be saved for offline use.", 3000)
+                return
+            path = app_data_path("offline", "incoming", uuid.uuid4().hex + ".mhtml")
+            self._pending_archives[path] = (tab.title() or url.toString(), url.toString())
+            tab.page().save(path, QWebEngineDownloadItem.MimeHtmlSaveFormat)
+            self._status.showMessage("Saving page for offline use...", 2000)
+        except Exception as e:
+            QMessageBox.warning(self, "Save for offline", f"Could not save page: {e}")
+
+    def _on_download_requested(self, item):
+        path = item.path()
+        if path in self._pending_archives:
+            item.accept()
+            item.finished.connect(lambda: self._on_archive_downloaded(item, path))
+        else:
+            self._downloads.handle(item)
+
+    def _on_archive_downloaded(self, item, path):
+        title, url = self._pending_archives.pop(path, ("", ""))
+        if item.state() == QWebEngineDownloadItem.DownloadCompleted:
+            self._archive_writer.archive(path, title, url)
+        else:
+            self._status.showMessage(f"Could not save for offline: {title}", 4000)
+
+    def _on_archive_done(self, kind, message):
+        if kind == "pdf":
+            self._status.showMessage(f"Saved PDF: {message}", 4000)
+        elif kind == "mhtml":
+            self._status.showMessage(f"Saved for offline: {message}", 4000)
+        elif kind == "gc":
+            self._status.showMessage(f"Offline store cleaned up ({message} freed)", 3000)
+
+    def _on_archive_failed(self, kind, error):
+        title = "Save as PDF" if kind == "pdf" else "Offline pages"
+        QMessageBox.warning(self, title, error)
+
+    def _open_offline_pages(self):
+        d = QDialog(self)
+        d.setWindowTitle("Offline pages")
+        d.setMinimumSize(450, 350)
+        layout = QVBoxLayout(d)
+        pages = self._offline_store.list_pages()
+        logical, stored = self._offline_store.usage()
+        layout.addWidget(QLabel(
+            f"{len(pages)} saved page(s) — {format_bytes(logical)} stored in {format_bytes(stored)}"))
+        list_w = QListWidget()
+        for _, title, url, _ in pages:
+            t = (title[:50] + "…") if len(title) > 50 else title
+            list_w.addItem(f"{t} — {url}")
+        layout.addWidget(list_w)
+
+        def open_selected():
+            row = list_w.currentRow()
+            if 0 <= row < len(pages):
+                try:
+                    path = self._offline_store.materialize(pages[row][0])
+                except (OSError, ValueError, KeyError) as e:
+                    QMessageBox.warning(d, "Offline pages", f"Could not open page: {e}")
+                    return
+                tab = self._current_tab()
+                if tab and isinstance(tab, BrowserTab):
+                    tab.setUrl(QUrl.fromLocalFile(path))
+                else:
+                    self._add_tab(QUrl.fromLocalFile(path).toString())
+                d.accept()
+
+        btn_layout = QHBoxLayout()
+        open_btn = QPushButton("Open")
+        open_btn.clicked.connect(open_selected)
+        btn_layout.addWidget(open_btn)
+        remove_btn = QPushButton("Remove")
+        def remove_selected():
+            row = list_w.currentRow()
+            if 0 <= row < len(pages):
+                self._offline_store.remove(pages.pop(row)[0])
+                list_w.takeItem(row)
+                self._archive_writer.collect_garbage()
+        remove_btn.clicked.connect(remove_selected)
+        btn_layout.addWidget(remove_btn)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(d.accept)
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+        list_w.itemDoubleClicked.connect(open_selected)
+        d.exec_()
+        d.deleteLater()
+
+    def _open_downloads(self):
+        if self._downloads_dialog is not None:
+            self._downloads_dialog.show()
+            self._downloads_dialog.raise_()
+            return
+        d = QDialog(self)
+        d.setWindowTitle("Downloads")
+        d.setMinimumSize(520, 340)
+        layout = QVBoxLayout(d)
+        summary = QLabel("")
+        layout.addWidget(summary)
+        list_w = QListWidget()
+        layout.addWidget(list_w)
+        limit_layout = QHBoxLayout()
+        limit_layout.addWidget(QLabel("Simultaneous downloads:"))
+        limit_spin = QSpinBox()
+        limit_spin.setRange(1, 16)
+        limit_spin.setValue(self._downloads.max_concurrent)
+        limit_spin.valueChanged.connect(self._downloads.set_max_concurrent)
+        limit_layout.addWidget(limit_spin)
+        layout.addLayout(limit_layout)
+
+        def refresh():
+            records = self._downloads.records
+            row = list_w.currentRow()
+            while list_w.count() > len(records):
+                list_w.takeItem(list_w.count() - 1)
+            for i, record in enumerate(records):
+                if i < list_w.count():
+                    list_w.item(i).setText(record.describe())
+                else:
+                    list_w.addItem(record.describe())
+            if 0 <= row < list_w.count():
+                list_w.setCurrentRow(row)
+            rate, eta = self._downloads.aggregate()
+            summary.setText(f"{len(self._downloads.active())} active — "
+                            f"{format_bytes(rate)}/s — ETA {format_eta(eta)}")
+
+        def selected():
+            row = list_w.currentRow()
+            records = self._downloads.records
+            return records[row] if 0 <= row < len(records) else None
+
+        def act(fn):
+            record = selected()
+            if record:
+                fn(record)
+                refresh()
+
+        btn_layout = QHBoxLayout()
+        for label, fn in (("Pause", self._downloads.pause), ("Resume", self._downloads.resume),
+                          ("Cancel", self._downloads.cancel)):
+            btn = QPushButton(label)
+            btn.clicked.connect(lambda checked, f=fn: act(f))
+            btn_layout.addWidget(btn)
+        folder_btn = QPushButton("Open folder")
+        folder_btn.clicked.connect(
+            lambda: QDesktopServices.openUrl(QUrl.fromLocalFile(self._downloads.directory())))
+        btn_layout.addWidget(folder_btn)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(d.hide)
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+
+        # Throughput is re-sampled on a timer rather than on every progress signal
+        timer = QTimer(d)
+        timer.timeout.connect(refresh)
+        timer.start(500)
+        refresh()
+        self._downloads_dialog = d
+        d.show()
+
+    def _open_slot_timings(self):
+        if _profiler is None:
+            return
+        d = QDialog(self)
+        d.setWindowTitle("Slot timings (ms)")
+        d.setMinimumSize(760, 420)
+        layout = QVBoxLayout(d)
+        text = QTextEdit()
+        text.setReadOnly(True)
+        text.setFont(QFont("monospace"))
+        text.setLineWrapMode(QTextEdit.NoWrap)
+        text.setPlainText(_profiler.format_report())
+        layout.addWidget(text)
+        btn_layout = QHBoxLayout()
+        export_btn = QPushButton("Export trace...")
+        def export():
+            path, _ = QFileDialog.getSaveFileName(d, "Export trace", "ligma-trace.json", "JSON (*.json)")
+            if path:
                 try:
-                    with open(path, "wb") as f:
-                        f.write(data.data() if hasattr(data, "data") else bytes(data))
-                    self._status.showMessage(f"Saved PDF: {path}", 4000)
-                except Exception as e:
-                    QMessageBox.warning(self, "Save as PDF", str(e))
+                    _profiler.export_trace(path)
+                    self._status.showMessage(f"Trace saved: {path}", 4000)
+                except OSError as e:
+                    QMessageBox.warning(d, "Export trace", str(e))
+        export_btn.clicked.connect(export)
+        btn_layout.addWidget(export_btn)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(d.accept)
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+        d.exec_()
+        d.deleteLater()
 
-            page.printToPdf(on_pdf_ready)
-        except Exception as e:
-            QMessageBox.warning(
-                self, "Save as PDF",
-                f"Could not save PDF: {e}"
-            )
+    def _on_stall(self, duration_ms, top_frame):
+        wd = self._watchdog
+        self._stall_label.setText(f"Stalls: {wd.count} (max {wd.max_ms:.0f} ms)")
+        self._stall_label.setToolTip(f"Last stall: {duration_ms:.0f} ms in {top_frame}\n"
+                                     f"Reports: {app_data_path('logs', 'stalls.log')}")
+
+    def _sync_lite_action(self):
+        tab = self._current_tab()
+        host = tab.url().host() if isinstance(tab, BrowserTab) else ""
+        self._lite_act.setEnabled(bool(host))
+        self._lite_act.setChecked(bool(host) and is_lite_rule(get_site_rules().lookup(host)[1]))
+
+    def _toggle_lite_mode(self):
+        """Flip lite mode for the current host, reload, and report the load-time and memory change."""
+        tab = self._current_tab()
+        if not isinstance(tab, BrowserTab) or not tab.url().host():
+            return
+        host = tab.url().host().lower()
+        rules = get_site_rules()
+        lite = not is_lite_rule(rules.lookup(host)[1])
+        if lite:
+            rules.set(host, LITE_RULE)
+        else:
+            rules.set(host, None)
+            if is_lite_rule(rules.lookup(host)[1]):  # still covered by a parent-domain rule
+                rules.set(host, {f: True for f in SITE_FEATURES})
+        before = (tab.last_load_ms, read_process_rss(renderer_pid(tab)))
+
+        def reloaded(ok):
+            tab.loadFinished.disconnect(reloaded)
+            QTimer.singleShot(LITE_SETTLE_MS, lambda: self._report_lite_change(tab, host, lite, before))
+
+        tab.loadFinished.connect(reloaded)
+        self._status.showMessage(f"{'Lite' if lite else 'Full'} mode for {host}; reloading...")
+        tab.reload()
+
+    def _report_lite_change(self, tab, host, lite, before):
+        if sip.isdeleted(tab):
+            return
+        after = (tab.last_load_ms, read_process_rss(renderer_pid(tab)))
+
+        def ms(v):
+            return f"{v:.0f} ms" if v is not None else "n/a"
+        text = (f"{'Lite' if lite else 'Full'} mode for {host}: load {ms(before[0])} → {ms(after[0])}, "
+                f"renderer {format_bytes(before[1])} → {format_bytes(after[1])}")
+        self._lite_reports.append(text)
+        self._status.showMessage(text, 15000)
+
+    def _open_external_urls(self, urls):
+        """Open URLs passed on a command line (ours or a later launch's) in new tabs."""
+        for text in urls or [""]:
+            self._add_tab(parse_url_input(text, self._home_url, self._search_url_template))
+        if self.isMinimized():
+            self.showNormal()
+        self.raise_()
+        self.activateWindow()
+
+    def closeEvent(self, event):
+        if self._watchdog is not None:
+            self._watchdog.stop()
+        self._archive_writer.stop()
+        self._storage.stop()
+        self._spares.clear()
+        super().closeEvent(event)
 
     def _open_history(self):
         d = QDialog(self)
@@ -1090,7 +6442,11 @@ class LigmaBrowser(QMainWindow):
         for title, url in reversed(self._history[-200:]):
             t = (title[:50] + "…") if len(title) > 50 else title
             u = (url[:60] + "…") if len(url) > 60 else url
-            list_w.addItem(f"{t} — {u}")
+            item = QListWidgetItem(f"{t} — {u}")
+            icon = self._favicons.get(url)
+            if icon is not None:
+                item.setIcon(icon)
+            list_w.addItem(item)
         layout.addWidget(list_w)
 
         def open_selected():
@@ -1119,29 +6475,1320 @@ class LigmaBrowser(QMainWindow):
         layout.addLayout(btn_layout)
         list_w.itemDoubleClicked.connect(open_selected)
         d.exec_()
+        d.deleteLater()
+
+    def _memory_report(self):
+        """Lines for the memory page: browser process, each renderer PID and its tabs."""
+        lines = []
+        own_rss = read_process_rss(os.getpid())
+        lines.append(f"Browser process (pid {os.getpid()}) — {format_bytes(own_rss)}")
+        by_pid = {}
+        for i in range(self._tabs.count()):
+            tab = self._tabs.widget(i)
+            if isinstance(tab, BrowserTab):
+                by_pid.setdefault(renderer_pid(tab), []).append((i, tab))
+        total = own_rss or 0
+        for pid in sorted(by_pid):
+            tabs = by_pid[pid]
+            rss = read_process_rss(pid) if pid else None
+            if pid != os.getpid():  # single-process mode renders in the browser
+                total += rss or 0
+            label = f"pid {pid}" if pid else "no process"
+            lines.append(f"Renderer {label} — {format_bytes(rss)} — {len(tabs)} tab(s)")
+            for i, tab in tabs:
+                title = tab.title() or tab.url().toString() or "New tab"
+                title = (title[:50] + "…") if len(title) > 50 else title
+                share = format_bytes(rss / len(tabs)) if rss else "n/a"
+                lines.append(f"    Tab {i + 1}: {title} — ~{share}")
+        spares = self._spares.tabs()
+        if spares:
+            pids = sorted({renderer_pid(tab) for tab in spares} - set(by_pid) - {0, os.getpid()})
+            rss = sum(read_process_rss(pid) or 0 for pid in pids)
+            total += rss
+            lines.append(f"Spare tabs — {len(spares)}, {len(pids)} own renderer(s) — {format_bytes(rss)}")
+        lines.append(f"Total resident — {format_bytes(total)}")
+        return lines
+
+    def _open_memory(self):
+        d = QDialog(self)
+        d.setWindowTitle("Memory")
+        d.setMinimumSize(520, 360)
+        layout = QVBoxLayout(d)
+        model = str(get_settings().value("process/model", DEFAULT_PROCESS_MODEL))
+        layout.addWidget(QLabel(f"Process model: {model} (resident memory from /proc)"))
+        list_w = QListWidget()
+        layout.addWidget(list_w)
+
+        def refresh():
+            list_w.clear()
+            for line in self._memory_report():
+                list_w.addItem(line)
+
+        btn_layout = QHBoxLayout()
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.clicked.connect(refresh)
+        btn_layout.addWidget(refresh_btn)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(d.accept)
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+        refresh()
+        d.exec_()
+        d.deleteLater()
+
+    def _toggle_devtools(self):
+        if self._devtools is None:
+            dock = QDockWidget("Developer tools", self)
+            dock.setObjectName("devtools")
+            body = QWidget()
+            body_layout = QVBoxLayout(body)
+            body_layout.setContentsMargins(0, 0, 0, 0)
+            body_layout.setSpacing(0)
+            bar = QHBoxLayout()
+            bar.setContentsMargins(6, 4, 6, 4)
+            record_btn = QPushButton("Record performance profile")
+            record_btn.clicked.connect(lambda: self._record_profile(self._tabs.currentIndex()))
+            bar.addWidget(record_btn)
+            bar.addStretch(1)
+            body_layout.addLayout(bar)
+            view = QWebEngineView()
+            self._devtools_page = QWebEnginePage(get_browser_profile(), view)
+            view.setPage(self._devtools_page)
+            body_layout.addWidget(view)
+            dock.setWidget(body)
+            settings = get_settings()
+            self.addDockWidget(Qt.BottomDockWidgetArea, dock)
+            dock.setFloating(str(settings.value("devtools/floating", "false")).lower() == "true")
+            dock.topLevelChanged.connect(lambda floating: get_settings().setValue("devtools/floating", floating))
+            dock.visibilityChanged.connect(lambda visible: self._attach_devtools())
+            self._devtools = dock
+            dock.show()
+        else:
+            self._devtools.setVisible(not self._devtools.isVisible())
+        self._attach_devtools()
+
+    def _attach_devtools(self):
+        """Point the developer tools at the current tab; detach while hidden so no page pays for them."""
+        if self._devtools is None:
+            return
+        tab = self._current_tab()
+        page = tab.page() if self._devtools.isVisible() and isinstance(tab, BrowserTab) else None
+        if self._devtools_page.inspectedPage() is not page:
+            self._devtools_page.setInspectedPage(page)
+
+    def _record_profile(self, index):
+        tab = self._tabs.widget(index)
+        if not isinstance(tab, BrowserTab) or tab in self._recorders:
+            return
+        host = re.sub(r"[^A-Za-z0-9.-]+", "_", tab.url().host() or tab.url().scheme() or "page")
+        path = app_data_path("profiles", f"{host}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        recorder = PerformanceRecorder(tab, path, parent=self)
+        self._recorders[tab] = recorder
+        recorder.finished.connect(lambda path, error: self._on_profile_recorded(tab, path, error))
+        self._status.showMessage(f"Recording performance profile for {DEVTOOLS_PROFILE_SECONDS} s…")
+        recorder.start()
+
+    def _on_profile_recorded(self, tab, path, error):
+        recorder = self._recorders.pop(tab, None)
+        if recorder is not None:
+            recorder.deleteLater()
+        if error:
+            self._status.showMessage(f"Performance profile failed: {error}", 6000)
+        else:
+            self._status.showMessage(f"Performance profile saved to {path} "
+                                     f"(open it in the Performance panel or chrome://tracing)", 8000)
+
+    def _open_origins(self):
+        """Origins shown in a tab; their site data is never evicted."""
+        origins = set()
+        for i in range(self._tabs.count()):
+            tab = self._tabs.widget(i)
+            if isinstance(tab, BrowserTab):
+                origin = url_origin(tab.url().toString())
+                if origin:
+                    origins.add(origin)
+        return origins
+
+    def _storage_lines(self, limit=STORAGE_TOP_ORIGINS):
+        """Summary line plus one line per origin, heaviest first, for the storage views."""
+        s = self._storage
+        report = s.report
+        if report is None:
+            return ["Not scanned yet."], []
+        rows = s.usage()[:limit]
+        budgets = ", ".join(f"{name} {format_bytes(s.budget(name)) if s.budget(name) else 'unlimited'}"
+                            for name in ("origin", "total", "cache"))
+        head = [f"Profile {format_bytes(report['total'])} (HTTP cache {format_bytes(report['cache_total'])}, "
+                f"unattributed {format_bytes(report['shared'])}) — {report['files']} files "
+                f"scanned in {report['seconds']:.1f} s at "
+                f"{time.strftime('%H:%M:%S', time.localtime(report['scanned_at']))}",
+                f"Budgets: {budgets}"]
+        lines = []
+        for origin, kinds, total, last in rows:
+            parts = ", ".join(f"{label} {format_bytes(kinds[k])}" for k, label in STORAGE_KINDS if kinds.get(k))
+            used = time.strftime("%Y-%m-%d %H:%M", time.localtime(last)) if last else "never"
+            lines.append(f"{origin} — {format_bytes(total)} ({parts}) — last used {used}")
+        return head, lines
+
+    def _export_vitals(self):
+        if not self._vitals.samples:
+            QMessageBox.information(self, "Web Vitals", "No page loads recorded yet.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export Web Vitals", "ligma-web-vitals.csv", "CSV (*.csv)")
+        if not path:
+            return
+        try:
+            rows = self._vitals.export_csv(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Web Vitals", str(e))
+            return
+        self._status.showMessage(f"Exported {rows} site-day row(s) to {path}", 4000)
+
+    def _open_storage(self):
+        s = self._storage
+        d = QDialog(self)
+        d.setWindowTitle("Storage")
+        d.setMinimumSize(680, 420)
+        layout = QVBoxLayout(d)
+        summary = QLabel("")
+        summary.setWordWrap(True)
+        layout.addWidget(summary)
+        list_w = QListWidget()
+        layout.addWidget(list_w)
+        shown = []
+
+        def refresh():
+            head, lines = self._storage_lines()
+            if s.scanning():
+                head = head + ["Scanning…"]
+            summary.setText("\n".join(head))
+            list_w.clear()
+            shown[:] = [origin for origin, _, _, _ in s.usage()[:STORAGE_TOP_ORIGINS]]
+            for line in lines:
+                list_w.addItem(line)
+
+        budget_layout = QHBoxLayout()
+        for name, label in (("origin", "Per site (MB):"), ("total", "All sites (MB):"),
+                            ("cache", "HTTP cache (MB):")):
+            budget_layout.addWidget(QLabel(label))
+            spin = QSpinBox()
+            spin.setRange(0, 1024 * 1024)
+            spin.setSpecialValueText("unlimited")
+            spin.setValue(s.budget(name) // (1024 * 1024))
+            spin.valueChanged.connect(lambda v, n=name: s.set_budget(n, v))
+            budget_layout.addWidget(spin)
+        layout.addLayout(budget_layout)
+
+        def clear_selected():
+            row = list_w.currentRow()
+            if not 0 <= row < len(shown):
+                return
+            origin = shown[row]
+            if origin in self._open_origins():
+                QMessageBox.information(d, "Storage", f"Close the tabs showing {origin} first.")
+                return
+            size = sum(kinds.get(k, 0) for o, kinds, _, _ in s.usage() if o == origin
+                       for k in STORAGE_EVICTABLE)
+            s.evict(origin, size)
+
+        def enforce():
+            evicted = s.enforce()
+            self._status.showMessage(f"{len(evicted)} site(s) over budget cleared" if evicted
+                                     else "All sites are within budget", 4000)
+
+        btn_layout = QHBoxLayout()
+        scan_btn = QPushButton("Scan now")
+        scan_btn.clicked.connect(lambda: (s.scan(), refresh()))
+        btn_layout.addWidget(scan_btn)
+        clear_btn = QPushButton("Clear site data")
+        clear_btn.clicked.connect(clear_selected)
+        btn_layout.addWidget(clear_btn)
+        enforce_btn = QPushButton("Apply budgets")
+        enforce_btn.clicked.connect(enforce)
+        btn_layout.addWidget(enforce_btn)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(d.accept)
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+        s.updated.connect(refresh)
+        progress = lambda n: summary.setText(f"Scanning… {n} files")
+        s.scan_progress.connect(progress)
+        refresh()
+        d.exec_()
+        s.updated.disconnect(refresh)
+        s.scan_progress.disconnect(progress)
+        d.deleteLater()
+
+    def _open_memory_diagnostics(self):
+        d = QDialog(self)
+        d.setWindowTitle("Memory diagnostics")
+        d.setMinimumSize(680, 460)
+        layout = QVBoxLayout(d)
+        output = QTextEdit()
+        output.setReadOnly(True)
+        output.setFont(QFont("monospace"))
+        output.setLineWrapMode(QTextEdit.NoWrap)
+        layout.addWidget(output)
+
+        def show(text):
+            output.append(text)
+            output.append("")
+
+        btn_layout = QHBoxLayout()
+        trace_btn = QPushButton("Stop tracing" if self._memdiag.tracing else "Start tracing")
+        def toggle_tracing():
+            if self._memdiag.tracing:
+                self._memdiag.stop()
+                trace_btn.setText("Start tracing")
+                show("tracemalloc stopped")
+            else:
+                self._memdiag.start()
+                trace_btn.setText("Stop tracing")
+                show("tracemalloc started; take snapshots to compare")
+        trace_btn.clicked.connect(toggle_tracing)
+        btn_layout.addWidget(trace_btn)
+        snap_btn = QPushButton("Snapshot && diff")
+        snap_btn.clicked.connect(lambda: show(self._memdiag.snapshot_diff()))
+        btn_layout.addWidget(snap_btn)
+        count_btn = QPushButton("Count objects")
+        count_btn.clicked.connect(lambda: show("\n".join(
+            f"{name:<28} {n}" for name, n in self._memdiag.object_counts(self))))
+        btn_layout.addWidget(count_btn)
+        soak_btn = QPushButton("Soak test")
+        def run_soak():
+            soak_btn.setEnabled(False)
+            self._run_soak_test(SOAK_CYCLES, SOAK_URL, show,
+                                lambda leak, report: (show(report), soak_btn.setEnabled(True)))
+        soak_btn.clicked.connect(run_soak)
+        btn_layout.addWidget(soak_btn)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(d.accept)
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+        d.exec_()
+        d.deleteLater()
+
+    def _run_soak_test(self, cycles, url, on_progress, on_finished):
+        if self._soak is not None:
+            return
+        self._soak = TabSoakTest(self, cycles, SOAK_TABS_PER_CYCLE, url, self)
+        self._soak.progress.connect(on_progress)
+
+        def done(leak, report):
+            self._soak.deleteLater()
+            self._soak = None
+            self._status.showMessage("Soak test: LEAK detected" if leak else "Soak test passed", 5000)
+            on_finished(leak, report)
+
+        self._soak.finished.connect(done)
+        self._soak.start()
+
+    def _choose_process_model(self):
+        settings = get_settings()
+        current = str(settings.value("process/model", DEFAULT_PROCESS_MODEL))
+        d = QDialog(self)
+        d.setWindowTitle("Process model")
+        d.setMinimumWidth(360)
+        layout = QVBoxLayout(d)
+        layout.addWidget(QLabel("Renderer process model (applies after restart):"))
+        group = QButtonGroup(d)
+        radios = []
+        for name, model in PROCESS_MODELS:
+            rb = QRadioButton(name)
+            rb.setChecked(model == current)
+            group.addButton(rb)
+            layout.addWidget(rb)
+            radios.append((rb, model))
+        layout.addWidget(QLabel("Renderer process limit (0 = no limit):"))
+        limit_spin = QSpinBox()
+        limit_spin.setRange(0, 256)
+        limit_spin.setValue(settings_int(settings, "process/renderer_limit", 0))
+        layout.addWidget(limit_spin)
+        btn_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        btn_box.accepted.connect(d.accept)
+        btn_box.rejected.connect(d.reject)
+        layout.addWidget(btn_box)
+        accepted = d.exec_() == QDialog.Accepted
+        d.deleteLater()
+        if not accepted:
+            return
+        for rb, model in radios:
+            if rb.isChecked():
+                settings.setValue("process/model", model)
+                break
+        settings.setValue("process/renderer_limit", limit_spin.value())
+        self._status.showMessage("Process model saved; restart the browser to apply it.", 4000)
 
     def _open_calculator(self):
         d = CalculatorDialog(self)
         d.exec_()
+        d.deleteLater()
 
     def _open_password_tester(self):
         d = PasswordTesterDialog(self)
         d.exec_()
+        d.deleteLater()
+
+
+# -----------------------------------------------------------------------------
+# Performance regression suite (--perf-suite; offscreen, local fixture server)
+# -----------------------------------------------------------------------------
+FIXTURE_PATTERN = bytes(range(251)) * (DOWNLOAD_FIXTURE_CHUNK // 251 + 2)
+
+
+def fixture_bytes(offset, length):
+    """Bytes [offset, offset + length) of every /file/ fixture; length <= DOWNLOAD_FIXTURE_CHUNK."""
+    start = offset % 251
+    return FIXTURE_PATTERN[start:start + length]
+
+
+class _FixtureHandler(http.server.BaseHTTPRequestHandler):
+    """/page/<n>?kb=&latency_ms= : a deterministic HTML page of roughly kb KiB.
+    /file/<name>?mb=&kbps=&drop_at= : a throttled attachment (see _send_file)."""
+
+    def do_GET(self):
+        url = QUrl(self.path)
+        query = parse_qs(url.query())
+        server = self.server
+        latency = float(query.get("latency_ms", [server.latency_ms])[0])
+        kb = int(query.get("kb", [server.page_kb])[0])
+        name = url.path().rsplit("/", 1)[-1] or "index"
+        time.sleep(latency / 1000)
+        if url.path().startswith("/file/"):
+            self._send_file(name, query)
+            return
+        if url.path().startswith("/site/"):
+            body = self._site_page(name, int(query.get("pages", [CRAWL_FIXTURE_PAGES])[0])).encode("utf-8")
+        else:
+            para = (f"<p>Fixture page {name}. The needle appears once per paragraph; "
+                    "the rest is filler text for layout and find-in-page. </p>\n")
+            body = (f"<!DOCTYPE html><html><head><title>Fixture {name}</title></head><body>"
+                    + para * max(1, kb * 1024 // len(para)) + "</body></html>").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, name, query):
+        """Attachment of mb MiB sent at kbps KiB/s, with ETag and Range/If-Range support
+        so downloads can resume; the first full response for a name is cut off after
+        drop_at bytes."""
+        size = int(float(query.get("mb", [DOWNLOAD_FIXTURE_MB])[0]) * 1024 * 1024)
+        kbps = float(query.get("kbps", [0])[0])
+        drop_at = int(query.get("drop_at", [0])[0])
+        etag = f'"{name}-{size}"'
+        start, end = 0, size
+        m = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range") or "")
+        if m and self.headers.get("If-Range", etag) == etag:
+            start = int(m.group(1))
+            end = min(size, int(m.group(2)) + 1) if m.group(2) else size
+            if start >= end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Disposition", f'attachment; filename="{name}.bin"')
+        self.send_header("Content-Length", str(end - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", "Mon, 01 Jan 2024 00:00:00 GMT")
+        self.end_headers()
+        cut = end
+        if drop_at and start == 0 and name not in self.server.dropped:
+            self.server.dropped.add(name)
+            cut = min(drop_at, end)
+        sent, began = start, time.monotonic()
+        try:
+            while sent < cut:
+                n = min(DOWNLOAD_FIXTURE_CHUNK, cut - sent)
+                self.wfile.write(fixture_bytes(sent, n))
+                sent += n
+                if kbps > 0:
+                    ahead = (sent - start) / (kbps * 1024) - (time.monotonic() - began)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            return  # client paused or cancelled
+        self.close_connection = True  # a cut response ends short of Content-Length
+
+    @staticmethod
+    def _site_page(name, pages):
+        """/site/<n> of a generated site: one static link, the rest added by script,
+        plus duplicate spellings (fragment, ./ segment) that must normalize away."""
+        n = int(name) if name.isdigit() else 0
+        targets = [(n * 7 + k) % pages for k in range(1, 5)]
+        q = f"?pages={pages}"
+        return (f'<!DOCTYPE html><html lang="en"><head><title>Site page {n}</title>'
+                f'<meta name="description" content="Generated page {n} of {pages}"></head><body>'
+                f'<p>Page {n} body text.</p><a href="{targets[0]}{q}">next</a>'
+                f'<a href="./{targets[0]}{q}#top">same, other spelling</a>'
+                f'<script>[{",".join(map(str, targets[1:]))}].forEach(function (t) {{'
+                f' var a = document.createElement("a"); a.href = t + "{q}"; a.textContent = "page " + t;'
+                f' document.body.appendChild(a); }});</script></body></html>')
+
+    def log_message(self, *args):
+        pass
+
+
+class PerfFixtureServer:
+    """Threaded HTTP server on 127.0.0.1 with configurable latency and page size."""
+
+    def __init__(self, latency_ms=PERF_LATENCY_MS, page_kb=PERF_PAGE_KB):
+        self._httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _FixtureHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.latency_ms = latency_ms
+        self._httpd.page_kb = page_kb
+        self._httpd.dropped = set()  # /file/ names whose first response was already cut off
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="perf-fixture", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def url(self, n):
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}/page/{n}"
+
+    def site_url(self, pages, n=0):
+        """Page n of the generated crawlable site with the given number of pages."""
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}/site/{n}?pages={pages}"
+
+    def file_url(self, name, mb, kbps=0, drop_at=0):
+        """Attachment download; drop_at > 0 interrupts its first transfer after that many bytes."""
+        return (f"http://127.0.0.1:{self._httpd.server_address[1]}/file/{name}"
+                f"?mb={mb}&kbps={kbps}&drop_at={drop_at}")
+
+
+def browser_resident_bytes(browser):
+    """Browser process RSS plus every distinct renderer process behind its tabs."""
+    total = read_process_rss(os.getpid()) or 0
+    pids = {renderer_pid(browser._tabs.widget(i)) for i in range(browser._tabs.count())
+            if isinstance(browser._tabs.widget(i), BrowserTab)}
+    for pid in pids - {None, 0, os.getpid()}:
+        total += read_process_rss(pid) or 0
+    return total
+
+
+class PerfSuite:
+    """Scripted browser scenarios; each records latency and resident-memory change."""
+
+    def __init__(self, browser, server, tabs=PERF_TABS):
+        self._browser = browser
+        self._server = server
+        self._tabs = tabs
+        self.results = {}
+
+    def _spin_until(self, done, timeout_s=PERF_LOAD_TIMEOUT_S):
+        deadline = time.monotonic() + timeout_s
+        while not done():
+            if time.monotonic() > deadline:
+                return False
+            QApplication.processEvents(QEventLoop.AllEvents, 10)
+        return True
+
+    def _measure(self, name, fn):
+        QApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+        gc.collect()
+        rss_before = browser_resident_bytes(self._browser)
+        start = time.perf_counter()
+        samples, ok = fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        QApplication.processEvents()
+        entry = {"latency_ms": round(elapsed, 1),
+                 "memory_delta": browser_resident_bytes(self._browser) - rss_before,
+                 "ok": bool(ok)}
+        if samples:
+            entry["p50_ms"] = round(percentile(samples, 50), 2)
+            entry["p95_ms"] = round(percentile(samples, 95), 2)
+        self.results[name] = entry
+        return entry
+
+    def _open_tabs(self):
+        b = self._browser
+        pending = set()
+        for n in range(self._tabs):
+            tab = b._add_tab(self._server.url(n))
+            pending.add(tab)
+            tab.loadFinished.connect(lambda ok, t=tab: pending.discard(t))
+        return None, self._spin_until(lambda: not pending)
+
+    def _new_tabs(self, pooled):
+        """Ctrl+T until the new tab page has loaded, with or without a spare waiting."""
+        b = self._browser
+        pool = b._spares
+        was_enabled = pool.enabled
+        pool.set_enabled(pooled)
+        samples = []
+        ok = True
+        for _ in range(PERF_NEW_TABS):
+            if pooled:
+                ok = self._spin_until(lambda: pool.ready(), 10) and ok
+            loaded = []
+            start = time.perf_counter()
+            tab = b._add_tab()
+            tab.loadFinished.connect(lambda ok, l=loaded: l.append(ok))
+            ok = self._spin_until(lambda: loaded) and ok
+            samples.append((time.perf_counter() - start) * 1000)
+            b._remove_tab(b._tabs.indexOf(tab))
+        pool.set_enabled(was_enabled)
+        return samples, ok
+
+    def _address_bar(self):
+        b = self._browser
+        samples = []
+        ok = True
+        for n in range(10):
+            tab = b._current_tab()
+            loaded = []
+            tab.loadFinished.connect(lambda ok, l=loaded: l.append(ok))
+            start = time.perf_counter()
+            b._url_edit.setText(self._server.url(f"nav{n}"))
+            b._navigate_from_bar()
+            ok = self._spin_until(lambda: loaded) and ok
+            samples.append((time.perf_counter() - start) * 1000)
+        return samples, ok
+
+    def _switch_tabs(self):
+        b = self._browser
+        samples = []
+        for _ in range(3):
+            for i in range(b._tabs.count()):
+                start = time.perf_counter()
+                b._tabs.setCurrentIndex(i)
+                QApplication.processEvents()
+                samples.append((time.perf_counter() - start) * 1000)
+        return samples, True
+
+    def _find_in_page(self):
+        b = self._browser
+        tab = b._current_tab()
+        signal = getattr(tab.page(), "findTextFinished", None)
+        samples = []
+        ok = True
+        b._show_find_bar()
+        for term in ("needle", "filler", "Fixture page", "absent-term"):
+            found = []
+
+            def on_found(result, found=found):
+                found.append(result)
+            if signal is not None:
+                signal.connect(on_found)
+            start = time.perf_counter()
+            b._find_edit.setText(term)
+            b._find_run_now()
+            if signal is not None:
+                ok = self._spin_until(lambda: found, 10) and ok
+                signal.disconnect(on_found)  # leave the browser's own result handler connected
+            samples.append((time.perf_counter() - start) * 1000)
+        b._hide_find_bar()
+        return samples, ok
+
+    def _toggle_theme(self):
+        b = self._browser
+        samples = []
+        for _ in range(10):
+            start = time.perf_counter()
+            b._toggle_theme()
+            QApplication.processEvents()
+            samples.append((time.perf_counter() - start) * 1000)
+        return samples, True
+
+    def _time_modal(self, open_dialog):
+        """Time until a modal dialog is up and its event loop runs, then close it."""
+        shown = []
+
+        def close_modal():
+            shown.append(time.perf_counter())
+            dialog = QApplication.activeModalWidget()
+            if dialog is not None:
+                dialog.reject()
+
+        start = time.perf_counter()
+        QTimer.singleShot(0, close_modal)
+        open_dialog()
+        return [(shown[0] - start) * 1000] if shown else [], bool(shown)
+
+    def _fill_history(self):
+        b = self._browser
+        if len(b._history) < PERF_HISTORY_ENTRIES:
+            b._history.extend((f"Fixture {n}", self._server.url(f"h{n}"))
+                              for n in range(PERF_HISTORY_ENTRIES))
+
+    def _history(self):
+        """The history dialog; it lists only the newest 200 entries, whatever the history size."""
+        self._fill_history()
+        return self._time_modal(self._browser._open_history)
+
+    def _new_tab_page_history(self):
+        """ligma://newtab, whose top sites are counted over the whole history, until loaded."""
+        self._fill_history()
+        tab = self._browser._current_tab()
+        loaded = []
+        on_load = loaded.append
+        tab.loadFinished.connect(on_load)
+        samples = []
+        ok = True
+        for _ in range(PERF_NEW_TABS):
+            loaded.clear()
+            start = time.perf_counter()
+            tab.setUrl(QUrl(LIGMA_NEWTAB_URL))
+            ok = self._spin_until(lambda: loaded) and ok
+            samples.append((time.perf_counter() - start) * 1000)
+        tab.loadFinished.disconnect(on_load)
+        return samples, ok
+
+    def _bookmarks(self):
+        b = self._browser
+        b._bookmarks.extend((f"Bookmark {n}", self._server.url(f"b{n}")) for n in range(PERF_BOOKMARKS))
+        return self._time_modal(b._open_bookmarks)
+
+    def run(self, report=None):
+        report = report or (lambda msg: None)
+        for name, fn in (("open_tabs", self._open_tabs),
+                         ("new_tab_cold", lambda: self._new_tabs(False)),
+                         ("new_tab_pooled", lambda: self._new_tabs(True)),
+                         ("address_bar_navigation", self._address_bar),
+                         ("switch_tabs", self._switch_tabs), ("find_in_page", self._find_in_page),
+                         ("toggle_theme", self._toggle_theme), ("open_history", self._history),
+                         ("new_tab_page_history", self._new_tab_page_history),
+                         ("open_bookmarks", self._bookmarks)):
+            entry = self._measure(name, fn)
+            p95 = f"{entry['p95_ms']:8.2f} ms" if "p95_ms" in entry else "       -   "
+            report(f"{name:24s} {entry['latency_ms']:9.1f} ms  p95 {p95}  "
+                   f"mem {format_bytes(entry['memory_delta']):>10s}{'' if entry['ok'] else '  (timed out)'}")
+        return self.results
+
+
+def perf_baseline_path():
+    """PERF_BASELINE next to this script, so the suite finds it from any working directory."""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), PERF_BASELINE)
+
+
+def compare_perf(results, baseline):
+    """Regression messages for results measured against a baseline dict."""
+    problems = []
+    for name, base in baseline.items():
+        cur = results.get(name)
+        if cur is None:
+            continue
+        if not cur.get("ok", True):
+            problems.append(f"{name}: timed out")
+        for key in ("latency_ms", "p95_ms"):
+            if key in base and key in cur:
+                limit = base[key] * (1 + PERF_LATENCY_TOLERANCE)
+                if cur[key] > limit and cur[key] - base[key] > PERF_LATENCY_FLOOR_MS:
+                    problems.append(f"{name}: {key} {cur[key]:.1f} > baseline {base[key]:.1f}")
+        limit = max(base["memory_delta"], 0) * (1 + PERF_MEMORY_TOLERANCE) + PERF_MEMORY_FLOOR
+        if cur["memory_delta"] > limit:
+            problems.append(f"{name}: memory {format_bytes(cur['memory_delta'])} > baseline "
+                            f"{format_bytes(base['memory_delta'])}")
+    return problems
+
+
+def run_perf_suite(args, qt_argv):
+    """--perf-suite: run the scenarios offscreen; exit 1 on a regression against the baseline."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication(qt_argv + process_model_args())
+    app.setApplicationName("Ligma Browser Perf")  # keeps favicons and app data out of the real profile
+    server = PerfFixtureServer(args.perf_latency, args.perf_page_kb).start()
+    window = LigmaBrowser()
+    window.show()
+    try:
+        results = PerfSuite(window, server, args.perf_tabs).run(lambda msg: print(msg, file=sys.stderr))
+    finally:
+        window.close()
+        server.stop()
+    fixture = {"tabs": args.perf_tabs, "latency_ms": args.perf_latency, "page_kb": args.perf_page_kb}
+    if args.perf_update_baseline:
+        with open(args.perf_baseline, "w", encoding="utf-8") as f:
+            json.dump({"fixture": fixture, "scenarios": results}, f, indent=2)
+        print(f"Baseline written to {args.perf_baseline}", file=sys.stderr)
+        return 0
+    try:
+        with open(args.perf_baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    except (OSError, ValueError) as e:
+        # Without a baseline nothing can be compared; passing would hide every regression
+        print(f"No usable baseline at {args.perf_baseline} ({e}); record one with --perf-update-baseline.",
+              file=sys.stderr)
+        print("Perf suite failed", file=sys.stderr)
+        return 1
+    if baseline.get("fixture") != fixture:
+        print(f"Warning: baseline fixture {baseline.get('fixture')} differs from {fixture}", file=sys.stderr)
+    problems = compare_perf(results, baseline.get("scenarios", {}))
+    for line in problems:
+        print("REGRESSION " + line, file=sys.stderr)
+    print("Perf suite " + ("failed" if problems else "passed"), file=sys.stderr)
+    return 1 if problems else 0
+
+
+def verify_fixture_download(path, size):
+    """True if path holds exactly the size bytes the fixture server sends."""
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size != size:
+                return False
+            for offset in range(0, size, DOWNLOAD_FIXTURE_CHUNK):
+                n = min(DOWNLOAD_FIXTURE_CHUNK, size - offset)
+                if f.read(n) != fixture_bytes(offset, n):
+                    return False
+    except OSError:
+        return False
+    return True
+
+
+def run_download_test(args, qt_argv):
+    """--download-test: fetch throttled fixture files through DownloadManager; exit 1 on a failure.
+
+    Exercises the queue (more files than the concurrency limit), automatic
+    resume (--download-interrupt cuts every first transfer half way) and the
+    ETA, which is scored against the time each download actually took."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication(qt_argv)
+    app.setApplicationName("Ligma Browser Perf")
+    server = PerfFixtureServer(0).start()
+    workdir = tempfile.mkdtemp(prefix="ligma-downloads-")
+    settings = QSettings(os.path.join(workdir, "settings.ini"), QSettings.IniFormat)
+    settings.setValue("downloads/directory", os.path.join(workdir, "files"))
+    settings.setValue("downloads/max_concurrent", args.download_concurrent)
+    manager = DownloadManager(settings)
+    manager.message.connect(lambda msg: print(msg, file=sys.stderr))
+    profile = QWebEngineProfile(app)  # off the record; nothing touches the real profile
+    profile.downloadRequested.connect(manager.handle)
+    page = QWebEnginePage(profile, app)
+    size = int(args.download_mb * 1024 * 1024)
+    for n in range(args.download_files):
+        page.download(QUrl(server.file_url(f"fixture-{n}", args.download_mb, args.download_kbps,
+                                           size // 2 if args.download_interrupt else 0)))
+    limit = manager.max_concurrent
+    peak_active = peak_queued = 0
+    etas = {}      # record -> [(monotonic time, eta seconds)]
+    done_at = {}
+    start = time.monotonic()
+    next_report = start
+    try:
+        while time.monotonic() - start < DOWNLOAD_TEST_TIMEOUT_S:
+            deadline = time.monotonic() + DOWNLOAD_TEST_SAMPLE_MS / 1000
+            while time.monotonic() < deadline:
+                app.processEvents(QEventLoop.AllEvents, 10)
+            now = time.monotonic()
+            records = manager.records
+            peak_active = max(peak_active, len(manager.active()))
+            peak_queued = max(peak_queued, sum(1 for r in records if r.state == "queued"))
+            for r in records:
+                if r.state == "completed":
+                    done_at.setdefault(r, now)
+                elif r.state == "active" and r.eta() is not None:
+                    etas.setdefault(r, []).append((now, r.eta()))
+            if now >= next_report:
+                rate, eta = manager.aggregate()
+                print(f"{now - start:5.1f}s  {len(manager.active())} active, {format_bytes(rate)}/s, "
+                      f"ETA {format_eta(eta)}", file=sys.stderr)
+                next_report = now + 1
+            if len(records) == args.download_files and all(r.state in ("completed", "cancelled")
+                                                           for r in records):
+                break
+        failures = []
+        errors = []
+        for r in manager.records:
+            ok = r.state == "completed" and verify_fixture_download(r.path, size)
+            finished = done_at.get(r)
+            if finished is not None:
+                # Relative ETA error over samples with at least a second to go
+                errors += [abs(eta - (finished - t)) / (finished - t)
+                           for t, eta in etas.get(r, ()) if finished - t >= 1]
+            print(f"{r.name}: {r.state}, {r.resume_attempts} resume(s), "
+                  f"{'verified' if ok else 'CONTENT MISMATCH' if r.state == 'completed' else 'not completed'}"
+                  + (f", {finished - r.started:.1f} s" if finished is not None else ""), file=sys.stderr)
+            if not ok:
+                failures.append(r.name)
+        if len(manager.records) < args.download_files:
+            failures.append(f"{args.download_files - len(manager.records)} download(s) never started")
+        if peak_active > limit:
+            failures.append(f"{peak_active} downloads active at once, limit {limit}")
+        if args.download_interrupt and not all(r.resume_attempts for r in manager.records):
+            failures.append("an interrupted download was not resumed")
+        median = percentile(errors, 50)
+        print(f"Peak {peak_active} active (limit {limit}), {peak_queued} queued; median ETA error "
+              + (f"{median:.0%}" if median is not None else "n/a")
+              + f" over {len(errors)} sample(s)", file=sys.stderr)
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    for failure in failures:
+        print("FAILED " + failure, file=sys.stderr)
+    print("Download test " + ("failed" if failures else "passed"), file=sys.stderr)
+    return 1 if failures else 0
+
+
+# -----------------------------------------------------------------------------
+# Control API (--control-port; newline-delimited JSON-RPC 2.0 on 127.0.0.1)
+# -----------------------------------------------------------------------------
+class RpcError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class ControlServer(QObject):
+    """Drives the browser for load tests. Each request is answered when its
+    command completes, tagged with its id, so a client can pipeline requests
+    for many tabs and read the replies in completion order.
+
+    Methods: open_tab(url, wait), close_tab(tab), navigate(tab, url, wait),
+    wait_for_load(tab, timeout), run_js(tab, script), metrics(tab), list_tabs().
+    A connection must call auth(token) first; without a token one is generated.
+    Anything that is not a JSON-RPC line (say, an HTTP request a web page sent
+    to the port) drops the connection unanswered."""
+
+    def __init__(self, browser, port, token=None, parent=None):
+        super().__init__(parent or browser)
+        self._browser = browser
+        self._port = port
+        self.token = token or secrets.token_urlsafe(18)
+        self._server = QTcpServer(self)
+        self._server.newConnection.connect(self._on_new_connection)
+        self._authed = set()
+        self._ids = {}        # tab id -> BrowserTab
+        self._next_id = 1
+        self._pending = set()  # tab ids with a navigation requested but not finished
+        self._waiters = {}     # tab id -> [reply callbacks]
+
+    def listen(self):
+        return self._server.listen(QHostAddress.LocalHost, self._port)
+
+    def port(self):
+        return self._server.serverPort()
+
+    # -- connections ----------------------------------------------------------
+    def _on_new_connection(self):
+        while self._server.hasPendingConnections():
+            sock = self._server.nextPendingConnection()
+            sock.readyRead.connect(lambda s=sock: self._on_ready_read(s))
+            sock.disconnected.connect(lambda s=sock: self._on_disconnected(s))
+
+    def _on_disconnected(self, sock):
+        self._authed.discard(id(sock))
+        sock.deleteLater()
+
+    def _on_ready_read(self, sock):
+        while sock.state() == sock.ConnectedState and sock.canReadLine():
+            line = bytes(sock.readLine()).strip()
+            if line:
+                self._handle(sock, line)
+        if sock.state() == sock.ConnectedState and sock.bytesAvailable() > CONTROL_MAX_LINE:
+            sock.abort()
+
+    def _send(self, sock, payload):
+        if not sip.isdeleted(sock) and sock.state() == sock.ConnectedState:
+            sock.write(json.dumps(payload).encode("utf-8") + b"\n")
+
+    def _handle(self, sock, line):
+        try:
+            msg = json.loads(line.decode("utf-8"))
+        except ValueError:
+            msg = None
+        if not isinstance(msg, dict) or msg.get("jsonrpc") != "2.0" or not isinstance(msg.get("method"), str):
+            sock.abort()  # never answer: the sender may be a page probing the port
+            return
+        req_id = msg.get("id")
+        done = []
+
+        def reply(result=None, error=None):
+            if done:
+                return  # e.g. a wait that timed out and then finished
+            done.append(True)
+            out = {"jsonrpc": "2.0", "id": req_id}
+            if error is not None:
+                out["error"] = {"code": error.code, "message": str(error)}
+            else:
+                out["result"] = result
+            self._send(sock, out)
+
+        try:
+            params = msg.get("params") or {}
+            if not isinstance(params, dict):
+                raise RpcError(-32602, "params must be an object")
+            if msg["method"] == "auth":
+                if not hmac.compare_digest(str(params.get("token", "")).encode("utf-8"),
+                                           self.token.encode("utf-8")):
+                    reply(error=RpcError(-32001, "bad token"))
+                    sock.disconnectFromHost()
+                    return
+                self._authed.add(id(sock))
+                reply(True)
+                return
+            if id(sock) not in self._authed:
+                raise RpcError(-32001, "call auth first")
+            handler = getattr(self, "_rpc_" + msg["method"], None)
+            if handler is None:
+                raise RpcError(-32601, f"unknown method {msg['method']}")
+            handler(params, reply)
+        except RpcError as e:
+            reply(error=e)
+        except Exception as e:
+            reply(error=RpcError(-32000, str(e)))
+
+    # -- tabs -----------------------------------------------------------------
+    def _tab_id(self, tab):
+        for tab_id, known in self._ids.items():
+            if known is tab:
+                return tab_id
+        tab_id = self._next_id
+        self._next_id += 1
+        self._ids[tab_id] = tab
+        tab.loadFinished.connect(lambda ok, i=tab_id: self._on_tab_loaded(i, ok))
+        tab.destroyed.connect(lambda _=None, i=tab_id: self._forget(i))
+        return tab_id
+
+    def _forget(self, tab_id):
+        self._ids.pop(tab_id, None)
+        self._pending.discard(tab_id)
+        for reply in self._waiters.pop(tab_id, []):
+            reply(error=RpcError(-32002, "tab closed"))
+
+    def _tab(self, params):
+        tab = self._ids.get(params.get("tab"))
+        if tab is None or sip.isdeleted(tab):
+            raise RpcError(-32602, f"no tab {params.get('tab')!r}")
+        return tab
+
+    def _tab_info(self, tab_id, tab):
+        return {"tab": tab_id, "url": tab.url().toString(), "title": tab.title(),
+                "loading": tab.is_loading() or tab_id in self._pending, "load_ms": tab.last_load_ms}
+
+    def _on_tab_loaded(self, tab_id, ok):
+        self._pending.discard(tab_id)
+        tab = self._ids.get(tab_id)
+        for reply in self._waiters.pop(tab_id, []):
+            reply({"ok": ok, "load_ms": tab.last_load_ms if tab is not None else None})
+
+    def _wait(self, tab_id, reply, timeout):
+        self._waiters.setdefault(tab_id, []).append(reply)
+
+        def expire():
+            waiters = self._waiters.get(tab_id, [])
+            if reply in waiters:
+                waiters.remove(reply)
+                reply(error=RpcError(-32003, f"load did not finish within {timeout:g}s"))
+        QTimer.singleShot(int(timeout * 1000), expire)
+
+    # -- methods --------------------------------------------------------------
+    def _url(self, params):
+        b = self._browser
+        return parse_url_input(params.get("url", ""), b._home_url, b._search_url_template)
+
+    def _rpc_open_tab(self, params, reply):
+        tab = self._browser._add_tab(self._url(params))
+        tab_id = self._tab_id(tab)
+        self._pending.add(tab_id)
+        if not params.get("wait"):
+            reply({"tab": tab_id})
+            return
+
+        def loaded(result=None, error=None):
+            reply(dict(result, tab=tab_id) if error is None else None, error)
+        self._wait(tab_id, loaded, float(params.get("timeout", CONTROL_WAIT_TIMEOUT_S)))
+
+    def _rpc_close_tab(self, params, reply):
+        tab = self._tab(params)
+        idx = self._browser._tabs.indexOf(tab)
+        if idx >= 0:
+            self._browser._close_tab_at(idx)
+        reply(True)
+
+    def _rpc_navigate(self, params, reply):
+        tab = self._tab(params)
+        tab_id = params["tab"]
+        self._pending.add(tab_id)
+        tab.setUrl(QUrl(self._url(params)))
+        if params.get("wait"):
+            self._wait(tab_id, reply, float(params.get("timeout", CONTROL_WAIT_TIMEOUT_S)))
+        else:
+            reply(True)
+
+    def _rpc_wait_for_load(self, params, reply):
+        tab = self._tab(params)
+        tab_id = params["tab"]
+        if tab.is_loading() or tab_id in self._pending:
+            self._wait(tab_id, reply, float(params.get("timeout", CONTROL_WAIT_TIMEOUT_S)))
+        else:
+            reply({"ok": True, "load_ms": tab.last_load_ms})
+
+    def _rpc_run_js(self, params, reply):
+        tab = self._tab(params)
+        script = params.get("script")
+        if not isinstance(script, str):
+            raise RpcError(-32602, "script must be a string")
+        tab.page().runJavaScript(script, lambda result: reply(result))
+
+    def _rpc_metrics(self, params, reply):
+        b = self._browser
+        result = {"tabs": b._tabs.count(), "resident_bytes": browser_resident_bytes(b)}
+        if "tab" in params:
+            tab = self._tab(params)
+            pid = renderer_pid(tab)
+            result.update(self._tab_info(params["tab"], tab), renderer_pid=pid,
+                          renderer_bytes=read_process_rss(pid) if pid else None)
+        reply(result)
+
+    def _rpc_list_tabs(self, params, reply):
+        tabs = self._browser._tabs
+        reply([self._tab_info(self._tab_id(tab), tab)
+               for tab in (tabs.widget(i) for i in range(tabs.count())) if isinstance(tab, BrowserTab)])
+
+
+# -----------------------------------------------------------------------------
+# Single instance (later launches hand their URLs to the running browser)
+# -----------------------------------------------------------------------------
+def instance_server_name():
+    """Local socket name shared by every launch of the same user."""
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = "default"
+    return "ligma-browser-" + hashlib.sha1(user.encode("utf-8")).hexdigest()[:12]
+
+
+def split_launch_urls(argv):
+    """Separate positional URLs from Qt/Chromium options in a launch argv (argv[0] kept)."""
+    qt_argv, urls = argv[:1], []
+    takes_value = False
+    for arg in argv[1:]:
+        if takes_value:
+            qt_argv.append(arg)
+            takes_value = False
+        elif arg.startswith("-"):
+            qt_argv.append(arg)
+            takes_value = arg in QT_VALUE_OPTIONS
+        else:
+            urls.append(arg)
+    return qt_argv, urls
+
+
+def send_to_running_instance(urls, name=None):
+    """Hand urls to a running browser. True once it acknowledged them."""
+    sock = QLocalSocket()
+    sock.connectToServer(name or instance_server_name())
+    if not sock.waitForConnected(INSTANCE_CONNECT_TIMEOUT_MS):
+        return False
+    try:
+        sock.write(json.dumps({"urls": urls}).encode("utf-8") + b"\n")
+        if not sock.waitForBytesWritten(INSTANCE_ACK_TIMEOUT_MS):
+            return False
+        while not sock.canReadLine():
+            if not sock.waitForReadyRead(INSTANCE_ACK_TIMEOUT_MS):
+                return False
+        return bytes(sock.readLine()).strip() == b"ok"
+    finally:
+        sock.abort()
+
+
+class InstanceServer(QObject):
+    """Listens for later launches and emits the raw URL arguments they send."""
+    open_urls = pyqtSignal(list)
+
+    def __init__(self, name=None, parent=None):
+        super().__init__(parent)
+        self._name = name or instance_server_name()
+        self._server = QLocalServer(self)
+        self._server.setSocketOptions(QLocalServer.UserAccessOption)
+        self._server.newConnection.connect(self._on_new_connection)
+
+    def listen(self):
+        # Probe first: with UserAccessOption Qt replaces an existing socket file
+        # instead of failing, which would hijack a live instance's name.
+        probe = QLocalSocket()
+        probe.connectToServer(self._name)
+        if probe.waitForConnected(INSTANCE_CONNECT_TIMEOUT_MS):
+            probe.abort()
+            return False
+        QLocalServer.removeServer(self._name)  # left behind by a crashed instance
+        return self._server.listen(self._name)
+
+    def close(self):
+        self._server.close()
+
+    def _on_new_connection(self):
+        while self._server.hasPendingConnections():
+            sock = self._server.nextPendingConnection()
+            sock.readyRead.connect(lambda s=sock: self._on_ready_read(s))
+            sock.disconnected.connect(sock.deleteLater)
+
+    def _on_ready_read(self, sock):
+        while sock.canReadLine():
+            line = bytes(sock.readLine())
+            try:
+                urls = [str(u) for u in json.loads(line.decode("utf-8")).get("urls", [])]
+            except (ValueError, AttributeError, TypeError):
+                sock.write(b"error\n")
+                continue
+            sock.write(b"ok\n")
+            sock.flush()
+            self.open_urls.emit(urls)
 
 
 # -----------------------------------------------------------------------------
 # Entry point
 # -----------------------------------------------------------------------------
+def parse_args(argv):
+    """Split Ligma's own options from the arguments meant for Qt/Chromium."""
+    parser = argparse.ArgumentParser(prog="Ligma Browser")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="render URLs listed in FILE ('-' for stdin) headlessly and exit")
+    parser.add_argument("--format", choices=BATCH_FORMATS, default="pdf",
+                        help="batch export format (default: pdf)")
+    parser.add_argument("--out", default=".", help="batch output directory")
+    parser.add_argument("--jobs", type=int, default=default_job_count(),
+                        help="concurrent offscreen pages (default: one per core)")
+    parser.add_argument("--timeout", type=float, default=BATCH_TIMEOUT_S,
+                        help="seconds allowed per URL attempt")
+    parser.add_argument("--retries", type=int, default=BATCH_RETRIES,
+                        help="extra attempts for a failed or timed-out URL")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"time every browser slot (also enabled by {PROFILE_ENV}=1)")
+    parser.add_argument("--soak", type=int, metavar="CYCLES",
+                        help="open and close tabs CYCLES times, report leaks and exit (1 on leak)")
+    parser.add_argument("--soak-url", default=SOAK_URL, help="page loaded by soak-test tabs")
+    parser.add_argument("--profile-trace", metavar="PATH",
+                        help="where to write the Chrome trace on exit (default: ligma-trace-<pid>.json)")
+    parser.add_argument("--perf-suite", action="store_true",
+                        help="run the offscreen performance scenarios and compare with the baseline")
+    parser.add_argument("--perf-baseline", default=perf_baseline_path(),
+                        help="baseline JSON for --perf-suite (default: next to this script)")
+    parser.add_argument("--perf-update-baseline", action="store_true",
+                        help="store this run's results as the new baseline")
+    parser.add_argument("--perf-tabs", type=int, default=PERF_TABS, help="tabs opened by the suite")
+    parser.add_argument("--perf-latency", type=float, default=PERF_LATENCY_MS,
+                        help="fixture server delay per response in ms")
+    parser.add_argument("--perf-page-kb", type=int, default=PERF_PAGE_KB, help="fixture page size in KiB")
+    parser.add_argument("--download-test", action="store_true",
+                        help="download throttled files from the local fixture server through the download "
+                             "manager, check queueing, resume and ETA, and exit (1 on a failure)")
+    parser.add_argument("--download-files", type=int, default=DOWNLOAD_FIXTURE_FILES,
+                        help="files fetched by --download-test")
+    parser.add_argument("--download-mb", type=float, default=DOWNLOAD_FIXTURE_MB, help="size of each file in MiB")
+    parser.add_argument("--download-kbps", type=float, default=DOWNLOAD_FIXTURE_KBPS,
+                        help="per-download throttle in KiB/s (0 for unthrottled)")
+    parser.add_argument("--download-concurrent", type=int, default=DOWNLOAD_MAX_CONCURRENT,
+                        help="concurrent downloads allowed during --download-test")
+    parser.add_argument("--download-interrupt", action="store_true",
+                        help="cut each file's first transfer half way to exercise automatic resume")
+    parser.add_argument("--crack-worker", metavar="HOST:PORT",
+                        help="serve as a worker for a password tester coordinator and exit when it is done")
+    parser.add_argument("--crack-token", default="", help="shared token for --crack-worker")
+    parser.add_argument("--build-breach-index", metavar="LIST",
+                        help="build the breached-password index from a password list "
+                             "(one per line, or SHA1HEX:count lines) and exit")
+    parser.add_argument("--breach-index", metavar="PATH", help="index file for --build-breach-index")
+    parser.add_argument("--breach-error-rate", type=float, default=BREACH_ERROR_RATE,
+                        help="Bloom filter false-positive rate")
+    parser.add_argument("--breach-capacity", type=int, metavar="N",
+                        help="entries to size the index for (default: lines in LIST)")
+    parser.add_argument("--crawl", metavar="SEEDS",
+                        help="crawl from a seed URL, a file of seeds, '-' (stdin) or 'fixture' (generated "
+                             "local site); one JSON line per page on stdout")
+    parser.add_argument("--crawl-max-pages", type=int, default=CRAWL_MAX_PAGES, help="pages to render")
+    parser.add_argument("--crawl-depth", type=int, default=CRAWL_MAX_DEPTH, help="link depth from the seeds")
+    parser.add_argument("--crawl-delay", type=float,
+                        help=f"seconds between requests to one host (default {CRAWL_HOST_DELAY_S:g})")
+    parser.add_argument("--crawl-all-hosts", action="store_true", help="follow links off the seed hosts")
+    parser.add_argument("--crawl-fixture-pages", type=int, default=CRAWL_FIXTURE_PAGES,
+                        help="size of the generated site for --crawl fixture")
+    parser.add_argument("--control-port", type=int, metavar="PORT",
+                        help="serve the JSON-RPC control API on 127.0.0.1:PORT (0 picks a free port)")
+    parser.add_argument("--control-token",
+                        help="token control connections must send with auth (default: random, printed at start)")
+    parser.add_argument("--new-instance", action="store_true",
+                        help="start a separate browser instead of opening URLs in the running one")
+    args, rest = parser.parse_known_args(argv[1:])
+    qt_argv, args.urls = split_launch_urls(argv[:1] + rest)
+    return args, qt_argv
+
+
+def enable_profiling():
+    """Instrument LigmaBrowser slots; must run before the window is created."""
+    global _profiler
+    _profiler = SlotProfiler()
+    instrument_class(LigmaBrowser, _profiler)
+    return _profiler
+
+
 def main():
-    app = QApplication(sys.argv)
+    args, qt_argv = parse_args(sys.argv)
+    if args.crack_worker:
+        sys.exit(run_crack_worker(args.crack_worker, args.crack_token))
+    if args.build_breach_index:
+        sys.exit(run_build_breach_index(args))
+    register_ligma_scheme()
+    if args.batch:
+        sys.exit(run_batch(args, qt_argv))
+    if args.crawl:
+        sys.exit(run_crawl(args, qt_argv))
+    if args.perf_suite:
+        sys.exit(run_perf_suite(args, qt_argv))
+    if args.download_test:
+        sys.exit(run_download_test(args, qt_argv))
+    # A controlled browser must be its own process, not a hand-off to a running one
+    single_instance = not (args.new_instance or args.soak or args.control_port is not None)
+    if single_instance and send_to_running_instance(args.urls):
+        sys.exit(0)
+    profiler = None
+    if args.profile or os.environ.get(PROFILE_ENV, "") not in ("", "0"):
+        profiler = enable_profiling()
+    # Chromium reads process-model switches from the application arguments
+    app = QApplication(qt_argv + process_model_args())
     app.setApplicationName("Ligma Browser")
     app.setStyle("Fusion")
     font = QFont()
     font.setPointSize(13)
     app.setFont(font)
-    window = LigmaBrowser()
+    window = LigmaBrowser(args.urls)
     window.show()
-    sys.exit(app.exec_())
+    if args.control_port is not None:
+        control = ControlServer(window, args.control_port, args.control_token)
+        if control.listen():
+            print(f"Control API listening on 127.0.0.1:{control.port()}, token {control.token}", file=sys.stderr)
+        else:
+            print(f"Control API could not listen on port {args.control_port}", file=sys.stderr)
+    if single_instance:
+        instance_server = InstanceServer(parent=window)
+        instance_server.open_urls.connect(window._open_external_urls)
+        instance_server.listen()
+    if args.soak:
+        result = {}
+
+        def soak_done(leak, report):
+            print(report, file=sys.stderr)
+            result["leak"] = leak
+            window.close()
+
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        window._run_soak_test(args.soak, args.soak_url,
+                              lambda msg: print(msg, file=sys.stderr), soak_done)
+    code = app.exec_()
+    if args.soak and result.get("leak"):
+        code = 1
+    if profiler is not None:
+        trace_path = args.profile_trace or f"ligma-trace-{os.getpid()}.json"
+        try:
+            profiler.export_trace(trace_path)
+            print(f"Slot trace written to {trace_path}", file=sys.stderr)
+        except OSError as e:
+            print(f"Could not write slot trace: {e}", file=sys.stderr)
+        print(profiler.format_report(), file=sys.stderr)
+    sys.exit(code)
 
 
 if __name__ == "__main__":